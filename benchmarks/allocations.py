@@ -0,0 +1,69 @@
+# micro-benchmark of engine objects allocated per simulated frame
+# run from the repo root with: python -m benchmarks.allocations
+import time
+from itertools import cycle, islice
+
+from ttris.board import Board
+from ttris.enums import Action
+from ttris.tetriminos import Tetrimino
+
+FRAMES = 20000
+RESTARTS = 2000
+
+# a fixed input loop that shuffles pieces around the board before dropping them
+ACTION_LOOP = (
+    [Action.LEFT] * 3
+    + [Action.ROTATE_CW, Action.NONE, Action.ROTATE_CCW, Action.ROTATE_180]
+    + [Action.RIGHT] * 6
+    + [Action.SOFT_DROP] * 4
+    + [Action.NONE] * 4
+    + [Action.LEFT, Action.HARD_DROP]
+)
+
+
+def countAllocations(frames: int):
+    # count Tetrimino instances created while running the board for `frames`
+    # frames, restarting the board whenever the game ends
+    created = 0
+    init = Tetrimino.__init__
+
+    def countingInit(self, *args, **kwargs):
+        nonlocal created
+        created += 1
+        init(self, *args, **kwargs)
+
+    Tetrimino.__init__ = countingInit
+    try:
+        actions = cycle(ACTION_LOOP)
+        frame = 0
+        start = time.perf_counter()
+        while frame < frames:
+            board = Board(5)
+            frame = board.run(islice(actions, frames - frame), frame)
+        elapsed = time.perf_counter() - start
+    finally:
+        Tetrimino.__init__ = init
+    return created, elapsed
+
+
+def timeRestarts(restarts: int, reset: bool) -> float:
+    # seconds per restart of a board that just topped out
+    board = Board(5, seed=0)
+    board.run(cycle([Action.HARD_DROP]))
+    start = time.perf_counter()
+    for seed in range(restarts):
+        if reset:
+            board.reset(seed)
+        else:
+            board = Board(5, seed=seed)
+    return (time.perf_counter() - start) / restarts
+
+
+if __name__ == "__main__":
+    created, elapsed = countAllocations(FRAMES)
+    print(f"frames:                 {FRAMES}")
+    print(f"tetriminos allocated:   {created}")
+    print(f"tetriminos per frame:   {created / FRAMES:.3f}")
+    print(f"time per frame:         {elapsed / FRAMES * 1e6:.2f} us")
+    print(f"new board restart:      {timeRestarts(RESTARTS, False) * 1e6:.2f} us")
+    print(f"in place restart:       {timeRestarts(RESTARTS, True) * 1e6:.2f} us")
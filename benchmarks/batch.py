@@ -0,0 +1,36 @@
+# throughput of the batched numpy engine in piece placements per second
+# run from the repo root with: python -m benchmarks.batch [games]
+import sys
+import time
+
+import numpy as np
+
+from ttris.batch import BatchBoard
+from ttris.enums import Action
+
+STEPS = 200
+
+
+def placementsPerSecond(games: int, steps: int = STEPS) -> float:
+    batch = BatchBoard(range(games))
+    rng = np.random.default_rng(0)
+    # shuffle every piece around with a random rotation and shift, then drop it
+    moves = np.array(
+        [Action.NONE, Action.LEFT, Action.RIGHT, Action.ROTATE_CW, Action.ROTATE_CCW]
+    )
+    placed = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        actions = rng.choice(moves, games) | Action.HARD_DROP
+        before = batch.pieces_placed.sum()
+        batch.step(actions)
+        placed += batch.pieces_placed.sum() - before
+        # start over from new boards once most games have topped out
+        if batch.game_over.mean() > 0.5:
+            batch = BatchBoard(range(games))
+    return placed / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    print(f"{placementsPerSecond(games):,.0f} placements/s with {games} games")
@@ -0,0 +1,318 @@
+# ns/op and allocations/op of the engine hot paths on a few seeded boards,
+# with JSON baselines to catch regressions against the 60 FPS frame budget
+# run from the repo root with:
+#   python -m benchmarks.hotpaths --save baseline.json   (record a baseline)
+#   python -m benchmarks.hotpaths --check baseline.json  (exit 1 on regressions)
+import argparse
+import copy
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from random import Random
+from typing import Callable, Dict, List, NamedTuple
+
+from ttris.board import Board
+from ttris.constants import BOARD_HEIGHT, BOARD_WIDTH
+from ttris.enums import Action, MinoType, RotationDirection, TSpinType
+from ttris.movegen import MoveGenerator
+from ttris.tetriminos import MinoProvider, Tetrimino
+
+BATCH = 50  # fixture copies, each op is timed in batches over all of them
+REPEATS = 100
+ALLOC_ITERATIONS = 200
+THRESHOLD = 0.25  # fail when ns/op gets this much slower than the baseline
+
+_ROTATIONS = {
+    Action.ROTATE_CW: RotationDirection.CLOCKWISE,
+    Action.ROTATE_CCW: RotationDirection.COUNTERCLOCKWISE,
+    Action.ROTATE_180: RotationDirection.FLIP180,
+}
+
+
+class Case(NamedTuple):
+    # `setup` puts a fixture's board back in the same state before its (timed)
+    # `op` runs on it
+    setup: Callable[["Fixture"], None]
+    op: Callable[["Fixture"], object]
+
+
+class Fixture:
+    # a seeded board with a T piece in play, and a snapshot to restore it from
+    def __init__(self, columns: List[int], seed: int):
+        self.board = Board(5, seed=seed)
+        board_arr = self.board.board_arr
+        r = Random(seed)
+        # fill every column up to its height, leaving a random hole here and
+        # there, then break up any row that came out full
+        for x, height in enumerate(columns):
+            for y in range(BOARD_HEIGHT - height, BOARD_HEIGHT):
+                if r.random() < 0.9:
+                    board_arr[y][x] = MinoType(r.randint(1, 7))
+        for row in board_arr:
+            if all(row):
+                row[r.randrange(BOARD_WIDTH)] = MinoType.NO_MINO
+        board_arr.rebuild()
+        self.piece = Tetrimino(MinoType.MINO_T)
+        self.provider = MinoProvider(5, seed=0)
+        # the rotation benchmarked, from spawn unless a kick setup is given
+        self.rotation = (self.piece.x, self.piece.y, 0, RotationDirection.CLOCKWISE)
+        self.snapshot = None
+
+    def setRows(self, rows: List[str]) -> None:
+        # overwrite the bottom rows, "X" for a block and "." for an empty cell
+        board_arr = self.board.board_arr
+        for i, row in enumerate(rows):
+            y = BOARD_HEIGHT - len(rows) + i
+            board_arr[y][:] = [
+                MinoType.MINO_J if c == "X" else MinoType.NO_MINO for c in row
+            ]
+        board_arr.rebuild()
+
+    def kickInto(self, slot) -> None:
+        # benchmark the last rotation on the way into a placement instead
+        *_, last = (i for i, action in enumerate(slot.path) if action in _ROTATIONS)
+        piece = Tetrimino(MinoType.MINO_T)
+        for action in slot.path[:last]:
+            if action == Action.LEFT:
+                piece.moveX(-1, self.board.board_arr)
+            elif action == Action.RIGHT:
+                piece.moveX(1, self.board.board_arr)
+            elif action == Action.SOFT_DROP:
+                piece.softDrop(self.board.board_arr)
+            else:
+                piece.rotateMino(_ROTATIONS[action], self.board.board_arr)
+        self.rotation = (piece.x, piece.y, piece.spin, _ROTATIONS[slot.path[last]])
+
+    def freeze(self) -> None:
+        board_arr = self.board.board_arr
+        self.snapshot = [row[:] for row in board_arr]
+
+    def restore(self) -> None:
+        board = self.board
+        board_arr = board.board_arr
+        for y, row in enumerate(self.snapshot):
+            board_arr[y][:] = row
+        board_arr.rebuild()
+        self.spawnPose()
+        board.curr_piece = self.piece
+        board.game_over = False
+        # left set by a hard drop, it would have clearLines score a lock too
+        board.hard_drop_tick = False
+
+    def spawnPose(self) -> None:
+        self.piece.resetPiece()
+        self.piece.updateHint(self.board.board_arr)
+
+    def rotationPose(self) -> None:
+        x, y, spin, _ = self.rotation
+        self.piece.setPose(x, y, spin)
+
+    def fillBottomRows(self) -> None:
+        # complete the two bottom rows so there are lines to clear
+        self.restore()
+        board_arr = self.board.board_arr
+        for y in (BOARD_HEIGHT - 2, BOARD_HEIGHT - 1):
+            board_arr[y][:] = [MinoType.MINO_I] * BOARD_WIDTH
+        board_arr.rebuild()
+
+
+def _noOp(fixture: Fixture) -> None:
+    pass
+
+
+CASES = {
+    "rotateMino": Case(
+        Fixture.rotationPose,
+        lambda f: f.piece.rotateMino(f.rotation[3], f.board.board_arr),
+    ),
+    "moveX": Case(Fixture.spawnPose, lambda f: f.piece.moveX(1, f.board.board_arr)),
+    "shiftX": Case(Fixture.spawnPose, lambda f: f.piece.shiftX(1, f.board.board_arr)),
+    "hardDrop": Case(Fixture.spawnPose, lambda f: f.piece.hardDrop(f.board.board_arr)),
+    "updateHint": Case(
+        Fixture.spawnPose, lambda f: f.piece.updateHint(f.board.board_arr)
+    ),
+    "isColliding": Case(
+        Fixture.spawnPose, lambda f: f.piece.isColliding(f.board.board_arr)
+    ),
+    "clearLines": Case(Fixture.fillBottomRows, lambda f: f.board.clearLines()),
+    "hardDropCurrPiece": Case(Fixture.restore, lambda f: f.board.hardDropCurrPiece()),
+    "fetchMino": Case(_noOp, lambda f: f.provider.fetchMino()),
+}
+
+
+def makeFixtures() -> Dict[str, Fixture]:
+    fixtures = {
+        "empty": Fixture([0] * BOARD_WIDTH, seed=1),
+        "mid_stack": Fixture([8, 9, 7, 8, 10, 9, 8, 7, 9, 6], seed=2),
+        "near_top_out": Fixture([17, 18, 17, 19, 18, 17, 18, 19, 17, 16], seed=3),
+        "tspin": Fixture([0] * BOARD_WIDTH, seed=4),
+    }
+    # a T-spin triple slot under an overhang, the T kicks two rows down into it
+    tspin = fixtures["tspin"]
+    tspin.setRows(
+        [
+            "XXXXXX...X",
+            "XXXXXX....",
+            "XXXXXXXXX.",
+            "XXXXXXXX..",
+            "XXXXXXXXX.",
+        ]
+    )
+    slots = MoveGenerator().placements(tspin.board.board_arr, MinoType.MINO_T)
+    tspin.kickInto(next(slot for slot in slots if slot.tspin == TSpinType.TSPIN))
+    for fixture in fixtures.values():
+        fixture.freeze()
+        fixture.restore()
+    return fixtures
+
+
+def _timeBatch(case: Case, copies: List[Fixture]) -> float:
+    # one clock read around the op on every copy, a single op is too short for
+    # the timer to measure on its own
+    setup, op = case
+    for fixture in copies:
+        setup(fixture)
+    clock = time.perf_counter_ns
+    gc.disable()
+    start = clock()
+    for fixture in copies:
+        op(fixture)
+    elapsed = clock() - start
+    gc.enable()
+    return elapsed / len(copies)
+
+
+def measure(case: Case, fixture: Fixture, ns: float) -> Dict[str, float]:
+    # allocations are counted in a separate, untimed pass
+    created = 0
+    init = Tetrimino.__init__
+
+    def countingInit(self, *args, **kwargs):
+        nonlocal created
+        created += 1
+        init(self, *args, **kwargs)
+
+    setup, op = case
+    peak = 0
+    Tetrimino.__init__ = countingInit
+    tracemalloc.start()
+    try:
+        for _ in range(ALLOC_ITERATIONS):
+            setup(fixture)
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            op(fixture)
+            peak += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+        Tetrimino.__init__ = init
+    return {
+        "ns_per_op": round(max(ns, 0.0), 1),
+        # Tetrimino instances, the only engine objects made in the hot paths
+        "allocs_per_op": created / ALLOC_ITERATIONS,
+        # peak memory held while the op runs, temporaries included
+        "bytes_per_op": round(peak / ALLOC_ITERATIONS, 1),
+    }
+
+
+def runAll(only: str = "") -> Dict[str, Dict[str, float]]:
+    runs = {}
+    for fixture_name, fixture in makeFixtures().items():
+        copies = [copy.deepcopy(fixture) for _ in range(BATCH)]
+        for case_name, case in CASES.items():
+            name = f"{fixture_name}/{case_name}"
+            if only in name:
+                runs[name] = (case, copies)
+    if not runs:
+        return {}
+    noop = Case(_noOp, _noOp)
+    noop_copies = next(iter(runs.values()))[1]
+    # the repeats take turns across all the benchmarks, so a stretch where the
+    # machine runs slow doesn't land on just a few of them. Each keeps its
+    # fastest batch, less the time of an op doing nothing
+    times = {name: [] for name in runs}
+    overhead = []
+    for _ in range(REPEATS):
+        overhead.append(_timeBatch(noop, noop_copies))
+        for name, (case, copies) in runs.items():
+            times[name].append(_timeBatch(case, copies))
+    results = {}
+    for name, (case, copies) in runs.items():
+        results[name] = measure(case, copies[0], min(times[name]) - min(overhead))
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    # names of benchmarks slower than the baseline by more than `threshold`,
+    # or allocating more than before
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        slower = result["ns_per_op"] > base["ns_per_op"] * (1 + threshold)
+        allocs = result["allocs_per_op"] > base["allocs_per_op"]
+        if slower or allocs:
+            regressions.append(name)
+    return regressions
+
+
+def report(results, baseline=None) -> None:
+    print(f"{'benchmark':<32}{'ns/op':>10}{'allocs/op':>11}{'bytes/op':>10}", end="")
+    print(f"{'vs base':>10}" if baseline else "")
+    for name, result in results.items():
+        print(
+            f"{name:<32}{result['ns_per_op']:>10.1f}"
+            f"{result['allocs_per_op']:>11.2f}{result['bytes_per_op']:>10.1f}",
+            end="",
+        )
+        base = (baseline or {}).get(name)
+        if base and base["ns_per_op"]:
+            print(f"{result['ns_per_op'] / base['ns_per_op'] - 1:>+10.1%}")
+        else:
+            print()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="benchmark engine hot paths")
+    parser.add_argument("--save", metavar="JSON", help="write results as a baseline")
+    parser.add_argument(
+        "--check", metavar="JSON", help="compare against a baseline, exit 1 if worse"
+    )
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--only", default="", help="run benchmarks matching this")
+    args = parser.parse_args()
+
+    results = runAll(args.only)
+    baseline = None
+    if args.check:
+        with open(args.check) as f:
+            baseline = json.load(f)["results"]
+    report(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {"python": platform.python_version(), "results": results},
+                f,
+                indent=2,
+            )
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\nregressed by more than {args.threshold:.0%} or allocating more:")
+            for name in regressions:
+                print(f"  {name}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import socket
+import time
+
+from ttris.board import Board
+from ttris.broadcast import STREAM_FRAME_RECORD, WATCH, WATCH_RECORD, BroadcastServer
+from ttris.constants import DISPLAY_SCALE, FPS, WINDOW_HEIGHT, WINDOW_WIDTH
+from ttris.delta import BoardView
+from ttris.policies import POLICIES, loadPolicy
+from ttris.versus import FRAME, packMessage, readMessage
+
+LOOKAHEAD = 5
+STALLED_RECEIVE_BUFFER = 1 << 12
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="ttris spectator broadcasts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser(
+        "serve", help="broadcast bot games until interrupted, one channel per game"
+    )
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=7701)
+    serve.add_argument("-g", "--games", type=int, default=1)
+    serve.add_argument(
+        "-p", "--policy", default="greedy", help=f"one of {', '.join(POLICIES)}"
+    )
+    serve.add_argument("--seed", type=int, default=0)
+    watch = sub.add_parser("watch", help="watch a channel in a ttris window")
+    watch.add_argument("--host", default="127.0.0.1")
+    watch.add_argument("--port", type=int, default=7701)
+    watch.add_argument("-c", "--channel", type=int, default=0)
+    bench = sub.add_parser(
+        "bench", help="stream bot games to many local viewers and time the fan-out"
+    )
+    bench.add_argument("-g", "--games", type=int, default=4)
+    bench.add_argument("-v", "--viewers", type=int, default=1000)
+    bench.add_argument(
+        "--stalled", type=int, default=0, help="viewers that never read the stream"
+    )
+    bench.add_argument("-s", "--seconds", type=float, default=10)
+    bench.add_argument("-p", "--policy", default="greedy")
+    bench.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+class BotGames:
+    # bot games on the channels of a server, a game that tops out is followed
+    # by a new one on the same channel
+    def __init__(self, server: BroadcastServer, games: int, policy: str, seed: int):
+        self.server = server
+        self.policy = loadPolicy(policy)
+        self.seed = seed
+        self.games = {}
+        for _ in range(games):
+            self.seed += 1
+            board = Board(LOOKAHEAD, seed=self.seed)
+            self.games[server.broadcast(board)] = [board, self.policy(self.seed)]
+        self.frame = 0
+
+    async def run(self) -> None:
+        # play and publish one frame of every game at a fixed rate
+        period = 1 / FPS
+        deadline = time.perf_counter()
+        while True:
+            for channel, game in self.games.items():
+                board, player = game
+                if board.game_over:
+                    self.seed += 1
+                    board.reset(self.seed)
+                    game[1] = self.policy(self.seed)
+                    self.server.channels[channel].follow(board)
+                    continue
+                board.update(self.frame, player(board))
+            self.server.publish()
+            self.frame += 1
+            deadline = max(deadline + period, time.perf_counter())
+            await asyncio.sleep(deadline - time.perf_counter())
+
+
+async def serve(args) -> None:
+    server = BroadcastServer(args.host, args.port)
+    await server.start()
+    games = BotGames(server, args.games, args.policy, args.seed)
+    print(f"broadcasting {args.games} games on {server.host}:{server.port}")
+    runner = asyncio.create_task(games.run())
+    while True:
+        await asyncio.sleep(10)
+        stats = server.publishStats()
+        print(
+            f"{server.viewers} viewers, publish "
+            + ", ".join(f"{k} {v:.2f}ms" for k, v in stats.items())
+        )
+        if runner.done():
+            runner.result()
+
+
+def watch(args) -> None:
+    import pyxel
+
+    from ttris.viewer import TtrisViewer
+
+    pyxel.init(
+        WINDOW_WIDTH,
+        WINDOW_HEIGHT,
+        title="ttris viewer",
+        display_scale=DISPLAY_SCALE,
+        fps=FPS,
+    )
+    pyxel.screen_mode(2)
+    pyxel.load("assets/ttris.pyxres")
+    TtrisViewer(args.host, args.port, args.channel).run()
+
+
+async def viewer(port: int, channel: int, received: list) -> None:
+    # follows a stream like the pyxel viewer, without drawing it
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(packMessage(WATCH, WATCH_RECORD.pack(channel)))
+    view = BoardView()
+    try:
+        while True:
+            kind, payload = await readMessage(reader)
+            if kind == FRAME:
+                view.apply(payload, STREAM_FRAME_RECORD.size)
+                received[0] += 1
+                received[1] += len(payload)
+    except asyncio.IncompleteReadError:
+        pass
+    finally:
+        writer.close()
+
+
+async def stalled(port: int, channel: int, connections: list) -> None:
+    # asks for a stream and never reads it (with a small receive buffer, so
+    # that the server notices sooner)
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, STALLED_RECEIVE_BUFFER)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, ("127.0.0.1", port))
+    reader, writer = await asyncio.open_connection(sock=sock)
+    writer.write(packMessage(WATCH, WATCH_RECORD.pack(channel)))
+    writer.transport.pause_reading()
+    connections.append(writer)
+
+
+async def bench(args) -> None:
+    server = BroadcastServer()
+    await server.start()
+    games = BotGames(server, args.games, args.policy, args.seed)
+    received = [0, 0]
+    viewers = [
+        asyncio.create_task(viewer(server.port, i % args.games, received))
+        for i in range(args.viewers)
+    ]
+    connections = []
+    await asyncio.gather(
+        *(
+            stalled(server.port, i % args.games, connections)
+            for i in range(args.stalled)
+        )
+    )
+    runner = asyncio.create_task(games.run())
+    start = time.perf_counter()
+    await asyncio.sleep(args.seconds)
+    elapsed = time.perf_counter() - start
+    runner.cancel()
+    stats = server.publishStats()
+    skipped = sum(broadcast.skipped for broadcast in server.channels.values())
+    for writer in connections:
+        writer.close()
+    await server.close()
+    await asyncio.gather(*viewers)
+
+    print(f"{args.games} games to {args.viewers} viewers ({args.stalled} stalled)")
+    print("publish " + ", ".join(f"{k} {v:.2f}ms" for k, v in stats.items()))
+    print(
+        f"{received[0] / elapsed:,.0f} frames/s, "
+        f"{received[1] / elapsed / 1024:,.0f} KB/s received by viewers"
+    )
+    print(f"{skipped} frames skipped for viewers that fell behind")
+
+
+def main() -> None:
+    args = parseArgs()
+    if args.command == "watch":
+        watch(args)
+    else:
+        asyncio.run(serve(args) if args.command == "serve" else bench(args))
+
+
+if __name__ == "__main__":
+    main()
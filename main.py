@@ -1,12 +1,9 @@
-import pyxel
+import os
 
-from ttris.main import TtrisGame
+import pyxel
 
-# constants for pyxel.init
-WINDOW_HEIGHT = 200
-WINDOW_WIDTH = 180
-DISPLAY_SCALE = 8
-FPS = 60
+from ttris.constants import DISPLAY_SCALE, FPS, WINDOW_HEIGHT, WINDOW_WIDTH
+from ttris.main import ARR, DAS, SDF, TtrisGame
 
 
 class TtrisMenu:
@@ -29,7 +26,16 @@ class TtrisMenu:
         pass
 
     def runGame(self) -> None:
-        self.game = TtrisGame()
+        # TTRIS_PROFILE=1 shows the frame time overlay, TTRIS_PRACTICE=1 lets
+        # pieces be undone, TTRIS_DAS/TTRIS_ARR (frames) and TTRIS_SDF (or
+        # "inf") tune the handling
+        self.game = TtrisGame(
+            profile=os.environ.get("TTRIS_PROFILE") == "1",
+            practice=os.environ.get("TTRIS_PRACTICE") == "1",
+            das=int(os.environ.get("TTRIS_DAS", DAS)),
+            arr=int(os.environ.get("TTRIS_ARR", ARR)),
+            sdf=float(os.environ.get("TTRIS_SDF", SDF)),
+        )
         self.game.run()
         pyxel.run(self.update, self.draw)
 
@@ -0,0 +1,62 @@
+import argparse
+import json
+import time
+
+from ttris.policies import POLICIES
+from ttris.simulation import MAX_FRAMES, StatsCollector, runGames
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(
+        description="play many headless ttris games and aggregate their stats"
+    )
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument(
+        "--seed", type=int, default=0, help="games are seeded seed, seed+1, ..."
+    )
+    parser.add_argument(
+        "-p",
+        "--policy",
+        default="greedy",
+        help=f"one of {', '.join(POLICIES)}, or module:factory",
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=None, help="defaults to the cpu count"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=None, help="games per unit of work"
+    )
+    parser.add_argument("--lookahead", type=int, default=5)
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES)
+    parser.add_argument("--json", action="store_true", help="print the summary as json")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parseArgs()
+    collector = StatsCollector()
+    start = time.perf_counter()
+    for result in runGames(
+        range(args.seed, args.seed + args.games),
+        args.policy,
+        args.workers,
+        args.chunk_size,
+        args.lookahead,
+        args.max_frames,
+    ):
+        collector.add(result)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(collector.summary(), indent=2))
+        return
+    print(collector.format())
+    frames = sum(collector.values["frames"])
+    print(
+        f"\n{collector.games} games in {elapsed:.2f}s "
+        f"({collector.games / elapsed:.1f} games/s, {frames / elapsed:,.0f} frames/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+# boards set up for the tests
+from ttris.board import Board
+from ttris.constants import BOARD_HEIGHT
+from ttris.enums import MinoType
+from ttris.tetriminos import Tetrimino
+
+# flipping a T pointing up at x 3 turns it into a t-spin mini pointing down,
+# with room to slide one block right along the floor
+MINI_SLOT = ["...x.x....", "..........", "...x......"]
+
+
+def boardWithRows(rows):
+    # a board whose bottom rows are `rows` ("x" for a block) and whose
+    # current piece is a T at spawn
+    board = Board(5, seed=0)
+    board_arr = board.board_arr
+    top = BOARD_HEIGHT - len(rows)
+    for i, row in enumerate(rows):
+        for x, cell in enumerate(row):
+            if cell == "x":
+                board_arr[top + i][x] = MinoType.GARBAGE
+    board_arr.rebuild()
+    board.curr_piece = Tetrimino(MinoType.MINO_T)
+    board.curr_piece.updateHint(board_arr)
+    return board
@@ -0,0 +1,37 @@
+from random import Random
+
+import numpy as np
+
+from ttris.batch import BatchBoard
+from ttris.board import Board
+from ttris.enums import Action
+from ttris.policies import GreedyPolicy
+
+# pressed on top of the policy's actions now and then, so holds, shifts and
+# drops that aren't on any path get played too
+NOISE = [action for action in Action if action and action != Action.HARD_DROP]
+
+
+def testBatchMatchesBoards():
+    seeds = range(4)
+    batch = BatchBoard(seeds)
+    boards = [Board(5, seed=seed) for seed in seeds]
+    policies = [GreedyPolicy(seed) for seed in seeds]
+    r = Random(0)
+    for frame in range(1000):
+        actions = [
+            policy(board) | (r.choice(NOISE) if r.random() < 0.05 else 0)
+            for board, policy in zip(boards, policies)
+        ]
+        placed = batch.pieces_placed.copy()
+        batch.step(actions)
+        for i, (board, action) in enumerate(zip(boards, actions)):
+            board.update(frame, action)
+            if board.pieces_placed != placed[i]:
+                # rows only change when a piece locks
+                rows = [[block.value for block in row] for row in board.board_arr]
+                assert np.array_equal(batch.boards[i], rows), (frame, i)
+            assert batch.score[i] == board.score, (frame, i)
+            assert batch.lines_cleared[i] == board.lines_cleared, (frame, i)
+            assert batch.game_over[i] == board.game_over, (frame, i)
+    assert batch.lines_cleared.min() > 0
@@ -0,0 +1,38 @@
+from random import Random
+
+from ttris.bitboard import BitBoard
+from ttris.constants import BOARD_HEIGHT, BOARD_WIDTH
+from ttris.enums import MinoType
+from ttris.tetriminos import MINO_BAG, Tetrimino
+
+
+def randomBoard(r):
+    board_arr = BitBoard()
+    for y in range(BOARD_HEIGHT - r.randrange(BOARD_HEIGHT), BOARD_HEIGHT):
+        for x in range(BOARD_WIDTH):
+            if r.random() < 0.4:
+                board_arr[y][x] = MinoType.GARBAGE
+    board_arr.rebuild()
+    return board_arr
+
+
+def testSlideXMatchesRepeatedMoveX():
+    r = Random(0)
+    slides = 0
+    for _ in range(20):
+        board_arr = randomBoard(r)
+        for minoType in MINO_BAG:
+            for spin in range(4):
+                piece = Tetrimino(minoType, spin=spin)
+                for x in range(-3, BOARD_WIDTH):
+                    for y in range(-2, BOARD_HEIGHT):
+                        if not board_arr.fits(piece.state, x, y):
+                            continue
+                        for direction in (-1, 1):
+                            piece.setPose(x, y, spin)
+                            while piece.moveX(direction, board_arr):
+                                pass
+                            slid = board_arr.slideX(piece.state, x, y, direction)
+                            assert slid == piece.x
+                            slides += slid != x
+    assert slides
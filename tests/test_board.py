@@ -0,0 +1,59 @@
+from boards import MINI_SLOT, boardWithRows
+
+from ttris.board import Board
+from ttris.constants import BOARD_HEIGHT
+from ttris.enums import Action, TSpinType
+from ttris.policies import GreedyPolicy
+
+
+def testRotationIntoSlotLocksAsTSpin():
+    board = boardWithRows(MINI_SLOT)
+    board.moveCurrPiece(3, BOARD_HEIGHT - 3, 0)
+    board.update(1, Action.ROTATE_180)
+    assert board.piece_tspin == TSpinType.MINI
+    board.update(2, Action.HARD_DROP)
+    assert board.last_lock.tspin == TSpinType.MINI
+    assert board.tspin_minis == 1
+    assert board.score > 0
+
+
+def testRotateThenShiftLocksWithoutTSpin():
+    board = boardWithRows(MINI_SLOT)
+    board.moveCurrPiece(3, BOARD_HEIGHT - 3, 0)
+    board.update(1, Action.ROTATE_180)
+    assert board.piece_tspin == TSpinType.MINI
+    board.update(2, Action.RIGHT)
+    assert board.curr_piece.x == 4
+    board.update(3, Action.HARD_DROP)
+    assert board.last_lock.tspin == TSpinType.NONE
+    assert board.tspin_minis == 0
+    assert board.score == 0
+
+
+def testHoldingIntoABlockedSpawnTopsOut():
+    board = boardWithRows(["xxxx.xxxxx"] * 5 + ["." * 10] * (BOARD_HEIGHT - 5))
+    board.update(1, Action.HOLD)
+    assert board.hold is not None and board.game_over
+
+
+def testResetBoardPlaysLikeANewOne():
+    reset = Board(5, seed=1)
+    reset.lock_log = []
+    policy = GreedyPolicy(1)
+    reset.update(reset.run(policy(reset) for _ in range(400)), Action.HOLD)
+    assert reset.lines_cleared and reset.hold
+    reset.reset(seed=2)
+    new = Board(5, seed=2)
+    new.lock_log = []
+    policy = GreedyPolicy(2)
+    for frame in range(600):
+        actions = policy(reset) | (Action.HOLD if frame % 40 == 0 else Action.NONE)
+        reset.update(frame, actions)
+        new.update(frame, actions)
+    for field in ("score", "lines_cleared", "level", "combo_count", "pieces_placed"):
+        assert getattr(reset, field) == getattr(new, field)
+    assert reset.board_arr.masks == new.board_arr.masks
+    assert reset.board_arr.hash == new.board_arr.hash
+    assert reset.mino_provider.minoPreview == new.mino_provider.minoPreview
+    assert reset.hold.minoType == new.hold.minoType
+    assert reset.lock_log == new.lock_log and new.lines_cleared
@@ -0,0 +1,61 @@
+import math
+
+import pytest
+import pyxel
+
+from ttris.controls import Controller, KeyRepeat
+from ttris.enums import Action
+
+
+def testHandlingIsValidated():
+    Controller(0, 0, math.inf)
+    for das, arr, sdf in [(-1, 2, 20), (10, -1, 20), (10, 2, 0), (10, 2, math.nan)]:
+        with pytest.raises(ValueError):
+            Controller(das, arr, sdf)
+
+
+def firingFrames(repeat, frames):
+    # frames a key pressed on frame 0 and held fires on
+    return [frame for frame in range(frames) if repeat.update(frame == 0, True)]
+
+
+def testKeyRepeatTimings():
+    # das 10, arr 2: once on the press, then from frame 10 every other frame
+    assert firingFrames(KeyRepeat(10, 2), 16) == [0, 10, 12, 14]
+    # arr 0 fires every frame once charged
+    assert firingFrames(KeyRepeat(3, 0), 7) == [0, 3, 4, 5, 6]
+    # fractional timings fire on the frame they fall in
+    assert firingFrames(KeyRepeat(1.5, 1.5), 7) == [0, 2, 3, 5, 6]
+    repeat = KeyRepeat(10, 2)
+    firingFrames(repeat, 12)
+    assert repeat.charged and not repeat.update(False, False)
+    assert not repeat.charged
+
+
+def controlFrames(monkeypatch, controller, key, frames, gravity_frames=1):
+    # actions of a key pressed on frame 0 and held
+    frame = 0
+    monkeypatch.setattr(pyxel, "btnp", lambda k: k == key and frame == 0)
+    monkeypatch.setattr(pyxel, "btn", lambda k: k == key)
+    actions = []
+    for frame in range(frames):
+        actions.append(controller.checkControls(gravity_frames))
+    return actions
+
+
+def testArrZeroShiftsOnceCharged(monkeypatch):
+    actions = controlFrames(monkeypatch, Controller(3, 0, 20), pyxel.KEY_LEFT, 5)
+    assert actions == [Action.LEFT, Action.NONE, Action.NONE] + [Action.SHIFT_LEFT] * 2
+
+
+def testSoftDropFollowsGravityTimesSdf(monkeypatch):
+    # gravity of 20 frames a cell at 5x is a cell every 4 frames
+    controller = Controller(10, 2, 5)
+    actions = controlFrames(monkeypatch, controller, pyxel.KEY_DOWN, 13, 20)
+    drops = [frame for frame, action in enumerate(actions) if action]
+    assert drops == [0, 4, 8, 12]
+    assert {actions[frame] for frame in drops} == {Action.SOFT_DROP}
+    # an infinite sdf drops straight to the floor
+    controller = Controller(10, 2, math.inf)
+    actions = controlFrames(monkeypatch, controller, pyxel.KEY_DOWN, 3, 20)
+    assert actions == [Action.SONIC_DROP] * 3
@@ -0,0 +1,65 @@
+import pytest
+
+from ttris.board import Board
+from ttris.corpus import ReplayCorpus
+from ttris.policies import GreedyPolicy
+from ttris.replay import Replay
+
+
+def recordGame(seed, frames=300):
+    replay = Replay(seed, 10, 2, 5)
+    board = Board(5, seed=seed)
+    board.lock_log = []
+    policy = GreedyPolicy(seed)
+    for frame in range(frames):
+        actions = policy(board)
+        replay.record(actions)
+        board.update(frame, actions)
+    return replay, board
+
+
+def testCorpusAppendsIndexesAndReplays(tmp_path):
+    path = str(tmp_path / "games")
+    games = [recordGame(seed) for seed in range(3)]
+    with ReplayCorpus(path) as corpus:
+        # the first game is re-simulated to log its locks
+        assert corpus.append(games[0][0]) == 0
+        for replay, board in games[1:]:
+            corpus.append(replay, board)
+    with ReplayCorpus(path) as corpus:
+        assert len(corpus) == 3
+        for i, (replay, board) in enumerate(games):
+            game = corpus[i]
+            assert (game.seed, game.frames) == (i, 300)
+            assert (
+                game.score == board.score and game.lines_cleared == board.lines_cleared
+            )
+            assert game.lock_count == board.pieces_placed
+            assert corpus.replay(i).runs == replay.runs
+            assert corpus.locks(i) == board.lock_log
+        assert list(corpus) == [corpus[i] for i in range(3)]
+        assert corpus.select(lambda game: game.seed == 1) == [1]
+        assert corpus.rescore() == [board.score for _, board in games]
+        with pytest.raises(IndexError):
+            corpus[3]
+
+
+def testCorpusRejectsBadFiles(tmp_path):
+    path = str(tmp_path / "games")
+    with ReplayCorpus(path) as corpus:
+        corpus.append(recordGame(0, 100)[0])
+    with open(path + ".ttri", "rb") as f:
+        index = f.read()
+    for bad in (b"XXXX" + index[4:], index[:4] + bytes([9]), index[:3]):
+        with open(path + ".ttri", "wb") as f:
+            f.write(bad)
+        with pytest.raises(Exception, match="corpus index"):
+            ReplayCorpus(path)
+    # an index pointing past the end of a truncated data file
+    with open(path + ".ttri", "wb") as f:
+        f.write(index)
+    with open(path + ".ttrd", "r+b") as f:
+        f.truncate(10)
+    with ReplayCorpus(path) as corpus:
+        with pytest.raises(Exception, match="replay"):
+            corpus.replay(0)
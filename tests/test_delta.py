@@ -0,0 +1,52 @@
+from random import Random
+
+from ttris.board import Board
+from ttris.delta import BoardView, DeltaEncoder
+from ttris.enums import Action
+from ttris.policies import GreedyPolicy
+
+
+def viewState(board):
+    board_arr = board.board_arr
+    piece = board.curr_piece
+    return (
+        [list(row) for row in board_arr],
+        board_arr.masks,
+        board_arr.heights,
+        board_arr.block_count,
+        board_arr.hash,
+        (piece.minoType, piece.x, piece.y, piece.spin, piece.hintY),
+        board.hold and board.hold.minoType,
+        board.hold_lock,
+        board.mino_provider.minoPreview,
+        (board.score, board.lines_cleared, board.level, board.combo_count),
+        board.previous_tspin,
+        board.game_over,
+    )
+
+
+def testViewsFollowTheBoard():
+    board = Board(5, seed=2)
+    encoder = DeltaEncoder(board)
+    policy = GreedyPolicy(2)
+    r = Random(2)
+    view, behind = BoardView(), BoardView()
+    lagging = False
+    for frame in range(1500):
+        actions = policy(board)
+        if r.random() < 0.05:
+            actions |= Action.HOLD
+        board.update(frame, actions)
+        keyframe = frame % 100 == 0
+        data = encoder.encode(keyframe)
+        assert view.apply(data) == len(data)
+        assert viewState(view) == viewState(board)
+        # the second view misses some deltas, then waits for a keyframe
+        if 250 <= frame < 330:
+            lagging = True
+        if lagging and not keyframe:
+            continue
+        lagging = False
+        behind.apply(data)
+        assert viewState(behind) == viewState(board)
+    assert behind.synced and board.lines_cleared and not board.game_over
@@ -0,0 +1,26 @@
+from random import Random
+
+import pytest
+
+from ttris.env import TtrisEnv
+
+
+def testPlacementActionsMatchTheActionCount():
+    env = TtrisEnv(seed=0, action_mode="placement")
+    _, info = env.reset()
+    r = Random(0)
+    holds = 0
+    for _ in range(500):
+        count = info["action_count"]
+        assert count == len(env.placements) + (not env.board.hold_lock)
+        # holding isn't an action while hold locked, nor is anything past it
+        for action in (-1, count):
+            with pytest.raises(ValueError):
+                env.step(action)
+        action = r.randrange(count)
+        holds += action == len(env.placements)
+        _, _, terminated, _, info = env.step(action)
+        if terminated:
+            assert info["action_count"] == 0
+            _, info = env.reset()
+    assert holds
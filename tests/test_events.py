@@ -0,0 +1,48 @@
+from boards import boardWithRows
+
+from ttris.enums import Action, TSpinType
+from ttris.events import EventBus, EventLog, EventType
+
+
+def boardWithLog(rows):
+    board = boardWithRows(rows)
+    board.events = EventBus()
+    log = EventLog()
+    board.events.subscribe(log)
+    return board, log
+
+
+def testLineClearEvents():
+    board, log = boardWithLog(["xxx...xxxx"])
+    board.update(1, Action.LEFT)
+    board.update(2, Action.RIGHT)
+    board.update(3, Action.HARD_DROP)
+    events = log.drain()
+    assert [(event.type, event.frame) for event in events] == [
+        (EventType.MOVE, 1),
+        (EventType.MOVE, 2),
+        (EventType.LOCK, 3),
+        (EventType.CLEAR, 3),
+    ]
+    lock = events[-1].data
+    assert events[-2].data is lock
+    assert (lock.lines, lock.tspin, lock.level, lock.combo) == (1, TSpinType.NONE, 1, 1)
+    # the next piece comes in without events of its own, holding it has one
+    held = board.curr_piece.minoType
+    board.update(4, Action.HOLD)
+    assert log.drain() == [(EventType.HOLD, 4, held)]
+
+
+def testLevelUpEvents():
+    board, log = boardWithLog(["xxx...xxxx"])
+    board.lines_cleared_level = board.curr_lc_goal_level - 1
+    board.update(1, Action.HARD_DROP)
+    events = log.drain()
+    # the level goes up before the lock is scored, at the level it locked on
+    assert [event.type for event in events] == [
+        EventType.LEVEL_UP,
+        EventType.LOCK,
+        EventType.CLEAR,
+    ]
+    assert events[0].data == board.level == 2
+    assert events[1].data.level == 1 and board.lines_cleared_level == 0
@@ -0,0 +1,52 @@
+from itertools import cycle, islice
+
+from boards import MINI_SLOT, boardWithRows
+
+from ttris.board import Board
+from ttris.enums import Action, MinoType
+from ttris.movegen import MoveGenerator
+from ttris.tetriminos import Tetrimino
+
+# frames in a row without gravity at level 1, paths are played within them
+FIRST_FRAME = 1
+
+# stacks with overhangs to tuck and spin under
+SHUFFLE = (
+    [Action.LEFT] * 2
+    + [Action.ROTATE_CW, Action.RIGHT, Action.ROTATE_CCW]
+    + [Action.RIGHT] * 3
+    + [Action.HARD_DROP, Action.ROTATE_180, Action.LEFT, Action.HARD_DROP]
+)
+
+
+def stackedBoards():
+    yield boardWithRows(MINI_SLOT)
+    for seed in range(4):
+        board = Board(5, seed=seed)
+        board.run(islice(cycle(SHUFFLE), 40 * seed + 60))
+        if not board.game_over:
+            yield board
+
+
+def testPathsReachTheirPlacements():
+    movegen = MoveGenerator()
+    checked = tspins = 0
+    for board in stackedBoards():
+        snapshot = board.snapshot()
+        for minoType in list(MinoType)[1:8]:
+            board.restore(snapshot)
+            for placement in movegen.placements(board.board_arr, minoType):
+                board.restore(snapshot)
+                board.curr_piece = Tetrimino(minoType)
+                board.curr_piece.updateHint(board.board_arr)
+                *moves, hard_drop = placement.path
+                assert hard_drop == Action.HARD_DROP
+                frame = board.run(moves, FIRST_FRAME)
+                piece = board.curr_piece
+                landing_y = board.board_arr.landingY(piece.state, piece.x, piece.y)
+                assert (piece.x, landing_y, piece.spin) == placement[:3]
+                board.update(frame, hard_drop)
+                assert board.last_lock.tspin == placement.tspin
+                checked += 1
+                tspins += bool(placement.tspin)
+    assert checked and tspins
@@ -0,0 +1,18 @@
+from ttris.board import Board
+from ttris.policies import GreedyPolicy, SearchPolicy
+
+
+def testPoliciesPlayThroughFrames():
+    for policy in (GreedyPolicy(0), SearchPolicy(0)):
+        board = Board(5, seed=0)
+        actions = []
+        for frame in range(600):
+            actions.append(policy(board))
+            board.update(frame, actions[-1])
+        # pieces are steered in over several frames, and the inputs alone play
+        # the game back like a replay would
+        assert 0 < board.pieces_placed < 600 // 3
+        replayed = Board(5, seed=0)
+        replayed.run(actions)
+        assert replayed.score == board.score and replayed.lines_cleared
+        assert replayed.board_arr.masks == board.board_arr.masks
@@ -0,0 +1,50 @@
+import pytest
+
+from ttris.board import Board
+from ttris.enums import Action
+from ttris.policies import GreedyPolicy
+from ttris.replay import HEADER, REPLAY_MAGIC, Replay
+
+
+def recordGame(frames=400):
+    replay = Replay(7, 10, 2, 5, start_frame=3)
+    board = Board(5, seed=7)
+    policy = GreedyPolicy(0)
+    for frame in range(3, 3 + frames):
+        actions = policy(board)
+        # shift and sonic drop flags don't fit in a byte
+        if frame % 50 == 0:
+            actions |= Action.SHIFT_LEFT | Action.SONIC_DROP
+        replay.record(actions)
+        board.update(frame, actions)
+    return replay, board
+
+
+def testReplayRoundTripsAndPlaysBack():
+    replay, board = recordGame()
+    loaded = Replay.fromBytes(replay.toBytes())
+    assert (loaded.seed, loaded.das, loaded.arr, loaded.lookahead) == (7, 10, 2, 5)
+    assert loaded.start_frame == 3 and loaded.runs == replay.runs
+    played = loaded.play()
+    assert played.score == board.score and played.pieces_placed == board.pieces_placed
+    assert played.board_arr.masks == board.board_arr.masks
+
+
+def testReplayReadsVersionOneFiles():
+    # two frames of nothing, then a frame of shift left and sonic drop
+    data = HEADER.pack(REPLAY_MAGIC, 1, 42, 5, 10, 2, 5) + bytes([2, 0, 1, 0x80, 0x0A])
+    replay = Replay.fromBytes(data)
+    assert (replay.seed, replay.start_frame, replay.das, replay.arr) == (42, 5, 10, 2)
+    assert list(replay.actions()) == [0, 0, Action.SHIFT_LEFT | Action.SONIC_DROP]
+
+
+def testReplayRejectsBadFiles():
+    data = recordGame(100)[0].toBytes()
+    for bad in (
+        b"XXXX" + data[4:],
+        data[:4] + bytes([9]) + data[5:],
+        data[: HEADER.size - 1],
+        data[:-1],
+    ):
+        with pytest.raises(Exception, match="replay"):
+            Replay.fromBytes(bad)
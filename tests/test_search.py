@@ -0,0 +1,21 @@
+from ttris.board import Board
+from ttris.enums import Action
+from ttris.search import LookaheadSearch
+
+
+def testSuggestionsFollowThePiece():
+    board = Board(5, seed=1)
+    search = LookaheadSearch(depth=2, use_hold=False)
+    at_spawn = search.suggest(board)
+    assert search.suggest(board) is at_spawn
+
+    # after a few rows of falling and a shift the path starts from there
+    board.run([Action.SOFT_DROP] * 4 + [Action.LEFT], frame=1)
+    suggestion = search.suggest(board)
+    assert suggestion is not at_spawn
+    placement = suggestion.placement
+    *moves, hard_drop = placement.path
+    board.run(moves, frame=6)
+    piece = board.curr_piece
+    landing_y = board.board_arr.landingY(piece.state, piece.x, piece.y)
+    assert (piece.x, landing_y, piece.spin) == placement[:3]
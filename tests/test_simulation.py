@@ -0,0 +1,11 @@
+from ttris.simulation import STAT_FIELDS, GameResult, StatsCollector
+
+
+def testFormatKeepsColumnsApart():
+    collector = StatsCollector()
+    for score in (6909250, 15353282, 16839400):
+        collector.add(GameResult(**dict.fromkeys(GameResult._fields, score)))
+    header, *rows = collector.format().splitlines()
+    assert len(rows) == len(STAT_FIELDS)
+    for row in rows:
+        assert len(row.split()) == len(header.split()) + 1
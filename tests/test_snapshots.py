@@ -0,0 +1,90 @@
+from ttris.board import Board
+from ttris.enums import Action
+from ttris.policies import GreedyPolicy
+from ttris.tetriminos import MinoProvider
+
+
+def gameState(board):
+    piece = board.curr_piece
+    return (
+        board.board_arr.masks[:],
+        (piece.minoType, piece.x, piece.y, piece.spin),
+        board.hold and board.hold.minoType,
+        board.hold_lock,
+        board.mino_provider.minoPreview,
+        board.score,
+        board.scoring.back_to_back,
+        board.lines_cleared,
+        board.combo_count,
+        board.pieces_placed,
+        board.game_over,
+    )
+
+
+def playFrames(board, policy, frames):
+    # play on from the board's frame, returns the inputs and the state after each
+    actions, states = [], []
+    for frame in range(board.frame + 1, board.frame + 1 + frames):
+        actions.append(policy(board))
+        board.update(frame, actions[-1])
+        states.append(gameState(board))
+    return actions, states
+
+
+def testRestoredGameContinuesIdentically():
+    board = Board(5, seed=3)
+    board.lock_log = []
+    playFrames(board, GreedyPolicy(3), 200)
+    snapshot = board.snapshot()
+    locks = len(board.lock_log)
+    actions, states = playFrames(board, GreedyPolicy(4), 400)
+    assert states[0] != states[-1] and len(board.lock_log) > locks
+    board.restore(snapshot)
+    assert len(board.lock_log) == locks
+    for frame, (actions, state) in enumerate(zip(actions, states), board.frame + 1):
+        board.update(frame, actions)
+        assert gameState(board) == state
+
+
+def testRewindAcrossLineClearAndHold():
+    board = Board(5, seed=5)
+    board.keepHistory(3)
+    policy = GreedyPolicy(5)
+    frame = 0
+    rewound = set()
+    while len(rewound) < 2 and frame < 3000:
+        spawned = gameState(board)
+        hold = frame % 3 == 0 and not board.hold_lock
+        if hold:
+            frame += 1
+            board.update(frame, Action.HOLD)
+        lines = board.lines_cleared
+        while gameState(board)[9] == spawned[9]:
+            frame += 1
+            board.update(frame, policy(board))
+        cleared = board.lines_cleared > lines
+        if (hold or cleared) and not board.game_over:
+            # back to when the piece came into play, before the hold and clear
+            assert board.rewind()
+            assert gameState(board) == spawned
+            rewound.add("hold" if hold else "clear")
+            frame += 1
+            board.update(frame, Action.HARD_DROP)
+    assert rewound == {"hold", "clear"}
+
+
+def testProviderRestoresSharedGeneratorState():
+    provider = MinoProvider(5, seed=1)
+    first = provider.snapshot()
+    provider.fetchMinoType()
+    # no new bag was generated, so the generator state is shared
+    assert provider.snapshot()[1] is first[1]
+    after_first = [provider.fetchMinoType() for _ in range(20)]
+    second = provider.snapshot()
+    assert second[1] is not first[1]
+    after_second = [provider.fetchMinoType() for _ in range(20)]
+    for snapshot, minos in ((first, after_first), (second, after_second)) * 2:
+        provider.restore(snapshot)
+        if snapshot is first:
+            provider.fetchMinoType()
+        assert [provider.fetchMinoType() for _ in range(20)] == minos
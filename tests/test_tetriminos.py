@@ -0,0 +1,16 @@
+from ttris.bitboard import BitBoard
+from ttris.constants import BOARD_WIDTH
+from ttris.enums import MinoType
+from ttris.tetriminos import Tetrimino
+
+
+def testBlocksOffTheSidesCollide():
+    board_arr = BitBoard()
+    # a vertical I sits in the third column of its box
+    piece = Tetrimino(MinoType.MINO_I, x=-2, y=5, spin=1)
+    assert not piece.isColliding(board_arr)
+    for x in (-3, BOARD_WIDTH - 2):
+        piece.setPose(x, 5, 1)
+        assert piece.isColliding(board_arr)
+    piece.setPose(BOARD_WIDTH - 3, 5, 1)
+    assert not piece.isColliding(board_arr)
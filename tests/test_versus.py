@@ -0,0 +1,73 @@
+import asyncio
+
+from ttris.garbage import GarbageQueue
+from ttris.policies import GreedyPolicy
+from ttris.versus import (
+    HEADER,
+    INPUT,
+    INPUT_RECORD,
+    JOIN,
+    MAX_INPUTS_AHEAD,
+    MAX_PAYLOAD,
+    Match,
+    VersusClient,
+    VersusServer,
+    packMessage,
+)
+
+
+def testSameFrameAttacksAreSymmetric():
+    # both players make the same moves on the same pieces (and garbage holes),
+    # so they send the same lines on the same frames and neither player should
+    # come out of it ahead
+    match = Match(seed=3)
+    match.garbage = [GarbageQueue(0), GarbageQueue(0)]
+    policies = [GreedyPolicy(0), GreedyPolicy(0)]
+    sent = 0
+    while not match.over:
+        for board, policy, inputs in zip(match.boards, policies, match.inputs):
+            inputs.append(policy(board))
+        match.step()
+        sent += bool(match.garbage[0])
+        assert match.garbage[0].pending == match.garbage[1].pending
+        assert match.boards[0].board_arr.masks == match.boards[1].board_arr.masks
+    assert sent and match.winner is None
+
+
+def testFloodingInputsDropsThePlayer():
+    async def play():
+        server = VersusServer(seed=0)
+        await server.start()
+        clients = [VersusClient(), VersusClient()]
+        try:
+            await asyncio.gather(*(c.connect(port=server.port) for c in clients))
+            flooder = next(c for c in clients if c.index == 0)
+            payload = INPUT_RECORD.pack(0) * (MAX_INPUTS_AHEAD + 1)
+            flooder.writer.write(packMessage(INPUT, payload))
+            other = clients[1 - clients.index(flooder)]
+            while await other.receive():
+                pass
+            return other.winner
+        finally:
+            for client in clients:
+                await client.close()
+            await server.close()
+
+    assert asyncio.run(asyncio.wait_for(play(), 10)) == 1
+
+
+def testOversizedMessageClosesTheConnection():
+    async def connect():
+        server = VersusServer(seed=0)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            # a length the server would otherwise wait on forever
+            writer.write(HEADER.pack(JOIN, MAX_PAYLOAD + 1))
+            closed = await reader.read() == b""
+            writer.close()
+            return closed
+        finally:
+            await server.close()
+
+    assert asyncio.run(asyncio.wait_for(connect(), 10))
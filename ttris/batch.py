@@ -0,0 +1,483 @@
+from operator import attrgetter
+from typing import Sequence
+
+import numpy as np
+
+from ttris.constants import (
+    BOARD_HEIGHT,
+    BOARD_WIDTH,
+    LEVEL_GRAVITY_FRAMES,
+    LINE_CLEARS_LEVEL,
+    LOCK_DELAY,
+    MAX_LEVEL,
+    MAX_LOCKS,
+    SRS_TESTS,
+    SRS_TESTS_I,
+)
+from ttris.enums import Action, MinoType, TSpinType
+from ttris.rotations import ROTATION_STATES
+from ttris.scoring import (
+    BACK_TO_BACK_PERFECT_TETRIS_POINTS,
+    COMBO_POINTS,
+    HARD_DROP_POINTS,
+    LINE_POINTS,
+    PERFECT_CLEAR_POINTS,
+    SOFT_DROP_POINTS,
+    TSPIN_MINI_POINTS,
+    TSPIN_POINTS,
+)
+from ttris.tetriminos import MinoProvider
+
+# x/y offsets of the 4 blocks of every rotation state, indexed by [minoType][spin]
+_CELLS_X = np.zeros((8, 4, 4), dtype=np.int64)
+_CELLS_Y = np.zeros((8, 4, 4), dtype=np.int64)
+for _minoType, _states in ROTATION_STATES.items():
+    for _spin, _state in enumerate(_states):
+        _CELLS_X[_minoType.value, _spin] = [x for x, _ in _state.cells]
+        _CELLS_Y[_minoType.value, _spin] = [y for _, y in _state.cells]
+
+# collisions are checked on int64 row masks like BitBoard's, with column x at
+# bit x + _PAD and every other bit set as a wall. Rows above and below the board
+# are full, the ones below leave room to look a whole board height down
+_PAD = 5
+_TOP = 6
+_BOTTOM = BOARD_HEIGHT + 4
+_BITS = np.int64(1) << (np.arange(BOARD_WIDTH, dtype=np.int64) + _PAD)
+_WALLS = ~np.int64(((1 << BOARD_WIDTH) - 1) << _PAD)
+_FULL = np.int64(-1)
+_ROWS = np.arange(4)
+# masks of the 4 rows of every rotation state at x = 0, by [minoType][spin]
+_ROW_MASKS = np.zeros((8, 4, 4), dtype=np.int64)
+for _minoType, _states in ROTATION_STATES.items():
+    for _spin, _state in enumerate(_states):
+        for _x, _y in _state.cells:
+            _ROW_MASKS[_minoType.value, _spin, _y] |= 1 << _x
+
+# SRS kicks padded to 6 tests, indexed by [is I piece][spin][direction % 4]
+_KICKS = np.zeros((2, 4, 4, 6, 2), dtype=np.int64)
+_KICK_COUNTS = np.zeros((2, 4, 4), dtype=np.int64)
+for _i, _tests in enumerate((SRS_TESTS, SRS_TESTS_I)):
+    for _spin, _spin_tests in enumerate(_tests):
+        for _direction, _kicks in enumerate(_spin_tests):
+            _KICK_COUNTS[_i, _spin, _direction] = len(_kicks)
+            for _k, _kick in enumerate(_kicks):
+                _KICKS[_i, _spin, _direction, _k] = _kick
+
+# T-spin corners around a T piece, in the order they face for each spin
+_T_CORNERS = np.array([(0, 0), (2, 0), (2, 2), (0, 2)], dtype=np.int64)
+
+_GRAVITY_FRAMES = np.array(LEVEL_GRAVITY_FRAMES, dtype=np.int64)
+_LINE_CLEARS_LEVEL = np.array(LINE_CLEARS_LEVEL, dtype=np.int64)
+
+# Scoring's tables, by lines cleared
+_LINE_POINTS = np.array(LINE_POINTS, dtype=np.int64)
+_TSPIN_POINTS = np.array(TSPIN_POINTS + TSPIN_POINTS[-1:], dtype=np.int64)
+_TSPIN_MINI_POINTS = np.array(
+    TSPIN_MINI_POINTS + TSPIN_MINI_POINTS[-1:] * 2, dtype=np.int64
+)
+_PERFECT_CLEAR_POINTS = np.array(PERFECT_CLEAR_POINTS, dtype=np.int64)
+
+_QUEUE_SIZE = 21  # minos buffered per game, refilled from its MinoProvider
+_MINO_VALUE = attrgetter("_value_")
+
+
+class BatchBoard:
+    # N independent games stepped together with vectorized numpy operations.
+    # every game follows exactly the same rules as a Board created with the same
+    # seed and driven with the same actions through Board.run
+    def __init__(self, seeds: Sequence[int], lookahead: int = 5):
+        n = len(seeds)
+        self.lookahead = lookahead
+        self.mino_providers = [MinoProvider(lookahead, seed) for seed in seeds]
+        self.boards = np.zeros((n, BOARD_HEIGHT, BOARD_WIDTH), dtype=np.uint8)
+        self.masks = np.full((n, _TOP + BOARD_HEIGHT + _BOTTOM), _FULL)
+        self.masks[:, _TOP : _TOP + BOARD_HEIGHT] = _WALLS
+        # every window of BOARD_HEIGHT + 4 rows, from each row down
+        self._windows = np.lib.stride_tricks.sliding_window_view(
+            self.masks, BOARD_HEIGHT + 4, axis=1
+        )
+
+        # buffered mino sequence of every game, consumed from queue_pos onwards
+        self.queue = np.zeros((n, _QUEUE_SIZE), dtype=np.int64)
+        self.queue_pos = np.full(n, _QUEUE_SIZE, dtype=np.int64)
+        self._refillQueues(np.arange(n))
+
+        # current piece of every game
+        self.piece = np.zeros(n, dtype=np.int64)
+        self.x = np.zeros(n, dtype=np.int64)
+        self.y = np.zeros(n, dtype=np.int64)
+        self.spin = np.zeros(n, dtype=np.int64)
+        self.lock_delay_start = np.zeros(n, dtype=np.int64)
+        self.lock_resets = np.zeros(n, dtype=np.int64)
+        # whether the last successful rotation used a TST kick
+        self.tst_kick = np.zeros(n, dtype=bool)
+        # t-spin type of the last rotation of the current piece, until it moves
+        self.piece_tspin = np.zeros(n, dtype=np.int64)
+        # cells the current piece was soft dropped, and hard dropped on a lock
+        self.soft_drop_cells = np.zeros(n, dtype=np.int64)
+        self.hard_drop_cells = np.zeros(n, dtype=np.int64)
+
+        # held piece (0 when empty), held pieces keep their lock resets and kick
+        self.hold = np.zeros(n, dtype=np.int64)
+        self.hold_lock = np.zeros(n, dtype=bool)
+        self.hold_lock_resets = np.zeros(n, dtype=np.int64)
+        self.hold_tst_kick = np.zeros(n, dtype=bool)
+
+        self.frame = np.zeros(n, dtype=np.int64)
+        self.level = np.ones(n, dtype=np.int64)
+        self.previous_lc = np.zeros(n, dtype=np.int64)
+        self.lines_cleared = np.zeros(n, dtype=np.int64)
+        self.lines_cleared_level = np.zeros(n, dtype=np.int64)
+        self.combo_count = np.zeros(n, dtype=np.int64)
+        self.previous_tspin = np.zeros(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.pieces_placed = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.back_to_back = np.zeros(n, dtype=bool)
+        # t-spin type and soft dropped cells of the pieces placed this frame
+        self._lock_tspin = np.zeros(n, dtype=np.int64)
+        self._lock_soft_drop = np.zeros(n, dtype=np.int64)
+
+        self._spawn(np.arange(n))
+
+    def __len__(self) -> int:
+        return len(self.boards)
+
+    @property
+    def mino_preview(self) -> np.ndarray:
+        # (N, lookahead) array of the next mino types of every game
+        cols = self.queue_pos[:, None] + np.arange(self.lookahead)
+        return np.take_along_axis(self.queue, cols, axis=1)
+
+    def step(self, actions) -> None:
+        # advance every running game by one frame, applying one Action bitmask
+        # per game (same order of operations as Board.update)
+        actions = np.asarray(actions, dtype=np.int64)
+        active = ~self.game_over
+        frame = self.frame
+        placed = np.zeros(len(self), dtype=bool)
+
+        self._hold(np.flatnonzero(active & (actions & Action.HOLD != 0)))
+        hard_drop = np.flatnonzero(active & (actions & Action.HARD_DROP != 0))
+        self._place(hard_drop, hard_drop=True)
+        placed[hard_drop] = True
+
+        rotated = np.zeros(len(self), dtype=bool)
+        not_o = self.piece != MinoType.MINO_O.value
+        for action, direction in (
+            (Action.ROTATE_CW, 1),
+            (Action.ROTATE_CCW, -1),
+            (Action.ROTATE_180, 2),
+        ):
+            idx = np.flatnonzero(active & not_o & (actions & action != 0))
+            rotated[idx[self._rotate(idx, direction)]] = True
+        self._checkTSpin(
+            np.flatnonzero(rotated & (self.piece == MinoType.MINO_T.value))
+        )
+
+        # a t-spin only counts if the piece locks without moving after its
+        # last rotation
+        moved = np.zeros(len(self), dtype=bool)
+        for action, dx in ((Action.LEFT, -1), (Action.RIGHT, 1)):
+            idx = np.flatnonzero(active & (actions & action != 0))
+            moved[self._move(idx, dx, 0)] = True
+        for action, dx in ((Action.SHIFT_LEFT, -1), (Action.SHIFT_RIGHT, 1)):
+            idx = np.flatnonzero(active & (actions & action != 0))
+            moved[self._shift(idx, dx)] = True
+        soft = np.flatnonzero(active & (actions & Action.SOFT_DROP != 0))
+        soft = self._move(soft, 0, 1)
+        self.soft_drop_cells[soft] += 1
+        moved[soft] = True
+        sonic = np.flatnonzero(active & (actions & Action.SONIC_DROP != 0))
+        landing = self._landingY(sonic)
+        self.soft_drop_cells[sonic] += landing - self.y[sonic]
+        moved[sonic[landing != self.y[sonic]]] = True
+        self.y[sonic] = landing
+
+        # piece gravity
+        timer = _GRAVITY_FRAMES[self.level - 1]
+        instant = np.flatnonzero(active & (timer == 0))
+        landing = self._landingY(instant)
+        moved[instant[landing != self.y[instant]]] = True
+        self.y[instant] = landing
+        fall = np.flatnonzero(
+            active & (timer != 0) & (frame % np.maximum(timer, 1) == 0)
+        )
+        moved[self._move(fall, 0, 1)] = True
+        self.piece_tspin[moved] = TSpinType.NONE.value
+
+        # lock delay, place the piece if it has expired
+        idx = np.flatnonzero(active & (self.lock_resets < MAX_LOCKS))
+        grounded = ~self._fits(
+            idx, self.piece[idx], self.spin[idx], self.x[idx], self.y[idx] + 1
+        )
+        start = self.lock_delay_start[idx]
+        self.lock_delay_start[idx] = np.where(
+            grounded, np.where(start == -1, frame[idx], start), -1
+        )
+        expired = np.flatnonzero(
+            active
+            & (self.lock_delay_start != -1)
+            & (frame - self.lock_delay_start > LOCK_DELAY)
+        )
+        self._place(expired, hard_drop=False)
+        placed[expired] = True
+
+        self._clearLines(np.flatnonzero(placed))
+        self.frame[active] += 1
+        self._refillQueues(
+            np.flatnonzero(self.queue_pos > _QUEUE_SIZE - self.lookahead - 2)
+        )
+
+    def _refillQueues(self, idx: np.ndarray) -> None:
+        # move the unused minos to the front and top up from each game's provider
+        queue = self.queue
+        for i, pos in zip(idx.tolist(), self.queue_pos[idx].tolist()):
+            row = queue[i]
+            row[: _QUEUE_SIZE - pos] = row[pos:]
+            row[_QUEUE_SIZE - pos :] = list(
+                map(_MINO_VALUE, self.mino_providers[i].fetchMinoTypes(pos))
+            )
+        self.queue_pos[idx] = 0
+
+    def _nextMinos(self, idx: np.ndarray) -> np.ndarray:
+        minos = self.queue[idx, self.queue_pos[idx]]
+        self.queue_pos[idx] += 1
+        return minos
+
+    def _fits(self, idx, piece, spin, x, y) -> np.ndarray:
+        # vectorized Tetrimino.fits for the games in idx
+        rows = self.masks[idx[:, None], y[:, None] + (_TOP + _ROWS)]
+        return ~np.any(rows & (_ROW_MASKS[piece, spin] << (x + _PAD)[:, None]), axis=1)
+
+    def _landingY(self, idx: np.ndarray) -> np.ndarray:
+        # check every row below the pieces at once and stop at the first misfit
+        y = self.y[idx]
+        rows = self._windows[idx, y + _TOP]
+        masks = (
+            _ROW_MASKS[self.piece[idx], self.spin[idx]] << (self.x[idx] + _PAD)[:, None]
+        )
+        hits = rows[:, : BOARD_HEIGHT + 1] & masks[:, :1]
+        for dy in range(1, 4):
+            hits |= rows[:, dy : dy + BOARD_HEIGHT + 1] & masks[:, dy : dy + 1]
+        return y + np.argmax(hits != 0, axis=1) - 1
+
+    def _resetLock(self, idx: np.ndarray) -> None:
+        # a successful move or rotation resets an active lock delay
+        started = self.lock_delay_start[idx] != -1
+        self.lock_resets[idx[started]] += 1
+        self.lock_delay_start[idx[self.lock_resets[idx] < MAX_LOCKS]] = -1
+
+    def _move(self, idx: np.ndarray, dx: int, dy: int) -> np.ndarray:
+        # returns the games whose piece moved
+        ok = self._fits(
+            idx, self.piece[idx], self.spin[idx], self.x[idx] + dx, self.y[idx] + dy
+        )
+        idx = idx[ok]
+        self.x[idx] += dx
+        self.y[idx] += dy
+        if dx:  # soft drops don't reset the lock delay
+            self._resetLock(idx)
+        return idx
+
+    def _shift(self, idx: np.ndarray, dx: int) -> np.ndarray:
+        # slide the pieces as far as they go, counting as one move each
+        start = self.x[idx]
+        moving = idx
+        while len(moving):
+            moving = moving[
+                self._fits(
+                    moving,
+                    self.piece[moving],
+                    self.spin[moving],
+                    self.x[moving] + dx,
+                    self.y[moving],
+                )
+            ]
+            self.x[moving] += dx
+        idx = idx[self.x[idx] != start]
+        self._resetLock(idx)
+        return idx
+
+    def _rotate(self, idx: np.ndarray, direction: int) -> np.ndarray:
+        # try the SRS kicks in order, returns which of the games rotated
+        piece, spin = self.piece[idx], self.spin[idx]
+        new_spin = (spin + direction) % 4
+        is_i = (piece == MinoType.MINO_I.value).astype(np.int64)
+        kicks = _KICKS[is_i, spin, direction % 4]
+        counts = _KICK_COUNTS[is_i, spin, direction % 4]
+        kick = np.full(len(idx), -1)
+        for k in range(kicks.shape[1] if len(idx) else 0):
+            todo = np.flatnonzero((kick == -1) & (k < counts))
+            if not len(todo):
+                break
+            ok = self._fits(
+                idx[todo],
+                piece[todo],
+                new_spin[todo],
+                self.x[idx[todo]] + kicks[todo, k, 0],
+                self.y[idx[todo]] - kicks[todo, k, 1],
+            )
+            kick[todo[ok]] = k
+        rotated = kick != -1
+        done = idx[rotated]
+        test_x, test_y = kicks[rotated, kick[rotated]].T
+        self.spin[done] = new_spin[rotated]
+        self.x[done] += test_x
+        self.y[done] -= test_y
+        self.tst_kick[done] = (np.abs(test_x) == 1) & (test_y == -2)
+        self._resetLock(done)
+        return rotated
+
+    def _checkTSpin(self, idx: np.ndarray) -> None:
+        # vectorized Tetrimino.checkTSpin for T pieces that just rotated, the
+        # walls and the rows around the board count as filled corners
+        rows = self.masks[idx[:, None], self.y[idx, None] + (_TOP + _T_CORNERS[:, 1])]
+        filled = rows >> (self.x[idx, None] + (_PAD + _T_CORNERS[:, 0])) & 1 != 0
+        spin = self.spin[idx]
+        rows = np.arange(len(idx))
+        forward = filled[rows, spin].astype(int) + filled[rows, (spin + 1) % 4]
+        tspin = np.where(
+            filled.sum(axis=1) < 3,
+            TSpinType.NONE.value,
+            np.where(forward < 2, TSpinType.MINI.value, TSpinType.TSPIN.value),
+        )
+        tspin[self.tst_kick[idx]] = TSpinType.TSPIN.value
+        self.piece_tspin[idx] = tspin
+        spun = tspin != TSpinType.NONE.value
+        self.previous_tspin[idx[spun]] = tspin[spun]
+
+    def _hold(self, idx: np.ndarray) -> None:
+        idx = idx[~self.hold_lock[idx]]
+        held = self.hold[idx]
+        empty = held == 0
+        held[empty] = self._nextMinos(idx[empty])
+        lock_resets = np.where(empty, 0, self.hold_lock_resets[idx])
+        tst_kick = ~empty & self.hold_tst_kick[idx]
+
+        self.hold[idx] = self.piece[idx]
+        self.hold_lock_resets[idx] = self.lock_resets[idx]
+        self.hold_tst_kick[idx] = self.tst_kick[idx]
+        self.piece[idx] = held
+        self.x[idx] = 3
+        self.y[idx] = 2
+        self.spin[idx] = 0
+        self.lock_delay_start[idx] = -1
+        self.lock_resets[idx] = lock_resets
+        self.tst_kick[idx] = tst_kick
+        self.piece_tspin[idx] = TSpinType.NONE.value
+        self.soft_drop_cells[idx] = 0
+        self.hold_lock[idx] = True
+        # like a spawn, the game is over if the piece coming in can't fit
+        self._checkSpawn(idx)
+
+    def _place(self, idx: np.ndarray, hard_drop: bool) -> None:
+        # hard drop the current pieces onto their boards and spawn new ones
+        y = self._landingY(idx)
+        self.hard_drop_cells[idx] = y - self.y[idx] if hard_drop else 0
+        # dropped after its last rotation, so not a t-spin
+        self.piece_tspin[idx[y != self.y[idx]]] = TSpinType.NONE.value
+        self._lock_tspin[idx] = self.piece_tspin[idx]
+        self._lock_soft_drop[idx] = self.soft_drop_cells[idx]
+        piece, spin, x = self.piece[idx], self.spin[idx], self.x[idx]
+        self.boards[
+            idx[:, None],
+            y[:, None] + _CELLS_Y[piece, spin],
+            x[:, None] + _CELLS_X[piece, spin],
+        ] = piece[:, None]
+        self.masks[idx[:, None], y[:, None] + (_TOP + _ROWS)] |= (
+            _ROW_MASKS[piece, spin] << (x + _PAD)[:, None]
+        )
+        self.pieces_placed[idx] += 1
+        self._spawn(idx)
+        self.hold_lock[idx] = False
+
+    def _spawn(self, idx: np.ndarray) -> None:
+        self.piece[idx] = self._nextMinos(idx)
+        self.x[idx] = 3
+        self.y[idx] = 2
+        self.spin[idx] = 0
+        self.lock_delay_start[idx] = -1
+        self.lock_resets[idx] = 0
+        self.tst_kick[idx] = False
+        self.piece_tspin[idx] = TSpinType.NONE.value
+        self.soft_drop_cells[idx] = 0
+        self._checkSpawn(idx)
+
+    def _checkSpawn(self, idx: np.ndarray) -> None:
+        # top out the games whose new piece overlaps the stack
+        fits = self._fits(
+            idx, self.piece[idx], self.spin[idx], self.x[idx], self.y[idx]
+        )
+        self.game_over[idx[~fits]] = True
+
+    def _clearLines(self, idx: np.ndarray) -> None:
+        # clear full rows of the games that placed a piece this frame, then
+        # score their locks like Scoring.lock
+        board_rows = slice(_TOP, _TOP + BOARD_HEIGHT)
+        full = self.masks[idx, board_rows] == _FULL
+        counts = full.sum(axis=1)
+        level = self.level[idx]
+
+        # no line clears, but a piece was placed
+        missed = idx[counts == 0]
+        self.combo_count[missed] = 0
+        self.previous_lc[missed] = 0
+        self.previous_tspin[missed] = TSpinType.NONE.value
+
+        cleared = counts > 0
+        lines_idx, full, lines = idx[cleared], full[cleared], counts[cleared]
+        if len(lines_idx):
+            # stable sort full rows to the top, then empty them
+            order = np.argsort(~full, axis=1, kind="stable")
+            boards = np.take_along_axis(
+                self.boards[lines_idx], order[:, :, None], axis=1
+            )
+            boards[np.take_along_axis(full, order, axis=1)] = 0
+            self.boards[lines_idx] = boards
+            self.masks[lines_idx, board_rows] = (boards != 0) @ _BITS | _WALLS
+
+            self.lines_cleared[lines_idx] += lines
+            self.combo_count[lines_idx] += 1
+            self.lines_cleared_level[lines_idx] += lines
+            goal = _LINE_CLEARS_LEVEL[self.level[lines_idx] - 1]
+            level_up = (self.lines_cleared_level[lines_idx] >= goal) & (
+                self.level[lines_idx] < MAX_LEVEL
+            )
+            self.lines_cleared_level[lines_idx[level_up]] -= goal[level_up]
+            self.level[lines_idx[level_up]] += 1
+            self.previous_lc[lines_idx] = lines
+        self._scoreLocks(idx, counts, level)
+
+    def _scoreLocks(self, idx: np.ndarray, lines: np.ndarray, level: np.ndarray):
+        tspin = self._lock_tspin[idx]
+        points = np.where(
+            tspin == TSpinType.TSPIN.value,
+            _TSPIN_POINTS[lines],
+            np.where(
+                tspin == TSpinType.MINI.value,
+                _TSPIN_MINI_POINTS[lines],
+                _LINE_POINTS[lines],
+            ),
+        )
+        # t-spins without lines neither continue nor break back-to-backs
+        difficult = (lines == 4) | (tspin != TSpinType.NONE.value)
+        back_to_back = (lines > 0) & difficult & self.back_to_back[idx]
+        points = np.where(back_to_back, points * 3 // 2, points)
+        self.back_to_back[idx] = np.where(lines > 0, difficult, self.back_to_back[idx])
+        combo = self.combo_count[idx]
+        points += COMBO_POINTS * np.maximum(combo - 1, 0)
+        perfect_clear = (lines > 0) & ~self.boards[idx].any(axis=(1, 2))
+        points += np.where(
+            perfect_clear,
+            np.where(
+                (lines == 4) & back_to_back,
+                BACK_TO_BACK_PERFECT_TETRIS_POINTS,
+                _PERFECT_CLEAR_POINTS[lines],
+            ),
+            0,
+        )
+        points *= level
+        points += SOFT_DROP_POINTS * self._lock_soft_drop[idx]
+        points += HARD_DROP_POINTS * self.hard_drop_cells[idx]
+        self.score[idx] += points
@@ -0,0 +1,261 @@
+from itertools import compress
+from operator import is_not
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from ttris.constants import BOARD_HEIGHT, BOARD_WIDTH
+from ttris.enums import MinoType
+from ttris.metrics import (
+    FULL_ROW_MASK,
+    ROW_BLOCKS,
+    BoardMetrics,
+    columnHeights,
+    heightMetrics,
+)
+from ttris.rotations import RotationState
+from ttris.zobrist import boardKey, rowKey
+
+EMPTY_ROW = (MinoType.NO_MINO,) * BOARD_WIDTH
+
+
+class BitBoardSnapshot(NamedTuple):
+    # rows are tuples shared with the snapshots before and after it for as long
+    # as they stay unchanged, so a snapshot copies only the rows that changed
+    rows: Tuple[Tuple[MinoType, ...], ...]
+    masks: Tuple[int, ...]
+    heights: Tuple[int, ...]
+    block_count: int
+    hash: int
+    full_rows: Tuple[int, ...]
+
+
+class BitBoard(list):
+    # a board of MinoType rows (indexed as board[y][x] like a plain
+    # List[List[MinoType]]) that also keeps one int bitmask per row, where bit x
+    # is set when column x is occupied, so collision checks are integer ANDs
+    def __init__(self):
+        super().__init__([MinoType.NO_MINO] * BOARD_WIDTH for _ in range(BOARD_HEIGHT))
+        self.masks: List[int] = [0] * BOARD_HEIGHT
+        # surface height of each column (0 for an empty column), kept up to date
+        # on every placement and line clear
+        self.heights: List[int] = [0] * BOARD_WIDTH
+        # number of blocks on the board (0 after a perfect clear)
+        self.block_count: int = 0
+        # zobrist hash of the filled cells, kept up to date like the heights
+        self.hash: int = 0
+        # bumped whenever rows move (line clears, garbage, resets, restores),
+        # until then a row only changes by getting blocks added
+        self.row_moves: int = 0
+        # rows filled up by placed minos that have not been cleared yet
+        self.full_rows: List[int] = []
+        # every row as a tuple for snapshots, None for a row changed since its
+        # last snapshot (code writing cells straight into a row sets it to None)
+        self.row_tuples: List[Optional[tuple]] = [EMPTY_ROW] * BOARD_HEIGHT
+
+    def reset(self) -> None:
+        # empty the board, reusing its row lists
+        for row in self:
+            row[:] = EMPTY_ROW
+        self.masks[:] = (0,) * BOARD_HEIGHT
+        self.heights[:] = (0,) * BOARD_WIDTH
+        self.block_count = 0
+        self.hash = 0
+        self.row_moves += 1
+        self.full_rows.clear()
+        self.row_tuples[:] = (EMPTY_ROW,) * BOARD_HEIGHT
+
+    def snapshot(self) -> BitBoardSnapshot:
+        row_tuples = self.row_tuples
+        if None in row_tuples:
+            for y, row in enumerate(row_tuples):
+                if row is None:
+                    row_tuples[y] = tuple(self[y])
+        return BitBoardSnapshot(
+            tuple(row_tuples),
+            tuple(self.masks),
+            tuple(self.heights),
+            self.block_count,
+            self.hash,
+            tuple(self.full_rows),
+        )
+
+    def restore(self, snapshot: BitBoardSnapshot) -> None:
+        # only rows that aren't the snapshot's own (shared) tuples get copied
+        row_tuples = self.row_tuples
+        rows = snapshot.rows
+        for y in compress(range(BOARD_HEIGHT), map(is_not, row_tuples, rows)):
+            self[y][:] = rows[y]
+        row_tuples[:] = rows
+        self.masks[:] = snapshot.masks
+        self.heights[:] = snapshot.heights
+        self.block_count = snapshot.block_count
+        self.hash = snapshot.hash
+        self.full_rows[:] = snapshot.full_rows
+        self.row_moves += 1
+
+    def rebuild(self, rows: Iterable[int] = range(BOARD_HEIGHT)) -> None:
+        # bring the masks, heights, block count and hash back in line with the
+        # cells after code wrote straight into `rows`
+        masks = self.masks
+        row_tuples = self.row_tuples
+        for y in rows:
+            masks[y] = sum(
+                1 << x
+                for x, block in enumerate(self[y])
+                if block is not MinoType.NO_MINO
+            )
+            row_tuples[y] = None
+        self.heights[:] = columnHeights(masks)
+        self.block_count = sum(ROW_BLOCKS[mask] for mask in masks)
+        self.hash = boardKey(masks)
+        self.full_rows[:] = [y for y, mask in enumerate(masks) if mask == FULL_ROW_MASK]
+        self.row_moves += 1
+
+    def fits(self, state: RotationState, x: int, y: int) -> bool:
+        # check if a mino rotation placed at x, y is in bounds and not colliding
+        i = x + state.min_col
+        if (
+            not 0 <= i < len(state.x_masks)
+            or y + state.min_row < 0
+            or y + state.max_row >= BOARD_HEIGHT
+        ):
+            return False
+        board_masks = self.masks
+        for dy, mask in state.x_masks[i]:
+            if board_masks[y + dy] & mask:
+                return False
+        return True
+
+    def dropY(self, state: RotationState, x: int, y: int) -> int:
+        # lowest y a mino rotation at x, y can fall to without colliding
+        x_masks = state.x_masks[x + state.min_col]
+        board_masks = self.masks
+        last_y = BOARD_HEIGHT - 1 - state.max_row
+        while y < last_y:
+            for dy, mask in x_masks:
+                if board_masks[y + 1 + dy] & mask:
+                    return y
+            y += 1
+        return y
+
+    def slideX(self, state: RotationState, x: int, y: int, direction: int) -> int:
+        # farthest x a mino rotation at x, y can slide to in `direction` (-1 or
+        # 1), read off each row's nearest blocked column in one step instead of
+        # testing every x on the way (every row of a mino is one solid run)
+        board_masks = self.masks
+        distance = BOARD_WIDTH
+        for dy, mask in state.x_masks[x + state.min_col]:
+            row = board_masks[y + dy]
+            if direction < 0:
+                lo = (mask & -mask).bit_length() - 1
+                free = lo - (row & ((1 << lo) - 1)).bit_length()
+            else:
+                hi = mask.bit_length()
+                above = row >> hi
+                free = (above & -above).bit_length() - 1 if above else BOARD_WIDTH - hi
+            if free < distance:
+                distance = free
+        return x + distance * direction
+
+    def landingY(self, state: RotationState, x: int, y: int) -> int:
+        # same as dropY, but read straight off the column heights when the mino
+        # is above the surface of every column it covers
+        heights = self.heights
+        landing_y = BOARD_HEIGHT
+        for dx, bottom in state.col_bottoms:
+            surface_y = BOARD_HEIGHT - heights[x + dx]
+            if y + bottom >= surface_y:
+                # mino is tucked under the surface, drop it row by row instead
+                return self.dropY(state, x, y)
+            if surface_y - 1 - bottom < landing_y:
+                landing_y = surface_y - 1 - bottom
+        return landing_y
+
+    def placeMino(self, mino) -> None:
+        # stamp a mino's blocks onto the board
+        state = mino.state
+        masks = self.masks
+        row_tuples = self.row_tuples
+        for dy, mask in state.x_masks[mino.x + state.min_col]:
+            y = mino.y + dy
+            row = self[y]
+            masks[y] |= mask
+            row_tuples[y] = None
+            self.hash ^= rowKey(y, mask)
+            # a row can only become full when a block is placed in it
+            if masks[y] == FULL_ROW_MASK:
+                self.full_rows.append(y)
+            x = 0
+            while mask:
+                if mask & 1:
+                    row[x] = mino.minoType
+                mask >>= 1
+                x += 1
+        self.block_count += len(state.cells)
+        heights = self.heights
+        for dx, dy in state.cells:
+            height = BOARD_HEIGHT - mino.y - dy
+            if height > heights[mino.x + dx]:
+                heights[mino.x + dx] = height
+
+    def clearFullRows(self) -> None:
+        self.clearRows(self.full_rows)
+        self.full_rows.clear()
+
+    def clearRows(self, rows: List[int]) -> None:
+        # remove the given rows and shift everything above them down, reusing
+        # the removed row lists (emptied) as the new rows at the top
+        masks = self.masks
+        row_tuples = self.row_tuples
+        self.row_moves += 1
+        # only the rows down to the lowest cleared one move
+        moved = max(rows, default=-1) + 1
+        self.hash ^= boardKey(masks[:moved])
+        for i in sorted(rows):
+            row = self.pop(i)
+            row[:] = EMPTY_ROW
+            self.insert(0, row)
+            del masks[i]
+            masks.insert(0, 0)
+            del row_tuples[i]
+            row_tuples.insert(0, EMPTY_ROW)
+        self.block_count -= BOARD_WIDTH * len(rows)
+        self.hash ^= boardKey(masks[:moved])
+        # cleared rows are full, so every column loses one block per row, and
+        # columns whose top block was cleared sink down to the next block left
+        heights = self.heights
+        for x in range(BOARD_WIDTH):
+            height = heights[x] - len(rows)
+            while height > 0 and not masks[BOARD_HEIGHT - height] & (1 << x):
+                height -= 1
+            heights[x] = height
+
+    def metrics(self) -> BoardMetrics:
+        # holes, heights, bumpiness and wells, from the heights kept up to date
+        return heightMetrics(self.heights, self.block_count)
+
+    def addGarbage(self, count: int, hole: int) -> bool:
+        # push the stack up by `count` garbage rows that are filled except for
+        # the `hole` column, returns false if blocks got pushed off the top
+        masks = self.masks
+        pushed_off = masks[:count]
+        self.block_count += (BOARD_WIDTH - 1) * count - sum(
+            ROW_BLOCKS[mask] for mask in pushed_off
+        )
+        self.row_moves += 1
+        garbage_mask = FULL_ROW_MASK & ~(1 << hole)
+        for _ in range(count):
+            row = self.pop(0)
+            row[:] = EMPTY_ROW
+            row[:hole] = [MinoType.GARBAGE] * hole
+            row[hole + 1 :] = [MinoType.GARBAGE] * (BOARD_WIDTH - hole - 1)
+            self.append(row)
+            del masks[0]
+            masks.append(garbage_mask)
+            del self.row_tuples[0]
+            self.row_tuples.append(None)
+        heights = self.heights
+        for x in range(BOARD_WIDTH):
+            if heights[x] or x != hole:
+                heights[x] = min(heights[x] + count, BOARD_HEIGHT)
+        self.hash = boardKey(masks)
+        return not any(pushed_off)
@@ -1,41 +1,96 @@
-from typing import List
-
-import pyxel
+from collections import deque
+from operator import attrgetter
+from typing import Deque, Iterable, List, NamedTuple, Optional, Tuple
 
+from ttris.bitboard import BitBoard, BitBoardSnapshot
 from ttris.constants import (
-    BLOCK_SIZE,
-    BOARD_HEIGHT,
-    BOARD_WIDTH,
-    BOARD_X,
-    BOARD_Y,
     LEVEL_GRAVITY_FRAMES,
     LINE_CLEARS_LEVEL,
     MAX_LEVEL,
-    OVERFLOW_HEIGHT,
 )
-from ttris.controls import Controller
-from ttris.enums import MinoType, TSpinType
-from ttris.score import Score
-from ttris.sound import SoundBoard
+from ttris.enums import Action, RotationDirection, TSpinType
+from ttris.events import EventBus, EventType
+from ttris.metrics import EMPTY_METRICS, BoardMetrics
+from ttris.scoring import LockEvent, Scoring
 from ttris.tetriminos import MinoProvider, Tetrimino
 
+# the board's own game state that snapshots keep (besides the stack, pieces
+# and queue), all immutable values
+SNAPSHOT_FIELDS = (
+    "frame",
+    "level",
+    "previous_lc",
+    "lines_cleared",
+    "lines_cleared_level",
+    "combo_count",
+    "hard_drop_tick",
+    "score",
+    "hard_drop_cells",
+    "soft_drop_cells",
+    "piece_tspin",
+    "previous_tspin",
+    "last_lock",
+    "metrics",
+    "hold_lock",
+    "game_over",
+    "pieces_placed",
+    "max_combo",
+    "tspins",
+    "tspin_minis",
+)
+_snapshotFields = attrgetter(*SNAPSHOT_FIELDS)
+
+
+class BoardSnapshot(NamedTuple):
+    # the whole state of a game at one point, see Board.snapshot
+    board_arr: BitBoardSnapshot
+    piece: tuple
+    hold: Optional[tuple]
+    minos: tuple
+    scoring: Tuple[int, bool]
+    fields: tuple
+    # locks in the board's lock log at the time
+    lock_count: int
+
 
 class Board:
-    def __init__(self, das: int, arr: int, lookahead: int):
+    def __init__(self, lookahead: int, events: Optional[EventBus] = None, seed=None):
+        # optional, sound, telemetry etc. subscribe to the game events on it, the
+        # board runs without emitting any (e.g. headless) without one
+        self.events = events
+
         # make empty board
-        self.board_arr: List[List[MinoType]] = [
-            [MinoType.NO_MINO] * BOARD_WIDTH for _ in range(BOARD_HEIGHT)
-        ]
+        self.board_arr = BitBoard()
         # start a queue of tetraminos
-        self.mino_provider = MinoProvider(lookahead)
-
+        self.mino_provider = MinoProvider(lookahead, seed)
+        self.scoring = Scoring()
+        # set to a list to record every lock, e.g. to re-score the game later
+        self.lock_log: Optional[List[LockEvent]] = None
+        # snapshots of the last pieces to come into play, to rewind the game
+        # by a few pieces (see keepHistory)
+        self.history: Optional[Deque[BoardSnapshot]] = None
+        self._startGame()
+
+    def reset(self, seed=None) -> None:
+        # start a new game (dealt from `seed`) on this board, emptying and
+        # reusing its buffers instead of building new ones like a new Board would
+        self.board_arr.reset()
+        self.mino_provider.reset(seed)
+        self.scoring.reset()
+        # a lock log keeps recording, from scratch
+        if self.lock_log is not None:
+            self.lock_log.clear()
+        self._startGame()
+        if self.history is not None:
+            self.history.clear()
+            self.history.append(self.snapshot())
+
+    def _startGame(self) -> None:
         self.spawnMino()
         self.hold = None
         self.hold_lock = False
 
-        self.controller = Controller(das, arr, self)
-        self.sound_board = SoundBoard()
-
+        self.frame: int = 0
         self.level: int = 1
         self.previous_lc: int = 0
         self.lines_cleared: int = 0
@@ -43,9 +98,65 @@ class Board:
         self.combo_count: int = 0
         self.hard_drop_tick: bool = False
         self.score: int = 0
+        # cells the last hard drop moved the piece down
+        self.hard_drop_cells: int = 0
+        # the last piece that locked and what it scored with
+        self.last_lock: Optional[LockEvent] = None
+        # shape of the stack as of the last lock
+        self.metrics: BoardMetrics = EMPTY_METRICS
         self.previous_tspin: TSpinType = TSpinType.NONE
         self.game_over: bool = False
 
+        # whole-game stats
+        self.pieces_placed: int = 0
+        self.max_combo: int = 0
+        self.tspins: int = 0
+        self.tspin_minis: int = 0
+
+    def snapshot(self) -> BoardSnapshot:
+        # the state of the game, to restore() it later (e.g. to undo pieces or
+        # branch off a search), rows unchanged since the last snapshot are
+        # shared with it rather than copied
+        return BoardSnapshot(
+            self.board_arr.snapshot(),
+            self.curr_piece.snapshot(),
+            self.hold.snapshot() if self.hold else None,
+            self.mino_provider.snapshot(),
+            (self.scoring.score, self.scoring.back_to_back),
+            _snapshotFields(self),
+            len(self.lock_log) if self.lock_log is not None else 0,
+        )
+
+    def restore(self, snapshot: BoardSnapshot) -> None:
+        # put the game back in the state of a snapshot, the current and held
+        # pieces are new objects, and the lock log drops the locks since
+        self.board_arr.restore(snapshot.board_arr)
+        self.curr_piece = Tetrimino.fromSnapshot(snapshot.piece)
+        self.curr_piece.updateHint(self.board_arr)
+        self.hold = Tetrimino.fromSnapshot(snapshot.hold) if snapshot.hold else None
+        self.mino_provider.restore(snapshot.minos)
+        self.scoring.score, self.scoring.back_to_back = snapshot.scoring
+        for name, value in zip(SNAPSHOT_FIELDS, snapshot.fields):
+            setattr(self, name, value)
+        if self.lock_log is not None:
+            del self.lock_log[snapshot.lock_count :]
+
+    def keepHistory(self, pieces: int) -> None:
+        # snapshot the game every time a new piece comes into play, keeping the
+        # last `pieces` snapshots (older ones are dropped as new ones come in)
+        self.history = deque([self.snapshot()], maxlen=pieces + 1)
+
+    def rewind(self, pieces: int = 1) -> bool:
+        # go back to when the piece locked `pieces` locks ago came into play,
+        # false when the history doesn't go back that far
+        history = self.history
+        if history is None or len(history) <= pieces:
+            return False
+        for _ in range(pieces):
+            history.pop()
+        self.restore(history[-1])
+        return True
+
     @property
     def curr_lc_goal_level(self) -> int:
         return LINE_CLEARS_LEVEL[self.level - 1]
@@ -54,165 +165,169 @@ class Board:
     def soft_drop_timer(self) -> int:
         return LEVEL_GRAVITY_FRAMES[self.level - 1]
 
-    def update(self) -> None:
+    def update(self, frame: int, actions: Action = Action.NONE) -> None:
         if self.game_over:
             return
+        self.frame = frame
         self.hard_drop_tick = False
-        # check controls
-        self.controller.checkControls()
+        # apply inputs for this frame
+        self.applyActions(actions)
 
         # piece gravity
-        if self.soft_drop_timer == 0:
-            while self.curr_piece.softDrop(self.board_arr):
-                pass
-        elif pyxel.frame_count % self.soft_drop_timer == 0:
-            self.curr_piece.softDrop(self.board_arr)
+        self.applyGravity(frame)
 
         # check lock delay of piece, hard drop if lock expires
-        if self.curr_piece.lockDelayExpired(self.board_arr):
+        if self.lockDelayExpired(frame):
             self.hardDropCurrPiece()
 
         # check and clear any lines on the board
         self.clearLines()
 
-    def draw(self) -> None:
-        # draw board elements
-        self.drawBoard(self.game_over)
-
-        # draw current/falling piece
-        self.drawCurrPiece(self.game_over)
-
-        # draw hold and queue pieces & elements
-        self.drawHold()
-        self.drawQueue()
-
-        # update score and other game info besides board
-        Score.draw(self)
-
-        if self.game_over:
-            pyxel.rect(BOARD_X + 15, BOARD_Y + 95, 45, 15, 8)
-            pyxel.text(BOARD_X + 20, BOARD_Y + 100, "GAME OVER", 7)
-
-    def drawBoard(self, game_over: bool) -> None:
-        # draw the bounding box up to the 20th block
-        pyxel.rectb(
-            BOARD_X - 1,
-            BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 1,
-            (BOARD_WIDTH * BLOCK_SIZE) + 2,
-            ((BOARD_HEIGHT - OVERFLOW_HEIGHT) * BLOCK_SIZE) + 2,
-            13,
-        )
-        # "undraw" the top edge of the board border
-        pyxel.rect(
-            BOARD_X,
-            BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 1,
-            (BOARD_WIDTH * BLOCK_SIZE),
-            1,
-            0,
-        )
-        if game_over:
-            pyxel.dither(0.5)
-        # draw existing blocks
-        for i, row in enumerate(self.board_arr):
-            for j, block in enumerate(row):
-                if block == MinoType.NO_MINO:
-                    continue
-                x = j * BLOCK_SIZE + BOARD_X
-                y = i * BLOCK_SIZE + BOARD_Y
-                u = (block.value - 1) * BLOCK_SIZE
-                pyxel.blt(x, y, 1, u, 0, BLOCK_SIZE, BLOCK_SIZE)
-        pyxel.dither(1)
-
-    def drawCurrPiece(self, game_over: bool) -> None:
-        if game_over:
-            pyxel.dither(0.5)
-        if not game_over:
-            self.curr_piece.drawOnBoard(
-                hint=True
-            )  # draw hint first, then the actual piece
-        self.curr_piece.drawOnBoard()
-        # draw locking status of current piece
-        self.curr_piece.drawLockDelayMeter(
-            BOARD_X - 1,
-            BOARD_Y + (BLOCK_SIZE * (BOARD_HEIGHT)),
-            BLOCK_SIZE * BOARD_WIDTH + 1,
-        )
-        pyxel.dither(1)
+        if self.hard_drop_tick and self.history is not None:
+            self.history.append(self.snapshot())
+
+    def run(self, actions: Iterable[Action], frame: int = 0) -> int:
+        # feed a stream of per-frame inputs to the board until the stream
+        # runs out or the game ends, returns the next frame number
+        for action in actions:
+            if self.game_over:
+                break
+            self.update(frame, action)
+            frame += 1
+        return frame
+
+    def applyActions(self, actions: Action) -> None:
+        if not actions:
+            return
+        if actions & Action.HOLD:
+            self.holdCurrPiece()
+        if actions & Action.HARD_DROP:
+            self.hard_drop_cells = self.curr_piece.hintY - self.curr_piece.y
+            self.hardDropCurrPiece()
 
-    def drawHold(self) -> None:
-        # draw holding piece
-        pyxel.rectb(
-            BOARD_X - 48, BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 10, 48, 32, 13
-        )
-        pyxel.text(
-            BOARD_X - 32, BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 7, "HOLD", 7
-        )
-        if self.hold:
-            if self.hold_lock:
-                pyxel.dither(0.5)
-            self.hold.draw(
-                (
-                    -10
-                    if self.hold.minoType not in [MinoType.MINO_I, MinoType.MINO_O]
-                    else -14
-                ),
-                15,
+        res = False
+        if actions & Action.ROTATE_CW:
+            res |= self.curr_piece.rotateMino(
+                RotationDirection.CLOCKWISE, self.board_arr
             )
-            pyxel.dither(1)
-
-    def drawQueue(self) -> None:
-        # draw minos/pieces in queue
-        pyxel.rectb(
-            BOARD_X + (BLOCK_SIZE * BOARD_WIDTH),
-            BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 10,
-            48,
-            130,
-            13,
-        )
-        pyxel.text(
-            BOARD_X + (BLOCK_SIZE * BOARD_WIDTH) + 16,
-            BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 7,
-            "NEXT",
-            7,
-        )
-        for i, minoType in enumerate(self.mino_provider.minoPreview):
-            Tetrimino(minoType).draw(
-                115 + (4 if minoType not in [MinoType.MINO_I, MinoType.MINO_O] else 0),
-                15 + (i * 24) - (4 if minoType is MinoType.MINO_I else 0),
+        if actions & Action.ROTATE_CCW:
+            res |= self.curr_piece.rotateMino(
+                RotationDirection.COUNTERCLOCKWISE, self.board_arr
             )
+        if actions & Action.ROTATE_180:
+            res |= self.curr_piece.rotateMino(RotationDirection.FLIP180, self.board_arr)
+        if res:
+            if self.events:
+                self.events.emit(EventType.ROTATE, self.frame)
+
+            tspin = self.curr_piece.checkTSpin(self.board_arr)
+            self.piece_tspin = tspin
+            if tspin:
+                if self.events:
+                    self.events.emit(EventType.TSPIN, self.frame, tspin)
+                self.previous_tspin = tspin
+
+        res = False
+        if actions & Action.LEFT:
+            res |= self.curr_piece.moveX(-1, self.board_arr)
+        if actions & Action.RIGHT:
+            res |= self.curr_piece.moveX(1, self.board_arr)
+        if actions & Action.SHIFT_LEFT:
+            res |= self.curr_piece.shiftX(-1, self.board_arr)
+        if actions & Action.SHIFT_RIGHT:
+            res |= self.curr_piece.shiftX(1, self.board_arr)
+        if actions & Action.SOFT_DROP and self.curr_piece.softDrop(self.board_arr):
+            self.soft_drop_cells += 1
+            res = True
+        if actions & Action.SONIC_DROP:
+            piece = self.curr_piece
+            cells = self.board_arr.landingY(piece.state, piece.x, piece.y) - piece.y
+            if cells:
+                piece.y += cells
+                self.soft_drop_cells += cells
+                res = True
+        if res:
+            # a t-spin only counts if the piece locks without moving after its
+            # last rotation
+            self.piece_tspin = TSpinType.NONE
+            if self.events:
+                self.events.emit(EventType.MOVE, self.frame)
+
+    def moveCurrPiece(
+        self, x: int, y: int, spin: int, tspin: TSpinType = TSpinType.NONE
+    ) -> None:
+        # put the current piece straight into a pose (e.g. a placement from the
+        # move generator) as if it had been steered there, `tspin` being what
+        # its last rotation on the way counted as
+        self.curr_piece.setPose(x, y, spin)
+        self.curr_piece.updateHint(self.board_arr)
+        self.piece_tspin = tspin
+        if tspin:
+            self.previous_tspin = tspin
+
+    def applyGravity(self, frame: int) -> None:
+        piece = self.curr_piece
+        if self.soft_drop_timer == 0:
+            # 20G, the piece lands the moment it spawns or moves
+            y = piece.y
+            piece.hardDrop(self.board_arr)
+            if piece.y != y:
+                self.piece_tspin = TSpinType.NONE
+        elif frame % self.soft_drop_timer == 0 and piece.softDrop(self.board_arr):
+            self.piece_tspin = TSpinType.NONE
+
+    def lockDelayExpired(self, frame: int) -> bool:
+        return self.curr_piece.lockDelayExpired(self.board_arr, frame)
 
     def clearLines(self) -> None:
-        # check for any line clears and construct new board if necessary
-        clear_inds = [i for i, row in enumerate(self.board_arr) if all(row)]
+        # only rows touched by a placed mino can have filled up, and the board
+        # keeps track of those as they fill, so there is nothing to scan here
+        clear_count = len(self.board_arr.full_rows)
 
-        if len(clear_inds):  # some lines need to be cleared
-            new_board_arr = [[MinoType.NO_MINO] * BOARD_WIDTH for _ in clear_inds]
-            new_board_arr.extend(
-                [row for i, row in enumerate(self.board_arr) if i not in clear_inds]
-            )
-            self.board_arr = new_board_arr
+        if clear_count:  # some lines need to be cleared
+            self.board_arr.clearFullRows()
             # need to re-update hint with new board state
             self.curr_piece.updateHint(self.board_arr)
-            self.lines_cleared += len(clear_inds)
+            self.lines_cleared += clear_count
             self.combo_count += 1
-            self.sound_board.playLineClear(self.combo_count)
-            if len(clear_inds) == 4:
-                self.sound_board.playLCSpecial()
+            self.max_combo = max(self.max_combo, self.combo_count)
             # update level based on lines cleared
-            self.lines_cleared_level += len(clear_inds)
+            self.lines_cleared_level += clear_count
             if (
                 self.lines_cleared_level >= self.curr_lc_goal_level
                 and self.level < MAX_LEVEL
             ):
                 self.lines_cleared_level -= self.curr_lc_goal_level
                 self.level += 1
-            self.previous_lc = len(clear_inds)
+                if self.events:
+                    self.events.emit(EventType.LEVEL_UP, self.frame, self.level)
+            self.previous_lc = clear_count
 
         elif self.hard_drop_tick:  # no line clears, but hard drop occurred
             self.combo_count = 0
             self.previous_lc = 0
             self.previous_tspin = TSpinType.NONE
 
+        if self.hard_drop_tick:
+            self.scoreLock(clear_count)
+
+    def scoreLock(self, lines: int) -> None:
+        # score the piece locked this frame, once its line clears are known
+        lock = self.last_lock._replace(
+            lines=lines,
+            combo=self.combo_count,
+            perfect_clear=lines > 0 and not self.board_arr.block_count,
+        )
+        self.last_lock = lock
+        self.metrics = self.board_arr.metrics()
+        self.score += self.scoring.lock(lock)
+        if self.lock_log is not None:
+            self.lock_log.append(lock)
+        if self.events:
+            self.events.emit(EventType.LOCK, self.frame, lock)
+            if lines:
+                self.events.emit(EventType.CLEAR, self.frame, lock)
+
     def holdCurrPiece(self) -> None:
         if self.hold_lock:
             return
@@ -221,29 +336,47 @@ class Board:
         self.hold = self.curr_piece
         # or get next item in queue if hold is empty
         self.curr_piece = tmp if tmp else self.mino_provider.fetchMino()
-        self.curr_piece.updateHint(self.board_arr)
+        self.piece_tspin = TSpinType.NONE
+        self.soft_drop_cells = 0
 
         # reset x-y and rotation state of the now held piece
         self.hold.resetPiece()
 
         # prevent infinite holding
         self.hold_lock = True
-        self.sound_board.playHold()
+        if self.events:
+            self.events.emit(EventType.HOLD, self.frame, self.hold.minoType)
+        # like a spawn, the game is over if the piece coming in can't fit
+        if self.curr_piece.isColliding(self.board_arr):
+            self.topOut()
+        else:
+            self.curr_piece.updateHint(self.board_arr)
 
     def hardDropCurrPiece(self) -> None:
+        y = self.curr_piece.y
         self.curr_piece.hardDrop(self.board_arr)
+        if self.curr_piece.y != y:
+            # dropped after its last rotation, so not a t-spin
+            self.piece_tspin = TSpinType.NONE
 
         # copy piece to board
-        for i, row in enumerate(self.curr_piece.mino_arr):
-            for j, block in enumerate(row):
-                if not block:
-                    continue
-                self.board_arr[self.curr_piece.y + i][
-                    self.curr_piece.x + j
-                ] = self.curr_piece.minoType
-
-            # play hard drop sound
-            self.sound_board.playHardDrop()
+        self.board_arr.placeMino(self.curr_piece)
+        self.pieces_placed += 1
+        if self.piece_tspin == TSpinType.TSPIN:
+            self.tspins += 1
+        elif self.piece_tspin == TSpinType.MINI:
+            self.tspin_minis += 1
+        # lines, combo and perfect clear are filled in by scoreLock
+        self.last_lock = LockEvent(
+            0,
+            self.piece_tspin,
+            self.level,
+            0,
+            False,
+            self.soft_drop_cells,
+            self.hard_drop_cells,
+        )
+        self.hard_drop_cells = 0
 
         # get new piece
         self.spawnMino()
@@ -252,7 +385,58 @@ class Board:
 
     def spawnMino(self) -> None:
         self.curr_piece = self.mino_provider.fetchMino()
+        # t-spin type of the last rotation of the current piece, until it moves
+        self.piece_tspin = TSpinType.NONE
+        # cells the player soft dropped the current piece
+        self.soft_drop_cells = 0
         if self.curr_piece.isColliding(self.board_arr):
-            self.game_over = True
+            self.topOut()
         else:
             self.curr_piece.updateHint(self.board_arr)
+
+    def addGarbage(self, count: int, hole: int) -> None:
+        # raise the stack by `count` garbage lines (e.g. sent by an opponent)
+        # with an empty cell in the `hole` column
+        if not self.board_arr.addGarbage(count, hole):
+            self.topOut()
+            return
+        if self.events:
+            self.events.emit(EventType.GARBAGE, self.frame, count)
+        # the piece in play gets pushed up with the stack
+        piece = self.curr_piece
+        while piece.isColliding(self.board_arr):
+            if piece.y + piece.state.min_row <= 0:
+                self.topOut()
+                return
+            piece.y -= 1
+        piece.updateHint(self.board_arr)
+
+    def topOut(self) -> None:
+        self.game_over = True
+        if self.events:
+            self.events.emit(EventType.TOP_OUT, self.frame)
+
+
+class BoardPool:
+    # boards to play game after game on (e.g. in the simulation runner), a
+    # released board is reset in place for the next game instead of a new
+    # board being built
+    def __init__(self, lookahead: int, size: int = 0):
+        self.lookahead = lookahead
+        # boards built up front, so the first games don't build them either
+        self.free: List[Board] = [Board(lookahead) for _ in range(size)]
+
+    def __len__(self) -> int:
+        return len(self.free)
+
+    def acquire(self, seed=None) -> Board:
+        # a board with a new game dealt from `seed`
+        if not self.free:
+            return Board(self.lookahead, seed=seed)
+        board = self.free.pop()
+        board.reset(seed)
+        return board
+
+    def release(self, board: Board) -> None:
+        # hand a board back once its game is done with
+        self.free.append(board)
@@ -0,0 +1,169 @@
+import asyncio
+import struct
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+from ttris.delta import DeltaEncoder
+from ttris.stats import percentile
+from ttris.versus import FRAME, packMessage, readMessage
+
+# a viewer sends WATCH with the channel it wants to watch, then gets a FRAME
+# (stream frame number and a delta of the board) for every frame from the
+# latest keyframe on, and the connection is closed when the channel ends
+WATCH = 6
+WATCH_RECORD = struct.Struct("<I")
+STREAM_FRAME_RECORD = struct.Struct("<I")
+
+# frames between keyframes, the longest a viewer that fell behind waits to
+# catch up again (and the most a new viewer gets sent on joining)
+KEYFRAME_INTERVAL = 120
+# a viewer with this much unsent data skips frames until the next keyframe
+LAG_WRITE_BUFFER = 1 << 14
+
+
+class _Viewer:
+    def __init__(self, writer):
+        self.writer = writer
+        # skipping frames until the next keyframe
+        self.lagging = False
+
+
+class Broadcast:
+    # the stream of one board, each frame is encoded once and the same bytes
+    # are written to every viewer
+    def __init__(self, board, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.keyframe_interval = keyframe_interval
+        self.viewers: Set[_Viewer] = set()
+        # the latest keyframe and the frames after it, what a new viewer needs
+        # to catch up
+        self.backlog: List[bytes] = []
+        self.frame = 0
+        # frames left unsent to viewers that fell behind
+        self.skipped = 0
+        self.follow(board)
+
+    def follow(self, board) -> None:
+        # stream another board (e.g. the next game), viewers carry on from the
+        # keyframe it starts with
+        self.board = board
+        self.encoder = DeltaEncoder(board)
+        self._next_keyframe = self.frame
+
+    def publish(self) -> None:
+        # encode the frame the board just played and send it to every viewer
+        keyframe = self.frame >= self._next_keyframe
+        if keyframe:
+            self._next_keyframe = self.frame + self.keyframe_interval
+        data = packMessage(
+            FRAME,
+            STREAM_FRAME_RECORD.pack(self.frame) + self.encoder.encode(keyframe),
+        )
+        if keyframe:
+            self.backlog = [data]
+        else:
+            self.backlog.append(data)
+        self.frame += 1
+
+        for viewer in list(self.viewers):
+            writer = viewer.writer
+            if writer.is_closing():
+                self.viewers.discard(viewer)
+            elif writer.transport.get_write_buffer_size() > LAG_WRITE_BUFFER or (
+                viewer.lagging and not keyframe
+            ):
+                # deltas only make sense in order, so a viewer that can't keep
+                # up gets nothing until it can start over from a keyframe
+                viewer.lagging = True
+                self.skipped += 1
+            else:
+                viewer.lagging = False
+                writer.write(data)
+
+    def watch(self, writer) -> None:
+        # start streaming to a viewer, from the latest keyframe
+        writer.write(b"".join(self.backlog))
+        self.viewers.add(_Viewer(writer))
+
+    def end(self) -> None:
+        # close every viewer's connection (after what was sent to them)
+        for viewer in self.viewers:
+            viewer.writer.close()
+        self.viewers.clear()
+
+
+class BroadcastServer:
+    # streams any number of boards (channels) to viewers, the caller plays the
+    # boards and calls publish() once every frame
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.channels: Dict[int, Broadcast] = {}
+        self._next_channel = 0
+        # seconds each of the last publish() calls took
+        self.publish_times: deque = deque(maxlen=600)
+        self._server: Optional[asyncio.AbstractServer] = None
+        # the connection of every running handler, to close them on close()
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        # the actual port when asked for any free one
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        self._server.close()
+        for channel in list(self.channels):
+            self.end(channel)
+        for writer in self._connections.values():
+            writer.close()
+        await asyncio.gather(*self._connections)
+        await self._server.wait_closed()
+
+    def broadcast(self, board, keyframe_interval: int = KEYFRAME_INTERVAL) -> int:
+        # start streaming a board, returns its channel
+        channel = self._next_channel
+        self._next_channel += 1
+        self.channels[channel] = Broadcast(board, keyframe_interval)
+        return channel
+
+    def end(self, channel: int) -> None:
+        self.channels.pop(channel).end()
+
+    def publish(self) -> None:
+        start = time.perf_counter()
+        for broadcast in self.channels.values():
+            broadcast.publish()
+        self.publish_times.append(time.perf_counter() - start)
+
+    @property
+    def viewers(self) -> int:
+        return sum(len(broadcast.viewers) for broadcast in self.channels.values())
+
+    def publishStats(self) -> Dict[str, float]:
+        # publish() latency percentiles in milliseconds
+        times = sorted(self.publish_times)
+        if not times:
+            return {}
+        stats = {f"p{p}": percentile(times, p) * 1000 for p in (50, 90, 99)}
+        stats["max"] = times[-1] * 1000
+        return stats
+
+    async def _serve(self, reader, writer) -> None:
+        # viewers only ever send WATCH, what's read afterwards is just to
+        # notice them leaving
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            kind, payload = await readMessage(reader)
+            channel = WATCH_RECORD.unpack(payload)[0] if kind == WATCH else None
+            if channel not in self.channels:
+                return
+            self.channels[channel].watch(writer)
+            while await reader.read(1 << 10):
+                pass
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error):
+            pass
+        finally:
+            writer.close()
+            del self._connections[task]
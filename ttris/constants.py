@@ -4,10 +4,20 @@ BOARD_WIDTH = 10  # width (in blocks) of the board
 
 BLOCK_SIZE = 8  # size of each block in pixels
 
+# constants for pyxel.init
+WINDOW_HEIGHT = 200
+WINDOW_WIDTH = 180
+DISPLAY_SCALE = 8
+FPS = 60
+
 # starting x, y position of the board in game window
 BOARD_X = 50
 BOARD_Y = -10  # y position includes overflow area
 
+# board x, y position (in blocks) minos spawn at
+SPAWN_X = 3
+SPAWN_Y = 2
+
 LOCK_DELAY = 30  # 30 frames ~ .5 seconds
 MAX_LOCKS = 15
 
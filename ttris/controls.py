@@ -1,63 +1,115 @@
+import math
+
 import pyxel
 
-from ttris.tetriminos import RotationDirection
+from ttris.enums import Action
+
+
+class KeyRepeat:
+    # auto repeat of a held key, counted in frames by the controller itself: it
+    # fires when the key is pressed, once it has been held for `delay` frames
+    # and then every `interval` frames (at most once a frame, both may be
+    # fractional)
+    def __init__(self, delay: float, interval: float):
+        self.delay = delay
+        self.interval = interval
+        # frames the key has been held for, -1 while it is up
+        self.held = -1
+        # held frames at which it fires next
+        self.next = 0.0
+
+    @property
+    def charged(self) -> bool:
+        # held past the delay, repeating
+        return self.held >= self.delay
+
+    def update(self, pressed: bool, down: bool) -> bool:
+        # `pressed` for the frame the key went down, `down` while it is held
+        if pressed:
+            self.held = 0
+            self.next = self.delay
+            return True
+        if not down or self.held == -1:
+            self.held = -1
+            return False
+        self.held += 1
+        if self.held < self.next:
+            return False
+        self.next = max(self.next + self.interval, self.held)
+        return True
 
 
 class Controller:
-    def __init__(self, das, arr, board):
+    # translates pyxel key presses into board actions for the current frame.
+    # das and arr are in frames, an arr of 0 slides pieces to the wall once
+    # charged. Soft drop moves the piece `sdf` times faster than gravity (at
+    # most a block a frame), an infinite sdf drops it straight to the floor
+    def __init__(self, das, arr, sdf):
+        # these mostly come from the environment (see main.py), so fail early
+        # instead of dividing by a 0 sdf or repeating keys on nonsense timings
+        if not das >= 0 or not arr >= 0:
+            raise ValueError(f"das and arr must be >= 0 frames, got {das}, {arr}")
+        if not sdf > 0:
+            raise ValueError(f"sdf must be > 0 (or inf), got {sdf}")
         self.das: int = das
         self.arr: int = arr
-        self.board = board
+        self.sdf: float = sdf
+        self.left = KeyRepeat(das, arr)
+        self.right = KeyRepeat(das, arr)
+        self.soft_drop = KeyRepeat(0, 1)
 
-    def _checkHardDropKey(self) -> None:
-        if pyxel.btnp(pyxel.KEY_SPACE):
-            self.board.hardDropCurrPiece()
+    def _checkHardDropKey(self) -> Action:
+        return Action.HARD_DROP if pyxel.btnp(pyxel.KEY_SPACE) else Action.NONE
 
-    def _checkHoldKey(self) -> None:
-        if pyxel.btnp(pyxel.KEY_SHIFT):
-            self.board.holdCurrPiece()
+    def _checkHoldKey(self) -> Action:
+        return Action.HOLD if pyxel.btnp(pyxel.KEY_SHIFT) else Action.NONE
 
-    def _checkRotationKeys(self) -> None:
-        res = False
+    def _checkRotationKeys(self) -> Action:
+        actions = Action.NONE
         if pyxel.btnp(pyxel.KEY_UP) or pyxel.btnp(pyxel.KEY_X):
-            res |= self.board.curr_piece.rotateMino(
-                RotationDirection.CLOCKWISE, self.board.board_arr
-            )
+            actions |= Action.ROTATE_CW
 
         if pyxel.btnp(pyxel.KEY_Z):
-            res |= self.board.curr_piece.rotateMino(
-                RotationDirection.COUNTERCLOCKWISE, self.board.board_arr
-            )
+            actions |= Action.ROTATE_CCW
 
         if pyxel.btnp(pyxel.KEY_A):  # 180 rotation
-            res |= self.board.curr_piece.rotateMino(
-                RotationDirection.FLIP180, self.board.board_arr
-            )
+            actions |= Action.ROTATE_180
+
+        return actions
+
+    def _checkRepeat(self, repeat: KeyRepeat, key: int) -> bool:
+        return repeat.update(pyxel.btnp(key), pyxel.btn(key))
 
-        if res:
-            self.board.sound_board.playRotation()
+    def _checkMovementKeys(self, gravity_frames: int) -> Action:
+        actions = Action.NONE
+        if self._checkRepeat(self.left, pyxel.KEY_LEFT):
+            instant = self.arr == 0 and self.left.charged
+            actions |= Action.SHIFT_LEFT if instant else Action.LEFT
 
-            tspin = self.board.curr_piece.checkTSpin(self.board.board_arr)
-            if tspin:
-                self.board.sound_board.playLCSpecial()
-                self.board.previous_tspin = tspin
+        if self._checkRepeat(self.right, pyxel.KEY_RIGHT):
+            instant = self.arr == 0 and self.right.charged
+            actions |= Action.SHIFT_RIGHT if instant else Action.RIGHT
 
-    def _checkMovementKeys(self) -> None:
-        res = False
-        if pyxel.btnp(pyxel.KEY_LEFT, hold=self.das, repeat=self.arr):
-            res |= self.board.curr_piece.moveX(-1, self.board.board_arr)
+        # the soft drop speed follows the level's gravity
+        self.soft_drop.delay = self.soft_drop.interval = gravity_frames / self.sdf
+        if self._checkRepeat(self.soft_drop, pyxel.KEY_DOWN):
+            instant = self.sdf == math.inf
+            actions |= Action.SONIC_DROP if instant else Action.SOFT_DROP
 
-        if pyxel.btnp(pyxel.KEY_RIGHT, hold=self.das, repeat=self.arr):
-            res |= self.board.curr_piece.moveX(1, self.board.board_arr)
+        return actions
 
-        if pyxel.btnp(pyxel.KEY_DOWN, repeat=self.arr):
-            res |= self.board.curr_piece.softDrop(self.board.board_arr)
+    def checkRestartKey(self) -> bool:
+        # not a board action, the game restarts itself once it is over
+        return pyxel.btnp(pyxel.KEY_R)
 
-        if res:
-            self.board.sound_board.playMovement()
+    def checkUndoKey(self) -> bool:
+        # undo the last piece in a practice game
+        return pyxel.btnp(pyxel.KEY_U)
 
-    def checkControls(self) -> None:
-        self._checkHoldKey()
-        self._checkHardDropKey()
-        self._checkRotationKeys()
-        self._checkMovementKeys()
+    def checkControls(self, gravity_frames: int = 1) -> Action:
+        return (
+            self._checkHoldKey()
+            | self._checkHardDropKey()
+            | self._checkRotationKeys()
+            | self._checkMovementKeys(gravity_frames)
+        )
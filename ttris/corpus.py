@@ -0,0 +1,171 @@
+import mmap
+import os
+import struct
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from ttris.board import Board
+from ttris.replay import Replay
+from ttris.scoring import LOCK_RECORD, LockEvent, Scoring
+
+# a corpus is two append-only files:
+#   <path>.ttrd  per game, its replay (Replay.toBytes) followed by its lock
+#                events (LOCK_RECORD each)
+#   <path>.ttri  fixed-width index records, one per replay, after a small header
+INDEX_MAGIC = b"TTRI"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sB")
+INDEX_RECORD = struct.Struct("<QIQIIBHHHIQI")
+
+
+class GameSummary(NamedTuple):
+    # one index record: where the replay is stored and how the game went
+    offset: int
+    length: int
+    seed: int
+    frames: int
+    lines_cleared: int
+    level: int
+    max_combo: int
+    tspins: int
+    tspin_minis: int
+    pieces_placed: int
+    score: int
+    lock_count: int
+
+
+class ReplayCorpus:
+    # append replays to a corpus and query their summaries through a
+    # memory-mapped index, without deserializing or replaying any game
+    def __init__(self, path: str):
+        self.data_path = path + ".ttrd"
+        self.index_path = path + ".ttri"
+        if not os.path.exists(self.index_path):
+            with open(self.index_path, "wb") as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION))
+            open(self.data_path, "wb").close()
+        self._index_map: Optional[mmap.mmap] = None
+        self._data_map: Optional[mmap.mmap] = None
+        self._checkHeader()
+
+    def __len__(self) -> int:
+        size = os.path.getsize(self.index_path) - INDEX_HEADER.size
+        return size // INDEX_RECORD.size
+
+    def __getitem__(self, i: int) -> GameSummary:
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        pos = INDEX_HEADER.size + i * INDEX_RECORD.size
+        return GameSummary(*INDEX_RECORD.unpack_from(self._index(), pos))
+
+    def __iter__(self) -> Iterator[GameSummary]:
+        if not len(self):
+            return
+        end = INDEX_HEADER.size + len(self) * INDEX_RECORD.size
+        for record in INDEX_RECORD.iter_unpack(self._index()[INDEX_HEADER.size : end]):
+            yield GameSummary(*record)
+
+    def append(self, replay: Replay, board: Optional[Board] = None) -> int:
+        # add a replay, `board` is the finished game it came from (it is
+        # re-simulated when not given or when it didn't log its locks),
+        # returns the index of the new game
+        if board is None or board.lock_log is None:
+            board = Board(replay.lookahead, seed=replay.seed)
+            board.lock_log = []
+            replay.play(board)
+        data = replay.toBytes()
+        with open(self.data_path, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+            f.write(b"".join(lock.pack() for lock in board.lock_log))
+        with open(self.index_path, "ab") as f:
+            f.write(
+                INDEX_RECORD.pack(
+                    offset,
+                    len(data),
+                    replay.seed,
+                    replay.frame_count,
+                    board.lines_cleared,
+                    board.level,
+                    board.max_combo,
+                    board.tspins,
+                    board.tspin_minis,
+                    board.pieces_placed,
+                    board.score,
+                    len(board.lock_log),
+                )
+            )
+        return len(self) - 1
+
+    def select(self, predicate: Callable[[GameSummary], bool]) -> List[int]:
+        # indices of games whose summary matches,
+        # e.g. corpus.select(lambda game: game.max_combo >= 10)
+        return [i for i, game in enumerate(self) if predicate(game)]
+
+    def replay(self, i: int) -> Replay:
+        game = self[i]
+        data = self._data()[game.offset : game.offset + game.length]
+        return Replay.fromBytes(data)
+
+    def locks(self, i: int) -> List[LockEvent]:
+        # every piece lock of a game, in order
+        game = self[i]
+        start = game.offset + game.length
+        end = start + game.lock_count * LOCK_RECORD.size
+        return [
+            LockEvent.unpack(record)
+            for record in LOCK_RECORD.iter_unpack(self._data()[start:end])
+        ]
+
+    def rescore(self, scoring: Callable[[], Scoring] = Scoring) -> List[int]:
+        # score of every game under (possibly changed) scoring rules, from the
+        # stored lock events instead of replaying the games
+        scores = []
+        for i in range(len(self)):
+            game_scoring = scoring()
+            for lock in self.locks(i):
+                game_scoring.lock(lock)
+            scores.append(game_scoring.score)
+        return scores
+
+    def close(self) -> None:
+        for mapped in (self._index_map, self._data_map):
+            if mapped is not None:
+                mapped.close()
+        self._index_map = self._data_map = None
+
+    def __enter__(self) -> "ReplayCorpus":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _checkHeader(self) -> None:
+        with open(self.index_path, "rb") as f:
+            header = f.read(INDEX_HEADER.size)
+        if len(header) < INDEX_HEADER.size:
+            raise Exception("Truncated ttris replay corpus index")
+        magic, version = INDEX_HEADER.unpack(header)
+        if magic != INDEX_MAGIC:
+            raise Exception("Not a ttris replay corpus index")
+        if version != INDEX_VERSION:
+            raise Exception(f"Unsupported corpus index version {version}")
+
+    def _index(self) -> mmap.mmap:
+        self._index_map = self._remap(self._index_map, self.index_path)
+        return self._index_map
+
+    def _data(self) -> mmap.mmap:
+        self._data_map = self._remap(self._data_map, self.data_path)
+        return self._data_map
+
+    @staticmethod
+    def _remap(mapped: Optional[mmap.mmap], path: str) -> mmap.mmap:
+        # (re)open a read-only map, files only grow so a map is stale when the
+        # file got bigger since it was made
+        size = os.path.getsize(path)
+        if mapped is None or len(mapped) != size:
+            if mapped is not None:
+                mapped.close()
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped
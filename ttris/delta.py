@@ -0,0 +1,264 @@
+import struct
+from copy import copy
+from typing import List, Optional
+
+from ttris.bitboard import BitBoard
+from ttris.constants import BOARD_HEIGHT, BOARD_WIDTH, LINE_CLEARS_LEVEL
+from ttris.enums import MinoType, TSpinType
+from ttris.tetriminos import Tetrimino
+
+# a delta is what changed on a board since the previous one (all little endian):
+#   flags byte, then the sections in flags, in this order:
+#   ROWS   row count, then per row its y and 5 bytes of cells (4 bits each)
+#   PIECE  mino type, x, y, spin, frames since lock delay started (0xFF when
+#          not locking), lock resets
+#   HOLD   held mino type (0 when nothing is held), hold lock
+#   QUEUE  minos the preview advanced by, count of new minos, the new minos
+#   STATS  score, lines, lines this level, level, combo, last lines cleared,
+#          last t-spin, last lock was a perfect clear
+#   OVER   the game is over (no payload)
+# a keyframe has every section and all rows, so a viewer can start from it
+ROWS = 1
+PIECE = 2
+HOLD = 4
+QUEUE = 8
+STATS = 16
+OVER = 32
+KEYFRAME = 64
+
+ROW_BYTES = BOARD_WIDTH // 2
+PIECE_RECORD = struct.Struct("<BbbBBB")
+HOLD_RECORD = struct.Struct("<BB")
+STATS_RECORD = struct.Struct("<IHHBBBBB")
+NOT_LOCKING = 0xFF
+
+
+def _packRow(row) -> bytes:
+    # (_value_ is the plain attribute behind an enum's value property)
+    return bytes(
+        row[x]._value_ | row[x + 1]._value_ << 4 for x in range(0, BOARD_WIDTH, 2)
+    )
+
+
+class DeltaEncoder:
+    # encodes what changed on a board since the last call, meant to be called
+    # once a frame (the first delta is always a keyframe)
+    def __init__(self, board):
+        self.board = board
+        self._hash = None
+        self._row_moves = 0
+        self._masks: List[int] = [0] * BOARD_HEIGHT
+        self._piece = None
+        self._hold = None
+        self._queue: List[MinoType] = []
+        self._queue_piece = None
+        self._stats = None
+        self._over = False
+
+    def encode(self, keyframe: bool = False) -> bytes:
+        board = self.board
+        board_arr = board.board_arr
+        keyframe = keyframe or self._hash is None
+        flags = KEYFRAME if keyframe else 0
+        out = bytearray(1)
+
+        # rows only change when the blocks on the board do, and until rows
+        # move only the ones that got blocks added
+        if keyframe or board_arr.hash != self._hash:
+            masks = board_arr.masks
+            moved = keyframe or board_arr.row_moves != self._row_moves
+            rows = [
+                y for y in range(BOARD_HEIGHT) if moved or masks[y] != self._masks[y]
+            ]
+            if rows:
+                flags |= ROWS
+                out.append(len(rows))
+                for y in rows:
+                    out.append(y)
+                    out += _packRow(board_arr[y])
+            self._hash = board_arr.hash
+            self._row_moves = board_arr.row_moves
+            self._masks[:] = masks
+
+        piece = board.curr_piece
+        pose = (piece, piece.x, piece.y, piece._spin, piece.lock_delay_start)
+        if keyframe or pose != self._piece:
+            flags |= PIECE
+            out += PIECE_RECORD.pack(
+                piece.minoType._value_,
+                piece.x,
+                piece.y,
+                piece.spin,
+                (
+                    NOT_LOCKING
+                    if piece.lock_delay_start == -1
+                    else min(board.frame - piece.lock_delay_start, NOT_LOCKING - 1)
+                ),
+                min(piece.lock_resets, 0xFF),
+            )
+            self._piece = pose
+
+        hold = (board.hold, board.hold_lock)
+        if keyframe or hold != self._hold:
+            flags |= HOLD
+            out += HOLD_RECORD.pack(
+                board.hold.minoType._value_ if board.hold else 0, board.hold_lock
+            )
+            self._hold = hold
+
+        # the preview only advances when a new piece comes into play
+        if keyframe or piece is not self._queue_piece:
+            self._queue_piece = piece
+            queue = board.mino_provider.minoPreview
+            if keyframe:
+                shift = len(self._queue)
+            else:
+                shift = next(
+                    s
+                    for s in range(len(self._queue) + 1)
+                    if self._queue[s:] == queue[: len(self._queue) - s]
+                )
+            added = queue[len(self._queue) - shift :]
+            if shift or added:
+                flags |= QUEUE
+                out += bytes((shift, len(added)))
+                out += bytes(mino._value_ for mino in added)
+            self._queue = queue
+
+        # the stats only change when a piece locks, besides the t-spin shown
+        # as soon as a rotation counts as one
+        stats = (board.pieces_placed, board.previous_tspin)
+        if keyframe or stats != self._stats:
+            flags |= STATS
+            last_lock = board.last_lock
+            out += STATS_RECORD.pack(
+                min(board.score, 0xFFFFFFFF),
+                board.lines_cleared,
+                board.lines_cleared_level,
+                board.level,
+                min(board.combo_count, 0xFF),
+                board.previous_lc,
+                board.previous_tspin._value_,
+                bool(last_lock and last_lock.perfect_clear),
+            )
+            self._stats = stats
+
+        if board.game_over and (keyframe or not self._over):
+            flags |= OVER
+            self._over = True
+
+        out[0] = flags
+        return bytes(out)
+
+
+class _Preview:
+    # stands in for the board's mino provider
+    def __init__(self):
+        self.minoPreview: List[MinoType] = []
+
+
+class _LastLock:
+    def __init__(self, perfect_clear: bool):
+        self.perfect_clear = perfect_clear
+
+
+class BoardView:
+    # a board rebuilt from a delta stream, with the attributes the renderer
+    # and the score panel read off a Board
+    def __init__(self):
+        self.board_arr = BitBoard()
+        self.curr_piece: Optional[Tetrimino] = None
+        self.hold: Optional[Tetrimino] = None
+        self.hold_lock = False
+        self.mino_provider = _Preview()
+        self.frame = 0
+        self.score = 0
+        self.lines_cleared = 0
+        self.lines_cleared_level = 0
+        self.level = 1
+        self.combo_count = 0
+        self.previous_lc = 0
+        self.previous_tspin = TSpinType.NONE
+        self.last_lock: Optional[_LastLock] = None
+        self.game_over = False
+        # whether a keyframe has been applied yet
+        self.synced = False
+
+    @property
+    def curr_lc_goal_level(self) -> int:
+        return LINE_CLEARS_LEVEL[self.level - 1]
+
+    def apply(self, data: bytes, pos: int = 0) -> int:
+        # apply the delta at data[pos:], returns the position after it
+        flags = data[pos]
+        pos += 1
+        if flags & KEYFRAME:
+            self.synced = True
+        self.frame += 1
+        board_arr = self.board_arr
+
+        if flags & ROWS:
+            count = data[pos]
+            pos += 1
+            ys = []
+            for _ in range(count):
+                y = data[pos]
+                ys.append(y)
+                row = board_arr[y]
+                for i in range(ROW_BYTES):
+                    cells = data[pos + 1 + i]
+                    row[2 * i] = MinoType(cells & 0xF)
+                    row[2 * i + 1] = MinoType(cells >> 4)
+                pos += 1 + ROW_BYTES
+            board_arr.rebuild(ys)
+
+        piece = self.curr_piece
+        if piece is not None and flags & (ROWS | HOLD | QUEUE):
+            # like a board bringing a new piece into play, a new piece object
+            # tells the renderer the blocks, hold or preview under it changed
+            piece = self.curr_piece = copy(piece)
+        if flags & PIECE:
+            mino, x, y, spin, locking, resets = PIECE_RECORD.unpack_from(data, pos)
+            pos += PIECE_RECORD.size
+            if piece is None or piece.minoType._value_ != mino:
+                piece = self.curr_piece = Tetrimino(MinoType(mino))
+            piece.setPose(x, y, spin)
+            piece.lock_delay_start = (
+                -1 if locking == NOT_LOCKING else self.frame - locking
+            )
+            piece.lock_resets = resets
+        if self.curr_piece and flags & (ROWS | PIECE):
+            self.curr_piece.updateHint(board_arr)
+
+        if flags & HOLD:
+            mino, hold_lock = HOLD_RECORD.unpack_from(data, pos)
+            pos += HOLD_RECORD.size
+            self.hold = Tetrimino(MinoType(mino)) if mino else None
+            self.hold_lock = bool(hold_lock)
+
+        if flags & QUEUE:
+            shift, count = data[pos], data[pos + 1]
+            pos += 2
+            added = [MinoType(mino) for mino in data[pos : pos + count]]
+            pos += count
+            # a keyframe has the whole preview
+            preview = [] if flags & KEYFRAME else self.mino_provider.minoPreview
+            self.mino_provider.minoPreview = preview[shift:] + added
+
+        if flags & STATS:
+            (
+                self.score,
+                self.lines_cleared,
+                self.lines_cleared_level,
+                self.level,
+                self.combo_count,
+                self.previous_lc,
+                tspin,
+                perfect_clear,
+            ) = STATS_RECORD.unpack_from(data, pos)
+            pos += STATS_RECORD.size
+            self.previous_tspin = TSpinType(tspin)
+            self.last_lock = _LastLock(bool(perfect_clear))
+
+        self.game_over = bool(flags & OVER) or (self.game_over and not flags & KEYFRAME)
+        return pos
@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, IntFlag
 
 
 class RotationDirection(Enum):
@@ -26,7 +26,25 @@ class MinoType(Enum):
     MINO_Z = 5
     MINO_J = 6
     MINO_L = 7
+    GARBAGE = 8  # blocks of garbage lines sent by an opponent
 
     def __bool__(self):
         # NO_MINOs are falsy, everything else is truthy
         return self.value != 0
+
+
+class Action(IntFlag):
+    # inputs that can be applied to a board in a single frame
+    NONE = 0
+    HARD_DROP = 1
+    HOLD = 2
+    ROTATE_CW = 4
+    ROTATE_CCW = 8
+    ROTATE_180 = 16
+    LEFT = 32
+    RIGHT = 64
+    SOFT_DROP = 128
+    # slide to the wall (ARR 0) or drop to the floor (infinite soft drop factor)
+    SHIFT_LEFT = 256
+    SHIFT_RIGHT = 512
+    SONIC_DROP = 1024
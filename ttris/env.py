@@ -0,0 +1,198 @@
+from random import Random
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ttris.board import Board
+from ttris.constants import BOARD_WIDTH
+from ttris.enums import Action
+from ttris.movegen import MoveGenerator, Placement
+
+# the bit of every board column in a row mask
+_COLUMN_BITS = 1 << np.arange(BOARD_WIDTH)
+
+
+class RewardWeights(NamedTuple):
+    # reward of clearing 0, 1, 2, 3 and 4 lines with one piece
+    lines: Tuple[float, ...] = (0.0, 1.0, 3.0, 5.0, 8.0)
+    # extra reward per combo step on top of the first clear
+    combo: float = 0.5
+    # per locked piece that counted as a T-spin / T-spin mini
+    tspin: float = 2.0
+    tspin_mini: float = 0.5
+    top_out: float = -10.0
+
+
+class TtrisEnv:
+    # a single game behind a reset/step interface (gymnasium style, without
+    # depending on it). With action_mode "input" an action is an Action bitmask
+    # and a step is one frame, with "placement" an action is an index into
+    # `placements` (or len(placements) to hold) and a step locks one piece
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        lookahead: int = 5,
+        action_mode: str = "input",
+        max_frames: Optional[int] = None,
+        rewards: RewardWeights = RewardWeights(),
+    ):
+        if action_mode not in ("input", "placement"):
+            raise ValueError(f"Unknown action mode {action_mode!r}")
+        self.lookahead = lookahead
+        self.action_mode = action_mode
+        self.max_frames = max_frames
+        self.rewards = rewards
+        # deals a seed for every game that is not given one
+        self._seeds = Random(seed)
+        self.movegen = MoveGenerator() if action_mode == "placement" else None
+        self.board: Optional[Board] = None
+        self.placements: List[Placement] = []
+
+    def reset(self, seed: Optional[int] = None) -> Tuple[Dict, Dict]:
+        if seed is None:
+            seed = self._seeds.getrandbits(64)
+        self.seed = seed
+        # the board of the last game is reused for the next one
+        if self.board is None:
+            self.board = Board(self.lookahead, seed=seed)
+        else:
+            self.board.reset(seed)
+        self.frame = 0
+        self._findPlacements()
+        return self.observe(), self.info()
+
+    def step(self, action: int) -> Tuple[Dict, float, bool, bool, Dict]:
+        # returns observation, reward, terminated (topped out), truncated (out
+        # of frames) and info
+        board = self.board
+        if board.game_over:
+            raise Exception("Game is over, call reset() first")
+        if self.action_mode == "placement" and not 0 <= action < self.actionCount():
+            raise ValueError(
+                f"Invalid placement action {action}, "
+                f"expected 0 to {self.actionCount() - 1}"
+            )
+        lines = board.lines_cleared
+        tspins = board.tspins
+        tspin_minis = board.tspin_minis
+
+        if self.action_mode == "input":
+            self._update(Action(action))
+        elif action == len(self.placements):
+            self._update(Action.HOLD)
+        else:
+            placement = self.placements[action]
+            board.moveCurrPiece(
+                placement.x, placement.y, placement.spin, placement.tspin
+            )
+            self._update(Action.HARD_DROP)
+        self._findPlacements()
+
+        weights = self.rewards
+        cleared = board.lines_cleared - lines
+        reward = weights.lines[min(cleared, len(weights.lines) - 1)]
+        if cleared:
+            reward += weights.combo * (board.combo_count - 1)
+        reward += weights.tspin * (board.tspins - tspins)
+        reward += weights.tspin_mini * (board.tspin_minis - tspin_minis)
+        if board.game_over:
+            reward += weights.top_out
+
+        truncated = self.max_frames is not None and self.frame >= self.max_frames
+        return self.observe(), reward, board.game_over, truncated, self.info()
+
+    def observe(self) -> Dict[str, np.ndarray]:
+        board = self.board
+        piece = board.curr_piece
+        hold = board.hold
+        return {
+            # 1 where a cell is filled, 0 where it's empty
+            "board": (
+                np.array(board.board_arr.masks)[:, None] & _COLUMN_BITS != 0
+            ).astype(np.uint8),
+            # type, x, y and spin of the current piece
+            "piece": np.array(
+                [piece.minoType.value, piece.x, piece.y, piece.spin], dtype=np.int8
+            ),
+            "hold": np.uint8(hold.minoType.value if hold else 0),
+            "hold_lock": np.uint8(board.hold_lock),
+            "queue": np.array(
+                [mino.value for mino in board.mino_provider.minoPreview],
+                dtype=np.uint8,
+            ),
+        }
+
+    def info(self) -> Dict:
+        board = self.board
+        return {
+            "seed": self.seed,
+            "frame": self.frame,
+            "lines": board.lines_cleared,
+            "level": board.level,
+            "pieces_placed": board.pieces_placed,
+            "action_count": self.actionCount(),
+        }
+
+    def actionCount(self) -> int:
+        # valid placement actions (holding is one more when not hold locked),
+        # none once the game is over
+        board = self.board
+        if board.game_over:
+            return 0
+        return len(self.placements) + (not board.hold_lock)
+
+    def _update(self, actions: Action) -> None:
+        self.board.update(self.frame, actions)
+        self.frame += 1
+
+    def _findPlacements(self) -> None:
+        board = self.board
+        if self.movegen is None or board.game_over:
+            self.placements = []
+            return
+        piece = board.curr_piece
+        self.placements = self.movegen.placements(
+            board.board_arr,
+            piece.minoType,
+            (piece.x, piece.y, piece.spin),
+            board.piece_tspin,
+        )
+
+
+class VectorEnv:
+    # K environments stepped with one call, observations are stacked along a
+    # first axis of size K. Finished games are reset right away, their last
+    # observation and info are passed in info["final_observation"] and
+    # info["final_info"] (and the returned observation is the new game's)
+    def __init__(self, num_envs: int, seed: int = 0, **kwargs):
+        self.envs = [TtrisEnv(seed + i, **kwargs) for i in range(num_envs)]
+
+    def __len__(self) -> int:
+        return len(self.envs)
+
+    def reset(self, seeds: Optional[Sequence[int]] = None):
+        seeds = seeds if seeds is not None else [None] * len(self.envs)
+        results = [env.reset(seed) for env, seed in zip(self.envs, seeds)]
+        return self._stack([obs for obs, _ in results]), [info for _, info in results]
+
+    def step(self, actions: Sequence[int]):
+        observations = []
+        rewards = np.zeros(len(self.envs), dtype=np.float64)
+        terminated = np.zeros(len(self.envs), dtype=bool)
+        truncated = np.zeros(len(self.envs), dtype=bool)
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            obs, rewards[i], terminated[i], truncated[i], info = env.step(int(action))
+            if terminated[i] or truncated[i]:
+                final = {"final_observation": obs, "final_info": info}
+                obs, info = env.reset()
+                info.update(final)
+            observations.append(obs)
+            infos.append(info)
+        return self._stack(observations), rewards, terminated, truncated, infos
+
+    @staticmethod
+    def _stack(observations: List[Dict]) -> Dict[str, np.ndarray]:
+        return {
+            key: np.stack([obs[key] for obs in observations]) for key in observations[0]
+        }
@@ -0,0 +1,72 @@
+from collections import defaultdict
+from enum import Enum
+from typing import Any, Callable, Dict, List, NamedTuple
+
+
+class EventType(Enum):
+    MOVE = 0
+    ROTATE = 1
+    TSPIN = 2
+    HOLD = 3
+    LOCK = 4
+    CLEAR = 5
+    LEVEL_UP = 6
+    TOP_OUT = 7
+    GARBAGE = 8
+
+
+class Event(NamedTuple):
+    type: EventType
+    frame: int
+    # what happened, by type:
+    #   MOVE, ROTATE, TOP_OUT  None
+    #   TSPIN                  the TSpinType of the rotation
+    #   HOLD                   the MinoType put on hold
+    #   LOCK                   the LockEvent of the locked piece
+    #   CLEAR                  the same LockEvent, when the lock cleared lines
+    #   LEVEL_UP               the new level
+    #   GARBAGE                the number of garbage lines added
+    data: Any = None
+
+
+Handler = Callable[[Event], None]
+
+
+class EventBus:
+    # game events (sound, scoring, telemetry, ...) go to the handlers that
+    # subscribed to their type, in subscription order. A board without a bus
+    # skips building events altogether
+    def __init__(self):
+        self._handlers: Dict[EventType, List[Handler]] = defaultdict(list)
+
+    def subscribe(self, handler: Handler, *types: EventType) -> None:
+        # call `handler` with every event of the given types (all when none given)
+        for event_type in types or EventType:
+            self._handlers[event_type].append(handler)
+
+    def unsubscribe(self, handler: Handler) -> None:
+        for handlers in self._handlers.values():
+            while handler in handlers:
+                handlers.remove(handler)
+
+    def emit(self, event_type: EventType, frame: int, data: Any = None) -> None:
+        handlers = self._handlers.get(event_type)
+        if handlers:
+            event = Event(event_type, frame, data)
+            for handler in handlers:
+                handler(event)
+
+
+class EventLog:
+    # a handler that keeps events to be consumed in batches (e.g. between
+    # chunks of simulated frames) instead of reacting to each one
+    def __init__(self):
+        self.events: List[Event] = []
+
+    def __call__(self, event: Event) -> None:
+        self.events.append(event)
+
+    def drain(self) -> List[Event]:
+        # events logged since the last drain, oldest first
+        events, self.events = self.events, []
+        return events
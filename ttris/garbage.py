@@ -0,0 +1,78 @@
+from random import Random
+from typing import List
+
+from ttris.constants import BOARD_WIDTH
+from ttris.enums import TSpinType
+from ttris.scoring import LockEvent
+
+# garbage lines sent by a lock, by lines cleared
+LINE_ATTACK = (0, 0, 1, 2, 4)
+TSPIN_ATTACK = (0, 2, 4, 6)
+TSPIN_MINI_ATTACK = (0, 0, 1)
+BACK_TO_BACK_ATTACK = 1
+PERFECT_CLEAR_ATTACK = 10
+# extra lines by combo count (1 being the first clear), the last one repeats
+COMBO_ATTACK = (0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 4, 5)
+
+
+class Attack:
+    # garbage lines sent by each lock of a game, fed one lock event at a time
+    # like Scoring (it keeps its own back-to-back state)
+    def __init__(self):
+        self.back_to_back = False
+        self.lines_sent = 0
+
+    def lock(self, event: LockEvent) -> int:
+        lines = event.lines
+        if not lines:
+            return 0
+        if event.tspin == TSpinType.TSPIN:
+            attack = TSPIN_ATTACK[min(lines, 3)]
+        elif event.tspin == TSpinType.MINI:
+            attack = TSPIN_MINI_ATTACK[min(lines, 2)]
+        else:
+            attack = LINE_ATTACK[lines]
+
+        difficult = lines == 4 or bool(event.tspin)
+        if difficult and self.back_to_back:
+            attack += BACK_TO_BACK_ATTACK
+        self.back_to_back = difficult
+        attack += COMBO_ATTACK[min(event.combo, len(COMBO_ATTACK) - 1)]
+        if event.perfect_clear:
+            attack += PERFECT_CLEAR_ATTACK
+        self.lines_sent += attack
+        return attack
+
+
+class GarbageQueue:
+    # garbage lines sent to a player that haven't come up yet, lines the player
+    # sends cancel them first, what's left comes up after a lock that clears
+    # no lines
+    def __init__(self, seed=None):
+        # (lines, hole column) batches, oldest first
+        self.pending: List[List[int]] = []
+        # the hole column of every batch, from a seeded generator
+        self.r = Random(seed)
+
+    def __len__(self) -> int:
+        return sum(lines for lines, _ in self.pending)
+
+    def receive(self, lines: int) -> None:
+        if lines:
+            self.pending.append([lines, self.r.randrange(BOARD_WIDTH)])
+
+    def cancel(self, lines: int) -> int:
+        # cancel up to `lines` pending lines, returns the lines left over
+        while lines and self.pending:
+            batch = self.pending[0]
+            cancelled = min(lines, batch[0])
+            batch[0] -= cancelled
+            lines -= cancelled
+            if not batch[0]:
+                self.pending.pop(0)
+        return lines
+
+    def take(self) -> List[List[int]]:
+        # every pending batch, which the caller adds to the board
+        pending, self.pending = self.pending, []
+        return pending
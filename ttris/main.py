@@ -1,19 +1,100 @@
+from random import Random
+
 import pyxel
 
 from ttris.board import Board
+from ttris.constants import LEVEL_GRAVITY_FRAMES
+from ttris.controls import Controller
+from ttris.events import EventBus
+from ttris.renderer import BoardRenderer
+from ttris.replay import Replay
+from ttris.sound import SoundBoard
+
+# input timings in frames, an ARR of 0 slides pieces straight to the wall
+DAS = 10
+ARR = 1
+# soft drop speed as a multiple of gravity (capped at a block a frame), this
+# one soft drops a block a frame from level 1, math.inf drops to the floor
+SDF = LEVEL_GRAVITY_FRAMES[0]
+LOOKAHEAD = 5
+# pieces a practice game can be rewound by
+PRACTICE_UNDO_PIECES = 50
 
 
 class TtrisGame:
-    def __init__(self) -> None:
-        self.board = Board(10, 1, 5)
+    def __init__(
+        self,
+        seed=None,
+        replay_path=None,
+        profile=False,
+        practice=False,
+        das=DAS,
+        arr=ARR,
+        sdf=SDF,
+    ) -> None:
+        # every game is seeded (randomly by default) so it can be replayed
+        self.seed: int = seed if seed is not None else Random().getrandbits(64)
+        # sound (and anything else reacting to the game) subscribes to its events
+        self.events = EventBus()
+        SoundBoard().subscribe(self.events)
+        self.board = Board(LOOKAHEAD, events=self.events, seed=self.seed)
+        self.controller = Controller(das, arr, sdf)
+        self.renderer = BoardRenderer(self.board)
+        self.replay = Replay(self.seed, das, arr, LOOKAHEAD, pyxel.frame_count)
+        # save the replay here once the game is over
+        self.replay_path = replay_path
+        # practice games can undo pieces (and aren't saved, since undoing
+        # isn't something a replay can play back)
+        self.practice = practice
+        if practice:
+            self.board.keepHistory(PRACTICE_UNDO_PIECES)
+        # time the game's hot sections and draw a frame time graph (F12 dumps
+        # the recorded frames), left out entirely when not profiling
+        self.profiler = None
+        if profile:
+            from ttris.profiler import FrameProfiler
+
+            self.profiler = FrameProfiler()
+            self.profiler.attach(self)
 
     def update(self) -> None:
-        self.board.update()
-        pass
+        if self.practice and self.controller.checkUndoKey():
+            # the board rewinds even out of a game over
+            self.board.rewind()
+            return
+        if self.board.game_over:
+            if self.controller.checkRestartKey():
+                self.restart()
+            return
+        actions = self.controller.checkControls(self.board.soft_drop_timer)
+        self.replay.record(actions)
+        self.board.update(pyxel.frame_count, actions)
+        if self.board.game_over and self.replay_path and not self.practice:
+            self.replay.save(self.replay_path)
+
+    def restart(self, seed=None) -> None:
+        # play a new game on the same board, controller and sound board, the
+        # board resets in place so there is nothing to build
+        self.seed = seed if seed is not None else Random().getrandbits(64)
+        self.board.reset(self.seed)
+        # (restarted during an update, the new game's first frame is the next)
+        self.replay = Replay(
+            self.seed,
+            self.controller.das,
+            self.controller.arr,
+            LOOKAHEAD,
+            pyxel.frame_count + 1,
+        )
+        self.renderer.invalidate()
+
+    @property
+    def draw_calls(self) -> int:
+        # draw calls issued for the last frame
+        return self.renderer.draw_calls
 
     def draw(self) -> None:
-        pyxel.cls(0)
-        self.board.draw()
+        # the renderer only redraws what changed, so the screen isn't cleared
+        self.renderer.draw()
 
     def run(self) -> None:
         pyxel.run(self.update, self.draw)
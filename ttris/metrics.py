@@ -0,0 +1,87 @@
+from typing import List, NamedTuple, Sequence, Tuple
+
+from ttris.constants import BOARD_WIDTH
+
+FULL_ROW_MASK = (1 << BOARD_WIDTH) - 1
+
+# lookup tables over every possible row mask
+# number of blocks in a row
+ROW_BLOCKS = tuple(bin(mask).count("1") for mask in range(1 << BOARD_WIDTH))
+# columns that have a block in a row
+ROW_COLUMNS = tuple(
+    tuple(x for x in range(BOARD_WIDTH) if mask >> x & 1)
+    for mask in range(1 << BOARD_WIDTH)
+)
+
+
+class BoardMetrics(NamedTuple):
+    # shape of a board's stack
+    holes: int  # empty cells under the top block of their column
+    max_height: int
+    aggregate_height: int  # sum of all column heights
+    bumpiness: int  # sum of height differences between neighbouring columns
+    well_depth: int  # of the deepest column lower than both its neighbours
+
+
+def heightMetrics(heights: Sequence[int], blocks: int) -> BoardMetrics:
+    # metrics from the column heights and the number of blocks on the board,
+    # every cell under a column's height that isn't a block is a hole
+    aggregate_height = sum(heights)
+    bumpiness = 0
+    well_depth = 0
+    for x in range(BOARD_WIDTH):
+        height = heights[x]
+        # a wall counts as high as the column's other neighbour
+        left = heights[x - 1] if x else heights[x + 1]
+        right = heights[x + 1] if x + 1 < BOARD_WIDTH else left
+        if x:
+            bumpiness += abs(height - left)
+        depth = min(left, right) - height
+        if depth > well_depth:
+            well_depth = depth
+    return BoardMetrics(
+        aggregate_height - blocks,
+        max(heights),
+        aggregate_height,
+        bumpiness,
+        well_depth,
+    )
+
+
+# every new game starts on an empty board
+EMPTY_METRICS = heightMetrics((0,) * BOARD_WIDTH, 0)
+
+
+def maskMetrics(masks: Sequence[int]) -> Tuple[int, BoardMetrics]:
+    # lines a board of row masks would clear and the metrics of the board
+    # left after clearing them, without building it
+    rows: List[int] = [mask for mask in masks if mask != FULL_ROW_MASK]
+    heights = [0] * BOARD_WIDTH
+    blocks = 0
+    covered = 0
+    height = len(rows)
+    for mask in rows:
+        if mask:
+            # the first block from the top sets a column's height
+            for x in ROW_COLUMNS[mask & ~covered]:
+                heights[x] = height
+            blocks += ROW_BLOCKS[mask]
+            covered |= mask
+        height -= 1
+    return len(masks) - len(rows), heightMetrics(heights, blocks)
+
+
+def columnHeights(masks: Sequence[int]) -> List[int]:
+    # height of every column of a board of row masks
+    heights = [0] * BOARD_WIDTH
+    covered = 0
+    height = len(masks)
+    for mask in masks:
+        if mask & ~covered:
+            for x in ROW_COLUMNS[mask & ~covered]:
+                heights[x] = height
+            covered |= mask
+            if covered == FULL_ROW_MASK:
+                break
+        height -= 1
+    return heights
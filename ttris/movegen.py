@@ -0,0 +1,161 @@
+from collections import OrderedDict, deque
+from typing import List, NamedTuple, Optional, Tuple
+
+from ttris.bitboard import BitBoard
+from ttris.enums import Action, MinoType, RotationDirection, TSpinType
+from ttris.tetriminos import Tetrimino
+
+_ROTATIONS = (
+    (Action.ROTATE_CW, RotationDirection.CLOCKWISE),
+    (Action.ROTATE_CCW, RotationDirection.COUNTERCLOCKWISE),
+    (Action.ROTATE_180, RotationDirection.FLIP180),
+)
+
+
+class Placement(NamedTuple):
+    # a final resting position of a mino, and how to get there from where the
+    # search started (spawn by default)
+    x: int
+    y: int
+    spin: int
+    tspin: TSpinType
+    # shortest sequence of inputs from the start, one per frame, ending in a
+    # hard drop (gravity and lock delay are not accounted for)
+    path: Tuple[Action, ...]
+
+
+class MoveGenerator:
+    # finds every placement a mino can reach from spawn (or any other start
+    # pose) with moves, soft drops and SRS rotations, results are cached per
+    # board, mino type and start
+    def __init__(self, cache_size: int = 4096):
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def placements(
+        self,
+        board: BitBoard,
+        minoType: MinoType,
+        pose: Optional[Tuple[int, int, int]] = None,
+        tspin: TSpinType = TSpinType.NONE,
+    ) -> List[Placement]:
+        # placements reachable from the (x, y, spin) pose of a mino in play
+        # whose last rotation counted as `tspin`, or from spawn without a pose.
+        # The board masks cover every block, so equal keys mean equal boards
+        key = (minoType, tuple(board.masks), pose, tspin)
+        placements = self._cache.get(key)
+        if placements is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return placements
+
+        self.misses += 1
+        placements = self._search(board, minoType, pose, tspin)
+        self._cache[key] = placements
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return placements
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def _search(
+        self,
+        board: BitBoard,
+        minoType: MinoType,
+        pose: Optional[Tuple[int, int, int]],
+        tspin: TSpinType,
+    ) -> List[Placement]:
+        # breadth first search over (x, y, spin, t-spin value) states, so the
+        # first path found to every placement is also the shortest one
+        mino = Tetrimino(minoType)
+        if pose is not None:
+            mino.setPose(*pose)
+        if not mino.isValidPosition(board):
+            return []
+        states = mino.states
+        is_t = minoType == MinoType.MINO_T
+        fits = board.fits
+        none = TSpinType.NONE.value
+
+        # (input, rotation state, new spin, SRS tests) of every rotation per spin
+        rotations = [
+            [
+                (
+                    action,
+                    states[(spin + direction.value) % 4],
+                    (spin + direction.value) % 4,
+                    mino.kickTests(direction, spin),
+                )
+                for action, direction in _ROTATIONS
+            ]
+            for spin in range(4)
+        ]
+
+        start = (mino.x, mino.y, mino.spin, tspin.value)
+        parents = {start: None}
+        queue = deque([start])
+        resting = {}
+
+        while queue:
+            state = queue.popleft()
+            x, y, spin, tspin = state
+            state_arr = states[spin]
+
+            for new_state, action in (
+                ((x - 1, y, spin, none), Action.LEFT),
+                ((x + 1, y, spin, none), Action.RIGHT),
+            ):
+                if new_state not in parents and fits(state_arr, new_state[0], y):
+                    parents[new_state] = (state, action)
+                    queue.append(new_state)
+
+            if fits(state_arr, x, y + 1):
+                new_state = (x, y + 1, spin, none)
+                if new_state not in parents:
+                    parents[new_state] = (state, Action.SOFT_DROP)
+                    queue.append(new_state)
+            else:
+                # can't fall any further, so this is where a hard drop locks it
+                # (minos that look the same in different spins count once)
+                x_masks = state_arr.x_masks[x + state_arr.min_col]
+                key = (tuple((y + dy, mask) for dy, mask in x_masks), tspin)
+                if key not in resting:
+                    resting[key] = state
+
+            for action, rotated, new_spin, tests in rotations[spin]:
+                for kick in tests:
+                    new_x, new_y = x + kick[0], y - kick[1]
+                    if not fits(rotated, new_x, new_y):
+                        continue
+                    new_tspin = none
+                    # like the board, a t-spin only counts if the mino locks
+                    # without moving (or falling) after the rotation
+                    if is_t and not fits(rotated, new_x, new_y + 1):
+                        mino.setPose(new_x, new_y, new_spin)
+                        mino.prev_kick = kick
+                        new_tspin = mino.checkTSpin(board).value
+                    new_state = (new_x, new_y, new_spin, new_tspin)
+                    if new_state not in parents:
+                        parents[new_state] = (state, action)
+                        queue.append(new_state)
+                    break
+
+        placements = []
+        for state in resting.values():
+            path = [Action.HARD_DROP]
+            node = parents[state]
+            # soft drops straight into the resting spot are left to the hard drop
+            while node is not None and node[1] == Action.SOFT_DROP:
+                node = parents[node[0]]
+            while node is not None:
+                parent, action = node
+                path.append(action)
+                node = parents[parent]
+            x, y, spin, tspin = state
+            placements.append(
+                Placement(x, y, spin, TSpinType(tspin), tuple(reversed(path)))
+            )
+        return placements
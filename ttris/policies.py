@@ -0,0 +1,162 @@
+from collections import deque
+from importlib import import_module
+from random import Random
+from typing import Callable, Dict, List, Optional
+
+from ttris.board import Board
+from ttris.enums import Action, MinoType, RotationDirection
+from ttris.metrics import maskMetrics
+from ttris.movegen import MoveGenerator, Placement
+from ttris.rotations import ROTATION_STATES
+from ttris.search import LookaheadSearch, defaultHeuristic
+from ttris.tetriminos import Tetrimino
+
+# a policy plays a headless game: it is called with the board before every
+# frame and returns the Action flags to press on that frame, so a simulated
+# game goes through the same frames (gravity, lock delay, kicks) as a played
+# one and can be recorded as a replay. Policies are built from a per-game seed
+# so every simulated game can be reproduced exactly
+Policy = Callable[[Board], Action]
+
+_SHUFFLES = (Action.NONE, Action.ROTATE_CW, Action.ROTATE_CCW, Action.ROTATE_180)
+_ROTATIONS = {
+    Action.ROTATE_CW: RotationDirection.CLOCKWISE,
+    Action.ROTATE_CCW: RotationDirection.COUNTERCLOCKWISE,
+    Action.ROTATE_180: RotationDirection.FLIP180,
+}
+
+
+class RandomPolicy:
+    # turns and shifts every piece randomly, then hard drops it
+    def __init__(self, seed=None):
+        self.r = Random(seed)
+        self.piece = None
+        self.plan: deque = deque()
+
+    def __call__(self, board: Board) -> Action:
+        if board.curr_piece is not self.piece:
+            self.piece = board.curr_piece
+            shift = self.r.randint(-5, 5)
+            self.plan = deque(
+                [self.r.choice(_SHUFFLES)]
+                + [Action.LEFT if shift < 0 else Action.RIGHT] * abs(shift)
+            )
+        return self.plan.popleft() if self.plan else Action.HARD_DROP
+
+
+class _Route:
+    # the actions of a placement's path, one a frame, and the pose each of them
+    # leaves the piece in. Gravity can knock the piece off the path before it
+    # gets there, which shows as the piece not being where the last action left
+    # it, and the route is planned again from where the piece is then
+    def __init__(self, board: Board, placement: Placement):
+        piece = self.piece = board.curr_piece
+        self.pose = (piece.x, piece.y, piece.spin)
+        ghost = Tetrimino(piece.minoType, *self.pose)
+        board_arr = board.board_arr
+        self.steps: deque = deque()
+        for action in placement.path[:-1]:
+            if action == Action.LEFT:
+                ghost.moveX(-1, board_arr)
+            elif action == Action.RIGHT:
+                ghost.moveX(1, board_arr)
+            elif action == Action.SOFT_DROP:
+                ghost.softDrop(board_arr)
+            else:
+                ghost.rotateMino(_ROTATIONS[action], board_arr)
+            self.steps.append((action, (ghost.x, ghost.y, ghost.spin)))
+        self.steps.append((Action.HARD_DROP, None))
+
+    def onTrack(self, board: Board) -> bool:
+        piece = board.curr_piece
+        return (
+            piece is self.piece
+            and (piece.x, piece.y, piece.spin) == self.pose
+            and bool(self.steps)
+        )
+
+    def nextAction(self) -> Action:
+        action, self.pose = self.steps.popleft()
+        return action
+
+
+class GreedyPolicy:
+    # looks at every placement the current piece can reach from where it is and
+    # steers it into the one that leaves the best looking board (low, flat and
+    # without holes), ties are broken at random
+    def __init__(self, seed=None):
+        self.r = Random(seed)
+        self.movegen = MoveGenerator(cache_size=256)
+        self.route: Optional[_Route] = None
+
+    def __call__(self, board: Board) -> Action:
+        if self.route is None or not self.route.onTrack(board):
+            piece = board.curr_piece
+            placements = self.movegen.placements(
+                board.board_arr,
+                piece.minoType,
+                (piece.x, piece.y, piece.spin),
+                board.piece_tspin,
+            )
+            if not placements:
+                return Action.HARD_DROP
+            masks = board.board_arr.masks
+            best = max(
+                placements,
+                key=lambda p: (
+                    self._evaluate(masks, piece.minoType, p),
+                    self.r.random(),
+                ),
+            )
+            self.route = _Route(board, best)
+        return self.route.nextAction()
+
+    def _evaluate(
+        self, masks: List[int], minoType: MinoType, placement: Placement
+    ) -> float:
+        state = ROTATION_STATES[minoType][placement.spin]
+        masks = list(masks)
+        for dy, mask in state.x_masks[placement.x + state.min_col]:
+            masks[placement.y + dy] |= mask
+        return defaultHeuristic(*maskMetrics(masks))
+
+
+class SearchPolicy:
+    # steers every piece into the placement the lookahead search suggests,
+    # holding first when that's part of it
+    def __init__(self, seed=None, depth: int = 2, beam: int = 4):
+        self.search = LookaheadSearch(depth, beam)
+        self.route: Optional[_Route] = None
+
+    def __call__(self, board: Board) -> Action:
+        if self.route is None or not self.route.onTrack(board):
+            suggestion = self.search.suggest(board)
+            if suggestion is None:
+                return Action.HARD_DROP
+            if suggestion.hold:
+                # the piece it brings in is searched again next frame
+                self.route = None
+                return Action.HOLD
+            self.route = _Route(board, suggestion.placement)
+        return self.route.nextAction()
+
+
+POLICIES: Dict[str, Callable[..., Policy]] = {
+    "random": RandomPolicy,
+    "greedy": GreedyPolicy,
+    "search": SearchPolicy,
+}
+
+
+def loadPolicy(name: str) -> Callable[..., Policy]:
+    # a built-in policy name, or "package.module:factory" for any other policy
+    # (the factory is called with the game seed and returns the policy)
+    if name in POLICIES:
+        return POLICIES[name]
+    module, sep, attr = name.partition(":")
+    if not sep:
+        raise ValueError(
+            f"Unknown policy {name!r}, expected one of {', '.join(POLICIES)} "
+            "or module:factory"
+        )
+    return getattr(import_module(module), attr)
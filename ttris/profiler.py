@@ -0,0 +1,173 @@
+import csv
+from array import array
+from time import perf_counter_ns
+from typing import Dict, List
+
+import pyxel
+
+from ttris.score import Score
+from ttris.stats import percentile
+
+# sections timed every frame, in the order they run
+SECTIONS = (
+    "update",
+    "checkControls",
+    "Board.update",
+    "gravity",
+    "lockDelayExpired",
+    "clearLines",
+    "draw",
+    "drawBoard",
+    "drawQueue",
+    "Score.draw",
+)
+FRAME_BUDGET_NS = 1_000_000_000 // 60
+DUMP_KEY = pyxel.KEY_F12
+
+# frame time graph in the bottom right corner of the screen, under the queue
+GRAPH_X = 133
+GRAPH_Y = 177
+GRAPH_WIDTH = 45
+GRAPH_HEIGHT = 20
+
+
+class FrameProfiler:
+    # times the hot sections of a running game into a ring buffer of the last
+    # `size` frames and draws a frame time graph over the game. Nothing is
+    # wrapped until attach(), so a game without a profiler runs untouched
+    def __init__(self, size: int = 600, dump_path: str = "ttris_profile.csv"):
+        self.size = size
+        self.dump_path = dump_path
+        # nanoseconds spent per section, indexed by frame % size
+        self.samples: Dict[str, array] = {
+            name: array("q", [0]) * size for name in SECTIONS
+        }
+        self.frames = 0
+        self._slot = 0
+        self._patches: List[tuple] = []
+
+    def attach(self, game) -> None:
+        # swap the timed sections of a TtrisGame (before game.run()) for
+        # timing wrappers, and draw the overlay after every frame
+        update = self._wrap("update", game.update)
+        draw = self._wrap("draw", game.draw)
+
+        def profiledUpdate():
+            self.startFrame()
+            update()
+            if pyxel.btnp(DUMP_KEY):
+                self.dump(self.dump_path)
+
+        def profiledDraw():
+            draw()
+            self.drawOverlay(game.draw_calls)
+
+        self._patch(game, "update", profiledUpdate)
+        self._patch(game, "draw", profiledDraw)
+        self._patch(
+            game.controller,
+            "checkControls",
+            self._wrap("checkControls", game.controller.checkControls),
+        )
+        board = game.board
+        for attr, name in (
+            ("update", "Board.update"),
+            ("applyGravity", "gravity"),
+            ("lockDelayExpired", "lockDelayExpired"),
+            ("clearLines", "clearLines"),
+        ):
+            self._patch(board, attr, self._wrap(name, getattr(board, attr)))
+        for attr in ("drawBoard", "drawQueue"):
+            self._patch(
+                game.renderer, attr, self._wrap(attr, getattr(game.renderer, attr))
+            )
+        # a staticmethod, so it is swapped on the class until detach()
+        self._patch(Score, "draw", staticmethod(self._wrap("Score.draw", Score.draw)))
+
+    def detach(self) -> None:
+        # put back everything attach() swapped out
+        for obj, attr, original in reversed(self._patches):
+            if original is None:
+                delattr(obj, attr)
+            else:
+                setattr(obj, attr, original)
+        self._patches.clear()
+
+    def startFrame(self) -> None:
+        self._slot = self.frames % self.size
+        for samples in self.samples.values():
+            samples[self._slot] = 0
+        self.frames += 1
+
+    def frameTimes(self) -> List[int]:
+        # update + draw time of every buffered frame, oldest first
+        update, draw = self.samples["update"], self.samples["draw"]
+        return [update[i] + draw[i] for i in self._order()]
+
+    def dump(self, path: str) -> None:
+        # write the buffered frames as csv, one row per frame (in microseconds)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame",) + SECTIONS)
+            order = self._order()
+            first = self.frames - len(order)
+            for n, i in enumerate(order):
+                writer.writerow(
+                    [first + n]
+                    + [f"{self.samples[name][i] / 1000:.1f}" for name in SECTIONS]
+                )
+
+    def drawOverlay(self, draw_calls: int) -> None:
+        times = self.frameTimes()
+        if not times:
+            return
+        # the screen isn't cleared between frames, so clear the overlay first
+        pyxel.rect(GRAPH_X, GRAPH_Y - 20, GRAPH_WIDTH, GRAPH_HEIGHT + 20, 0)
+        # one bar per frame, the top of the box is the 60 FPS frame budget
+        for x, ns in enumerate(times[-GRAPH_WIDTH:]):
+            height = min(GRAPH_HEIGHT, ns * GRAPH_HEIGHT // FRAME_BUDGET_NS)
+            color = (
+                11 if ns < FRAME_BUDGET_NS // 2 else 10 if ns < FRAME_BUDGET_NS else 8
+            )
+            pyxel.line(
+                GRAPH_X + x,
+                GRAPH_Y + GRAPH_HEIGHT - 1,
+                GRAPH_X + x,
+                GRAPH_Y + GRAPH_HEIGHT - height,
+                color,
+            )
+        pyxel.rectb(GRAPH_X - 1, GRAPH_Y - 1, GRAPH_WIDTH + 2, GRAPH_HEIGHT + 2, 13)
+        times.sort()
+        pyxel.text(
+            GRAPH_X,
+            GRAPH_Y - 20,
+            f"P50 {percentile(times, 50) / 1e6:.1f}MS\n"
+            f"P99 {percentile(times, 99) / 1e6:.1f}MS\n"
+            f"{draw_calls} CALLS",
+            7,
+        )
+
+    def _order(self) -> List[int]:
+        # ring buffer slots of the recorded frames, oldest first
+        if self.frames <= self.size:
+            return list(range(self.frames))
+        start = self.frames % self.size
+        return [*range(start, self.size), *range(start)]
+
+    def _wrap(self, name: str, fn):
+        samples = self.samples[name]
+
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples[self._slot] += perf_counter_ns() - start
+
+        return timed
+
+    def _patch(self, obj, attr: str, replacement) -> None:
+        # instance attributes are removed again on detach, class ones restored
+        original = obj.__dict__.get(attr) if isinstance(obj, type) else None
+        self._patches.append((obj, attr, original))
+        setattr(obj, attr, replacement)
@@ -0,0 +1,317 @@
+import pyxel
+
+from ttris.constants import (
+    BLOCK_SIZE,
+    BOARD_HEIGHT,
+    BOARD_WIDTH,
+    BOARD_X,
+    BOARD_Y,
+    LOCK_DELAY,
+    MAX_LOCKS,
+    OVERFLOW_HEIGHT,
+    SPAWN_X,
+    SPAWN_Y,
+)
+from ttris.enums import MinoType
+from ttris.rotations import ROTATION_STATES
+from ttris.score import Score
+from ttris.tetriminos import Tetrimino
+
+# screen areas (x, y, w, h) of the hold and next panels
+HOLD_PANEL = (BOARD_X - 48, BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 10, 48, 32)
+QUEUE_PANEL = (
+    BOARD_X + (BLOCK_SIZE * BOARD_WIDTH),
+    BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 10,
+    48,
+    130,
+)
+# screen area of the lock delay meter under the board
+METER = (
+    BOARD_X - 1,
+    BOARD_Y + (BLOCK_SIZE * BOARD_HEIGHT),
+    BLOCK_SIZE * BOARD_WIDTH + 1,
+    1,
+)
+
+
+class Canvas:
+    # a pyxel image (the screen or an offscreen one) that counts the draw
+    # calls made on it
+    def __init__(self, img: pyxel.Image):
+        self.img = img
+        self.calls = 0
+
+    def blt(self, x, y, img, u, v, w, h) -> None:
+        self.calls += 1
+        self.img.blt(x, y, img, u, v, w, h)
+
+    def rect(self, x, y, w, h, col) -> None:
+        self.calls += 1
+        self.img.rect(x, y, w, h, col)
+
+    def rectb(self, x, y, w, h, col) -> None:
+        self.calls += 1
+        self.img.rectb(x, y, w, h, col)
+
+    def text(self, x, y, s, col) -> None:
+        self.calls += 1
+        self.img.text(x, y, s, col)
+
+    def cls(self, col) -> None:
+        self.calls += 1
+        self.img.cls(col)
+
+    def dither(self, alpha) -> None:
+        self.img.dither(alpha)
+
+
+class BoardRenderer:
+    # the screen is not cleared between frames, regions that changed since the
+    # last frame are restored from the layer and only those are drawn again
+    def __init__(self, board):
+        self.board = board
+        # offscreen layer with everything that only changes when a new piece
+        # comes into play (locked blocks, borders, hold and next panels)
+        self.layer = pyxel.Image(pyxel.width, pyxel.height)
+        self.layer_canvas = Canvas(self.layer)
+        self.screen = Canvas(pyxel.screen)
+        # draw calls issued by the last draw()
+        self.draw_calls = 0
+
+        # what the layer shows, to only redraw the parts that changed
+        self._layer_piece = None
+        # (board hash, row moves, game over) the layer was drawn at, garbage
+        # can raise the stack or end the game without a new piece
+        self._layer_state = None
+        self._layer_rows = []
+        self._layer_hold = None
+        self._layer_queue = None
+        self._layer_game_over = False
+        # what was drawn on screen on top of the layer last frame
+        self._piece_blocks = []
+        self._meter = None
+        self._score = None
+
+    def invalidate(self) -> None:
+        # redraw the layer and the screen from scratch on the next frame
+        self._layer_piece = None
+
+    def draw(self) -> None:
+        board = self.board
+        screen = self.screen
+        screen.calls = self.layer_canvas.calls = 0
+        board_arr = board.board_arr
+        state = (board_arr.hash, board_arr.row_moves, board.game_over)
+        repaint = (
+            board.curr_piece is not self._layer_piece or state != self._layer_state
+        )
+        if repaint:
+            # a lock, line clear, hold, queue advance, garbage or top out
+            # happened, so update the layer and put all of it back on screen
+            # (which also clears it)
+            self.drawLayer()
+            screen.blt(0, 0, self.layer, 0, 0, self.layer.width, self.layer.height)
+            self._piece_blocks = []
+            self._meter = self._score = None
+
+        # draw current/falling piece
+        self.drawCurrPiece(board.game_over)
+
+        # update score and other game info besides board
+        score = Score.fields(board)
+        if score != self._score:
+            x, y, w, h = Score.AREA
+            screen.blt(x, y, self.layer, x, y, w, h)
+            Score.draw(board, screen)
+            self._score = score
+
+        if board.game_over and repaint:
+            screen.rect(BOARD_X + 15, BOARD_Y + 95, 45, 15, 8)
+            screen.text(BOARD_X + 20, BOARD_Y + 100, "GAME OVER", 7)
+
+        self.draw_calls = screen.calls + self.layer_canvas.calls
+
+    def drawLayer(self) -> None:
+        board = self.board
+        layer = self.layer_canvas
+        if self._layer_piece is None or board.game_over != self._layer_game_over:
+            # start over (game over dims every block)
+            layer.cls(0)
+            self._layer_rows = [
+                [MinoType.NO_MINO] * BOARD_WIDTH for _ in board.board_arr
+            ]
+            self._layer_hold = self._layer_queue = None
+            self._layer_game_over = board.game_over
+            self.drawBorder(layer)
+        # draw board elements
+        self.drawBoard(layer, board.game_over)
+        # draw hold and queue pieces & elements
+        hold = (board.hold.minoType if board.hold else None, board.hold_lock)
+        if hold != self._layer_hold:
+            self.drawHold(layer)
+            self._layer_hold = hold
+        queue = board.mino_provider.minoPreview
+        if queue != self._layer_queue:
+            self.drawQueue(layer)
+            self._layer_queue = queue
+        self._layer_piece = board.curr_piece
+        board_arr = board.board_arr
+        self._layer_state = (board_arr.hash, board_arr.row_moves, board.game_over)
+
+    def drawBorder(self, img: Canvas) -> None:
+        # draw the bounding box up to the 20th block
+        img.rectb(
+            BOARD_X - 1,
+            BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 1,
+            (BOARD_WIDTH * BLOCK_SIZE) + 2,
+            ((BOARD_HEIGHT - OVERFLOW_HEIGHT) * BLOCK_SIZE) + 2,
+            13,
+        )
+        # "undraw" the top edge of the board border
+        img.rect(
+            BOARD_X,
+            BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 1,
+            (BOARD_WIDTH * BLOCK_SIZE),
+            1,
+            0,
+        )
+
+    def drawBoard(self, img: Canvas, game_over: bool) -> None:
+        # draw the cells that changed since the layer was last drawn
+        if game_over:
+            img.dither(0.5)
+        layer_rows = self._layer_rows
+        for i, row in enumerate(self.board.board_arr):
+            layer_row = layer_rows[i]
+            if row == layer_row:
+                continue
+            for j, block in enumerate(row):
+                if block == layer_row[j]:
+                    continue
+                x = j * BLOCK_SIZE + BOARD_X
+                y = i * BLOCK_SIZE + BOARD_Y
+                if block == MinoType.NO_MINO:
+                    img.rect(x, y, BLOCK_SIZE, BLOCK_SIZE, 0)
+                elif block == MinoType.GARBAGE:
+                    img.rect(x, y, BLOCK_SIZE, BLOCK_SIZE, 13)
+                else:
+                    u = (block.value - 1) * BLOCK_SIZE
+                    img.blt(x, y, 1, u, 0, BLOCK_SIZE, BLOCK_SIZE)
+            layer_row[:] = row
+        img.dither(1)
+
+    def drawCurrPiece(self, game_over: bool) -> None:
+        screen = self.screen
+        curr_piece = self.board.curr_piece
+        # draw hint first, then the actual piece
+        blocks = self.minoBlocks(curr_piece)
+        if not game_over:
+            blocks = self.minoBlocks(curr_piece, hint=True) + blocks
+        # locking status of current piece
+        meter = self.lockDelayMeter(curr_piece, *METER[:3])
+
+        # put back what was under them last frame before drawing them again
+        redraw_blocks = blocks != self._piece_blocks
+        if redraw_blocks:
+            for x, y, _ in self._piece_blocks:
+                screen.blt(x, y, self.layer, x, y, BLOCK_SIZE, BLOCK_SIZE)
+        redraw_meter = meter != self._meter
+        if redraw_meter and self._meter:
+            x, y, w, h = METER
+            screen.blt(x, y, self.layer, x, y, w, h)
+
+        if game_over:
+            screen.dither(0.5)
+        if redraw_blocks:
+            for x, y, u in blocks:
+                screen.blt(x, y, 1, u, 0, BLOCK_SIZE, BLOCK_SIZE)
+            self._piece_blocks = blocks
+        if redraw_meter:
+            if meter:
+                screen.rect(*meter)
+            self._meter = meter
+        screen.dither(1)
+
+    def drawHold(self, img: Canvas) -> None:
+        hold = self.board.hold
+        # draw holding piece
+        img.rect(*HOLD_PANEL, 0)
+        img.rectb(*HOLD_PANEL, 13)
+        img.text(BOARD_X - 32, BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 7, "HOLD", 7)
+        if hold:
+            if self.board.hold_lock:
+                img.dither(0.5)
+            self.drawMino(
+                img,
+                hold.minoType,
+                (
+                    -10
+                    if hold.minoType not in [MinoType.MINO_I, MinoType.MINO_O]
+                    else -14
+                ),
+                15,
+            )
+            img.dither(1)
+
+    def drawQueue(self, img: Canvas) -> None:
+        # draw minos/pieces in queue
+        img.rect(*QUEUE_PANEL, 0)
+        img.rectb(*QUEUE_PANEL, 13)
+        img.text(
+            BOARD_X + (BLOCK_SIZE * BOARD_WIDTH) + 16,
+            BOARD_Y + (BLOCK_SIZE * OVERFLOW_HEIGHT) - 7,
+            "NEXT",
+            7,
+        )
+        for i, minoType in enumerate(self.board.mino_provider.minoPreview):
+            self.drawMino(
+                img,
+                minoType,
+                115 + (4 if minoType not in [MinoType.MINO_I, MinoType.MINO_O] else 0),
+                15 + (i * 24) - (4 if minoType is MinoType.MINO_I else 0),
+            )
+
+    def drawMino(self, img: Canvas, minoType: MinoType, x: int, y: int) -> None:
+        # draws a mino (in its spawn position and spin) offset by x, y on the
+        # screen, the way previews and the held piece are shown
+        u = (minoType.value - 1) * BLOCK_SIZE
+        for j, i in ROTATION_STATES[minoType][0].cells:
+            draw_x = (SPAWN_X + j) * BLOCK_SIZE + x
+            draw_y = (SPAWN_Y + i) * BLOCK_SIZE + y
+            img.blt(draw_x, draw_y, 1, u, 0, BLOCK_SIZE, BLOCK_SIZE)
+
+    def minoBlocks(self, mino: Tetrimino, hint=False) -> list:
+        # (x, y, sprite u) of each block of the floating mino on the board
+        # if hint is true, use the outline sprite instead with the hintY value
+        minoTypeVal = mino.minoType.value - 1 if not hint else 7
+        minoY = mino.y if not hint else mino.hintY
+        u = minoTypeVal * BLOCK_SIZE
+        return [
+            ((mino.x + j) * BLOCK_SIZE + BOARD_X, (minoY + i) * BLOCK_SIZE + BOARD_Y, u)
+            for j, i in mino.state.cells
+        ]
+
+    def lockDelayMeter(
+        self,
+        mino: Tetrimino,
+        x: int,
+        y: int,
+        max_length: int,
+        thickness=1,
+        horizontal=True,
+        color=8,
+        last_lock_color=2,
+    ):
+        # rectangle (x, y, w, h, color) of a meter that shows how long until
+        # the piece locks, None while it isn't locking
+        if mino.lock_delay_start == -1:
+            return None
+        time_elapsed = self.board.frame - mino.lock_delay_start
+        # get fraction of max_length to draw based on time elapsed
+        length = int(max_length * (1 - time_elapsed / LOCK_DELAY))
+
+        color = color if mino.lock_resets < MAX_LOCKS - 1 else last_lock_color
+
+        if horizontal:
+            return (x, y, length, thickness, color)
+        return (x, y, thickness, length, color)
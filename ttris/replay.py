@@ -0,0 +1,119 @@
+import struct
+from typing import Iterator, List, Optional
+
+from ttris.board import Board
+from ttris.enums import Action
+
+# replay file layout (all little endian):
+#   header: magic, format version, seed, first frame number, das, arr, lookahead
+#   body:   runs of identical per-frame inputs, each stored as a varint run
+#           length followed by the Action bitmask as a varint
+REPLAY_MAGIC = b"TTRP"
+REPLAY_VERSION = 1
+HEADER = struct.Struct("<4sBQIHHB")
+
+
+def _writeVarint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _readVarint(data: bytes, pos: int):
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise Exception("Truncated ttris replay")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    # a recorded game: the seed and settings it was played with plus the
+    # inputs of every frame, enough to re-simulate it exactly
+    def __init__(
+        self, seed: int, das: int, arr: int, lookahead: int, start_frame: int = 0
+    ):
+        self.seed = seed
+        self.das = das
+        self.arr = arr
+        self.lookahead = lookahead
+        self.start_frame = start_frame
+        # (run length, action bitmask) pairs
+        self.runs: List[List[int]] = []
+
+    @property
+    def frame_count(self) -> int:
+        return sum(length for length, _ in self.runs)
+
+    def record(self, actions: Action) -> None:
+        # add the inputs of the next frame
+        actions = int(actions)
+        if self.runs and self.runs[-1][1] == actions:
+            self.runs[-1][0] += 1
+        else:
+            self.runs.append([1, actions])
+
+    def actions(self) -> Iterator[int]:
+        # per-frame Action bitmasks (as ints) in recorded order
+        for length, actions in self.runs:
+            for _ in range(length):
+                yield actions
+
+    def play(self, board: Optional[Board] = None) -> Board:
+        # re-simulate the recorded game without rendering, returns the board
+        # in its final state
+        if board is None:
+            board = Board(self.lookahead, seed=self.seed)
+        board.run(self.actions(), self.start_frame)
+        return board
+
+    def toBytes(self) -> bytes:
+        out = bytearray(
+            HEADER.pack(
+                REPLAY_MAGIC,
+                REPLAY_VERSION,
+                self.seed,
+                self.start_frame,
+                self.das,
+                self.arr,
+                self.lookahead,
+            )
+        )
+        for length, actions in self.runs:
+            _writeVarint(out, length)
+            _writeVarint(out, actions)
+        return bytes(out)
+
+    @classmethod
+    def fromBytes(cls, data: bytes) -> "Replay":
+        if len(data) < HEADER.size:
+            raise Exception("Truncated ttris replay")
+        magic, version, seed, start_frame, das, arr, lookahead = HEADER.unpack_from(
+            data
+        )
+        if magic != REPLAY_MAGIC:
+            raise Exception("Not a ttris replay")
+        if version != REPLAY_VERSION:
+            raise Exception(f"Unsupported replay version {version}")
+        replay = cls(seed, das, arr, lookahead, start_frame)
+        pos = HEADER.size
+        while pos < len(data):
+            length, pos = _readVarint(data, pos)
+            actions, pos = _readVarint(data, pos)
+            replay.runs.append([length, actions])
+        return replay
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(self.toBytes())
+
+    @classmethod
+    def load(cls, path: str) -> "Replay":
+        with open(path, "rb") as f:
+            return cls.fromBytes(f.read())
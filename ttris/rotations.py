@@ -0,0 +1,68 @@
+from typing import Dict, List, NamedTuple, Tuple
+
+from ttris.constants import BOARD_WIDTH, MINO_ARRS
+from ttris.enums import MinoType
+
+
+class RotationState(NamedTuple):
+    # one precomputed rotation (spin) of a mino
+    mino_arr: List[List[int]]
+    cells: List[Tuple[int, int]]  # (x, y) offsets of each block
+    row_masks: Tuple[Tuple[int, int], ...]  # (y offset, bitmask of block columns)
+    # row_masks already shifted to every in-bounds x, indexed by x + min_col
+    x_masks: Tuple[Tuple[Tuple[int, int], ...], ...]
+    # (x offset, y offset of the lowest block) for each column the mino covers
+    col_bottoms: Tuple[Tuple[int, int], ...]
+    min_col: int
+    max_col: int
+    min_row: int
+    max_row: int
+
+
+def _makeRotationState(mino_arr: List[List[int]]) -> RotationState:
+    cells = [
+        (j, i) for i, row in enumerate(mino_arr) for j, block in enumerate(row) if block
+    ]
+    row_masks = tuple(
+        (i, sum(1 << j for j, block in enumerate(row) if block))
+        for i, row in enumerate(mino_arr)
+        if any(row)
+    )
+    min_col = min(x for x, _ in cells)
+    max_col = max(x for x, _ in cells)
+    x_masks = tuple(
+        tuple((dy, mask << x if x >= 0 else mask >> -x) for dy, mask in row_masks)
+        for x in range(-min_col, BOARD_WIDTH - max_col)
+    )
+    col_bottoms = tuple(
+        (x, max(dy for dx, dy in cells if dx == x))
+        for x in sorted({dx for dx, _ in cells})
+    )
+    return RotationState(
+        mino_arr,
+        cells,
+        row_masks,
+        x_masks,
+        col_bottoms,
+        min_col,
+        max_col,
+        min(y for _, y in cells),
+        max(y for _, y in cells),
+    )
+
+
+def _makeRotationStates(mino_arr: List[List[int]], rotates=True) -> List[RotationState]:
+    # all 4 spins of a mino, each a clockwise rotation of the previous one
+    arrs = [[list(row) for row in mino_arr]]
+    for _ in range(3):
+        arrs.append(
+            [list(row) for row in zip(*arrs[-1][::-1])] if rotates else arrs[-1]
+        )
+    return [_makeRotationState(arr) for arr in arrs]
+
+
+# rotation states indexed by [minoType][spin], built once at import
+ROTATION_STATES: Dict[MinoType, List[RotationState]] = {
+    MinoType(i + 1): _makeRotationStates(mino_arr, MinoType(i + 1) != MinoType.MINO_O)
+    for i, mino_arr in enumerate(MINO_ARRS)
+}
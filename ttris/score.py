@@ -1,27 +1,51 @@
 import pyxel
 
-from ttris.constants import LC_NAMES, MAX_LEVEL
+from ttris.constants import BOARD_X, LC_NAMES, MAX_LEVEL
 from ttris.enums import TSpinType
 
 
 class Score:
+    # screen area (x, y, w, h) the text fields are drawn in
+    AREA = (0, 60, BOARD_X - 1, 96)
+
     def __init__(self):
         pass
 
     @staticmethod
-    def draw(board):
-        pyxel.text(2, 60, f"TOTAL LINES\n{board.lines_cleared}", 7)
-        pyxel.text(
+    def fields(board) -> tuple:
+        # everything the text fields show, equal fields mean an unchanged text
+        return (
+            board.lines_cleared,
+            board.score,
+            board.level,
+            board.lines_cleared_level,
+            board.previous_lc,
+            board.combo_count,
+            board.previous_tspin,
+            Score.perfectClear(board),
+        )
+
+    @staticmethod
+    def perfectClear(board) -> bool:
+        # whether the last lock left the board empty
+        return board.last_lock is not None and board.last_lock.perfect_clear
+
+    @staticmethod
+    def draw(board, img=None):
+        # draws on the screen unless given another image
+        img = img or pyxel.screen
+        img.text(2, 60, f"TOTAL LINES\n{board.lines_cleared}", 7)
+        img.text(
             2,
             80,
             f"LEVEL {board.level if board.level != MAX_LEVEL else 'MAX'}\n{board.lines_cleared_level}/{board.curr_lc_goal_level} LINES",
             7,
         )
 
-        # pyxel.text(2, 100, f"SCORE\n{board.score}", 7)
+        img.text(2, 100, f"SCORE\n{board.score}", 7)
 
         if board.previous_lc > 0:
-            pyxel.text(
+            img.text(
                 2,
                 120,
                 f"{LC_NAMES[board.previous_lc - 1].upper()}",
@@ -29,7 +53,7 @@ class Score:
             )
 
         if board.combo_count > 0:
-            pyxel.text(
+            img.text(
                 2,
                 130,
                 f"{board.combo_count} COMBO",
@@ -37,9 +61,12 @@ class Score:
             )
 
         if board.previous_tspin:
-            pyxel.text(
+            img.text(
                 2,
                 140,
                 "T-SPIN" if board.previous_tspin == TSpinType.TSPIN else "T-SPIN MINI",
                 2,
             )
+
+        if Score.perfectClear(board):
+            img.text(2, 150, "ALL CLEAR", 10)
@@ -0,0 +1,104 @@
+import struct
+from typing import Iterable, NamedTuple
+
+from ttris.enums import TSpinType
+
+# guideline points, multiplied by the level the lock happened at
+LINE_POINTS = (0, 100, 300, 500, 800)  # by lines cleared
+TSPIN_POINTS = (400, 800, 1200, 1600)
+TSPIN_MINI_POINTS = (100, 200, 400)
+PERFECT_CLEAR_POINTS = (0, 800, 1200, 1800, 2000)
+BACK_TO_BACK_PERFECT_TETRIS_POINTS = 3200
+COMBO_POINTS = 50  # per combo step after the first clear
+# drop points, not multiplied by the level
+SOFT_DROP_POINTS = 1  # per cell
+HARD_DROP_POINTS = 2  # per cell
+
+# packed lock event: lines | t-spin << 3 | perfect clear << 5, level,
+# soft drop cells, hard drop cells, combo
+LOCK_RECORD = struct.Struct("<BBBBH")
+
+
+class LockEvent(NamedTuple):
+    # everything that scores when a piece locks
+    lines: int
+    tspin: TSpinType  # if the piece locked where its last rotation put it
+    level: int  # before any level up from this lock's lines
+    combo: int  # combo count after the lock (0 when no lines were cleared)
+    perfect_clear: bool
+    soft_drop: int  # cells the player soft dropped the piece
+    hard_drop: int  # cells the piece was hard dropped
+
+    def pack(self) -> bytes:
+        return LOCK_RECORD.pack(
+            self.lines | self.tspin.value << 3 | self.perfect_clear << 5,
+            self.level,
+            min(self.soft_drop, 0xFF),
+            self.hard_drop,
+            min(self.combo, 0xFFFF),
+        )
+
+    @classmethod
+    def unpack(cls, record: tuple) -> "LockEvent":
+        flags, level, soft_drop, hard_drop, combo = record
+        return cls(
+            flags & 0x7,
+            TSpinType(flags >> 3 & 0x3),
+            level,
+            combo,
+            bool(flags & 0x20),
+            soft_drop,
+            hard_drop,
+        )
+
+
+class Scoring:
+    # guideline scoring, fed one lock event at a time (O(1) per lock), so it
+    # works the same inside a running game as over a recorded list of locks
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.score = 0
+        # whether the last line clear was a tetris or a t-spin clear
+        self.back_to_back = False
+
+    def lock(self, event: LockEvent) -> int:
+        # add the points of a locked piece, returns them
+        lines = event.lines
+        if event.tspin == TSpinType.TSPIN:
+            points = TSPIN_POINTS[min(lines, 3)]
+        elif event.tspin == TSpinType.MINI:
+            points = TSPIN_MINI_POINTS[min(lines, 2)]
+        else:
+            points = LINE_POINTS[lines]
+
+        back_to_back = False
+        if lines:
+            # t-spins without lines neither continue nor break back-to-backs
+            difficult = lines == 4 or bool(event.tspin)
+            back_to_back = difficult and self.back_to_back
+            if back_to_back:
+                points = points * 3 // 2
+            self.back_to_back = difficult
+        if event.combo > 1:
+            points += COMBO_POINTS * (event.combo - 1)
+        if event.perfect_clear:
+            if lines == 4 and back_to_back:
+                points += BACK_TO_BACK_PERFECT_TETRIS_POINTS
+            else:
+                points += PERFECT_CLEAR_POINTS[lines]
+        points *= event.level
+
+        points += SOFT_DROP_POINTS * event.soft_drop
+        points += HARD_DROP_POINTS * event.hard_drop
+        self.score += points
+        return points
+
+
+def scoreLocks(events: Iterable[LockEvent]) -> int:
+    # score of a whole game from its lock events, without replaying it
+    scoring = Scoring()
+    for event in events:
+        scoring.lock(event)
+    return scoring.score
@@ -0,0 +1,267 @@
+from collections import OrderedDict
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from ttris.board import Board
+from ttris.constants import BOARD_HEIGHT, BOARD_WIDTH
+from ttris.enums import MinoType
+from ttris.metrics import FULL_ROW_MASK, BoardMetrics, columnHeights, maskMetrics
+from ttris.movegen import MoveGenerator, Placement
+from ttris.rotations import ROTATION_STATES, RotationState
+from ttris.zobrist import (
+    DEPTH_KEYS,
+    HOLD_KEYS,
+    HOLD_LOCK_KEY,
+    PIECE_KEYS,
+    ROOT_KEY,
+    boardKey,
+    poseKey,
+    rowKey,
+)
+
+# rates a placement by the lines it clears and the board it leaves behind
+Heuristic = Callable[[int, BoardMetrics], float]
+
+
+def defaultHeuristic(cleared: int, metrics: BoardMetrics) -> float:
+    # low, flat and without holes
+    return (
+        -0.51 * metrics.aggregate_height
+        + 0.76 * cleared
+        - 0.36 * metrics.holes
+        - 0.18 * metrics.bumpiness
+    )
+
+
+def _dropStates(minoType: MinoType) -> List[RotationState]:
+    # spins of a mino that cover different shapes (an O looks the same in all
+    # four, an I, S or Z in two of them)
+    states = []
+    shapes = set()
+    for state in ROTATION_STATES[minoType]:
+        shape = frozenset(
+            (x - state.min_col, y - state.min_row) for x, y in state.cells
+        )
+        if shape not in shapes:
+            shapes.add(shape)
+            states.append(state)
+    return states
+
+
+_DROP_STATES = {minoType: _dropStates(minoType) for minoType in ROTATION_STATES}
+
+
+class TranspositionTable:
+    # search results by position hash, the least recently used ones are evicted
+    # past max_entries (an entry takes roughly 200 bytes)
+    def __init__(self, max_entries: int = 1 << 16):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: int) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: int, entry: Any) -> None:
+        self._entries[key] = entry
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class Suggestion(NamedTuple):
+    hold: bool  # whether to hold first
+    placement: Placement  # of the piece in play after the hold, if any
+    value: float
+
+
+class LookaheadSearch:
+    # best placement of the current piece looking `depth` pieces ahead (the
+    # current one included) into the preview, trying the hold piece as well.
+    # The first piece is placed with the move generator (placements reachable
+    # from where it is now, and their paths), a piece brought in by a hold
+    # from spawn, and the ones after it are dropped straight down from above
+    # the stack. Only the `beam` best rated placements of a piece are searched
+    # any further, and every position searched is memoized
+    def __init__(
+        self,
+        depth: int = 2,
+        beam: int = 4,
+        heuristic: Heuristic = defaultHeuristic,
+        use_hold: bool = True,
+        table_size: int = 1 << 16,
+        movegen: Optional[MoveGenerator] = None,
+    ):
+        self.depth = depth
+        self.beam = beam
+        self.heuristic = heuristic
+        self.use_hold = use_hold
+        self.table = TranspositionTable(table_size)
+        self.movegen = movegen or MoveGenerator()
+
+    def suggest(self, board: Board) -> Optional[Suggestion]:
+        # None when the piece can't be placed anywhere. Suggestions are for the
+        # piece where it is, one that moved or fell is searched again
+        board_arr = board.board_arr
+        piece = board.curr_piece
+        pose = (piece.x, piece.y, piece.spin)
+        pieces = [piece.minoType] + board.mino_provider.minoPreview
+        hold = board.hold.minoType if board.hold else None
+        can_hold = self.use_hold and not board.hold_lock
+        depth = min(self.depth, len(pieces))
+        key = self._key(board_arr.hash, pieces, hold, depth) ^ ROOT_KEY
+        key ^= poseKey(*pose, board.piece_tspin.value)
+        if not can_hold:
+            key ^= HOLD_LOCK_KEY
+        suggestion = self.table.get(key)
+        if suggestion is not None:
+            return suggestion
+
+        candidates = []
+        for held, minoType, rest, new_hold in self._choices(pieces, hold, can_hold):
+            states = ROTATION_STATES[minoType]
+            if held:
+                placements = self.movegen.placements(board_arr, minoType)
+            else:
+                placements = self.movegen.placements(
+                    board_arr, minoType, pose, board.piece_tspin
+                )
+            for placement in placements:
+                candidates.append(
+                    (
+                        states[placement.spin],
+                        placement.x,
+                        placement.y,
+                        rest,
+                        new_hold,
+                        (held, placement),
+                    )
+                )
+        value, best = self._best(board_arr.masks, board_arr.hash, candidates, depth)
+        if best is None:
+            return None
+        suggestion = Suggestion(best[0], best[1], value)
+        self.table.put(key, suggestion)
+        return suggestion
+
+    def _value(
+        self,
+        masks: List[int],
+        board_hash: int,
+        pieces: Sequence[MinoType],
+        hold: Optional[MinoType],
+        depth: int,
+    ) -> float:
+        # best value reachable by placing `depth` more pieces
+        if not depth or not pieces:
+            return 0.0
+        key = self._key(board_hash, pieces, hold, depth)
+        value = self.table.get(key)
+        if value is not None:
+            return value
+
+        heights = columnHeights(masks)
+        candidates = []
+        for _, minoType, rest, new_hold in self._choices(pieces, hold, self.use_hold):
+            for state, x, y in self._drops(heights, minoType):
+                candidates.append((state, x, y, rest, new_hold, None))
+        value, _ = self._best(masks, board_hash, candidates, depth)
+        self.table.put(key, value)
+        return value
+
+    def _best(
+        self, masks: List[int], board_hash: int, candidates: List[tuple], depth: int
+    ) -> Tuple[float, Any]:
+        # value of the best candidate placement and its payload, every candidate
+        # is rated by the heuristic and the best `beam` are searched further
+        rated = []
+        for candidate in candidates:
+            state, x, y = candidate[:3]
+            placed = list(masks)
+            for dy, mask in state.x_masks[x + state.min_col]:
+                placed[y + dy] |= mask
+            rated.append((self.heuristic(*maskMetrics(placed)), placed, candidate))
+        if not rated:
+            return float("-inf"), None
+        if depth == 1:
+            value, _, candidate = max(rated, key=lambda r: r[0])
+            return value, candidate[5]
+
+        rated.sort(key=lambda r: r[0], reverse=True)
+        best_value, best = float("-inf"), None
+        for value, placed, candidate in rated[: self.beam]:
+            state, x, y, rest, hold, payload = candidate
+            rows = [mask for mask in placed if mask != FULL_ROW_MASK]
+            if len(rows) < BOARD_HEIGHT:
+                # lines were cleared, everything above them moved down
+                placed = [0] * (BOARD_HEIGHT - len(rows)) + rows
+                child_hash = boardKey(placed)
+            else:
+                child_hash = board_hash
+                for dy, mask in state.x_masks[x + state.min_col]:
+                    child_hash ^= rowKey(y + dy, mask)
+            value += self._value(placed, child_hash, rest, hold, depth - 1)
+            if best is None or value > best_value:
+                best_value, best = value, payload
+        return best_value, best
+
+    @staticmethod
+    def _choices(
+        pieces: Sequence[MinoType], hold: Optional[MinoType], can_hold: bool
+    ) -> Iterator[tuple]:
+        # (held, mino type to place, pieces after it, hold after it) of placing
+        # the current piece, or the hold piece instead
+        yield False, pieces[0], pieces[1:], hold
+        if not can_hold or pieces[0] == hold:
+            return
+        if hold is None:
+            # holding the first time brings in the next piece
+            if len(pieces) > 1:
+                yield True, pieces[1], pieces[2:], pieces[0]
+        else:
+            yield True, hold, pieces[1:], pieces[0]
+
+    @staticmethod
+    def _drops(heights: List[int], minoType: MinoType) -> Iterator[tuple]:
+        # (state, x, y) of every placement reached by dropping the mino
+        # straight down from above the stack
+        for state in _DROP_STATES[minoType]:
+            for x in range(-state.min_col, BOARD_WIDTH - state.max_col):
+                y = min(
+                    BOARD_HEIGHT - heights[x + dx] - 1 - bottom
+                    for dx, bottom in state.col_bottoms
+                )
+                # sticks out above the board
+                if y + state.min_row >= 0:
+                    yield state, x, y
+
+    @staticmethod
+    def _key(
+        board_hash: int,
+        pieces: Sequence[MinoType],
+        hold: Optional[MinoType],
+        depth: int,
+    ) -> int:
+        # pieces past the first depth + 1 are never placed in the search
+        key = board_hash ^ DEPTH_KEYS[depth] ^ HOLD_KEYS[hold.value if hold else 0]
+        for i, minoType in enumerate(pieces[: depth + 1]):
+            key ^= PIECE_KEYS[i][minoType.value]
+        return key
@@ -0,0 +1,151 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from ttris.board import Board, BoardPool
+from ttris.policies import loadPolicy
+from ttris.stats import percentile
+
+# 60 frames a second, so games are cut off after 10 minutes of play
+MAX_FRAMES = 36000
+PERCENTILES = (50, 90, 99)
+
+
+class GameResult(NamedTuple):
+    # how one headless game went
+    seed: int
+    lines: int
+    level: int
+    score: int
+    max_combo: int
+    tspins: int
+    tspin_minis: int
+    pieces_placed: int
+    frames: int
+
+
+# every result field except the seed is aggregated
+STAT_FIELDS = GameResult._fields[1:]
+
+
+def playGame(
+    seed: int,
+    policy: str,
+    lookahead: int = 5,
+    max_frames: int = MAX_FRAMES,
+    pool: Optional[BoardPool] = None,
+) -> GameResult:
+    # play one game with the given policy until it tops out or runs out of time,
+    # on a board from `pool` when given one
+    board = pool.acquire(seed) if pool is not None else Board(lookahead, seed=seed)
+    player = loadPolicy(policy)(seed)
+    frame = 0
+    while not board.game_over and frame < max_frames:
+        board.update(frame, player(board))
+        frame += 1
+    result = GameResult(
+        seed,
+        board.lines_cleared,
+        board.level,
+        board.score,
+        board.max_combo,
+        board.tspins,
+        board.tspin_minis,
+        board.pieces_placed,
+        frame,
+    )
+    if pool is not None:
+        pool.release(board)
+    return result
+
+
+def _playChunk(
+    seeds: Sequence[int], policy: str, lookahead: int, max_frames: int
+) -> List[GameResult]:
+    # one unit of work for a worker process, a whole chunk of games is sent
+    # back at once so there is one round trip per chunk instead of per game,
+    # and the games are played one after another on the same board
+    pool = BoardPool(lookahead, 1)
+    return [playGame(seed, policy, lookahead, max_frames, pool) for seed in seeds]
+
+
+def runGames(
+    seeds: Iterable[int],
+    policy: str = "greedy",
+    workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    lookahead: int = 5,
+    max_frames: int = MAX_FRAMES,
+) -> Iterator[GameResult]:
+    # play a game per seed across a pool of worker processes, results are
+    # yielded chunk by chunk as they finish (so not in seed order)
+    seeds = list(seeds)
+    # fail on a bad policy here rather than in every worker
+    loadPolicy(policy)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        pool = BoardPool(lookahead, 1)
+        for seed in seeds:
+            yield playGame(seed, policy, lookahead, max_frames, pool)
+        return
+
+    if chunk_size is None:
+        # a few chunks per worker, so workers that get short games pick up
+        # more work instead of idling at the end
+        chunk_size = max(1, -(-len(seeds) // (workers * 4)))
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [
+            executor.submit(
+                _playChunk, seeds[i : i + chunk_size], policy, lookahead, max_frames
+            )
+            for i in range(0, len(seeds), chunk_size)
+        ]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+class StatsCollector:
+    # gathers game results as they stream in and aggregates them per field
+    def __init__(self):
+        self.games = 0
+        self.values: Dict[str, List[int]] = {field: [] for field in STAT_FIELDS}
+
+    def add(self, result: GameResult) -> None:
+        self.games += 1
+        for field in STAT_FIELDS:
+            self.values[field].append(getattr(result, field))
+
+    def summary(self, percentiles=PERCENTILES) -> Dict[str, Dict[str, float]]:
+        # {field: {"mean": .., "min": .., "p50": .., ..., "max": ..}}
+        summary = {}
+        for field, values in self.values.items():
+            values = sorted(values)
+            stats = {
+                "mean": sum(values) / len(values) if values else 0.0,
+                "min": values[0] if values else 0,
+            }
+            for p in percentiles:
+                stats[f"p{p}"] = percentile(values, p)
+            stats["max"] = values[-1] if values else 0
+            summary[field] = stats
+        return summary
+
+    def format(self, percentiles=PERCENTILES) -> str:
+        summary = self.summary(percentiles)
+        columns = list(next(iter(summary.values())))
+        cells = {
+            field: [f"{stats[column]:.1f}" for column in columns]
+            for field, stats in summary.items()
+        }
+        # every column as wide as its widest value, with a space in between
+        widths = [
+            max([len(column)] + [len(row[i]) for row in cells.values()])
+            for i, column in enumerate(columns)
+        ]
+        label = max(map(len, summary))
+        rows = [[""] + columns] + [[field] + row for field, row in cells.items()]
+        return "\n".join(
+            f"{row[0]:<{label}}"
+            + "".join(f" {cell:>{width}}" for cell, width in zip(row[1:], widths))
+            for row in rows
+        )
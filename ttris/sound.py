@@ -1,10 +1,28 @@
 import pyxel
 
+from ttris.events import Event, EventBus, EventType
+
 
 class SoundBoard:
     def __init__(self):
         pass
 
+    def subscribe(self, events: EventBus) -> None:
+        # play the sounds of the game events on a bus
+        events.subscribe(lambda event: self.playMovement(), EventType.MOVE)
+        events.subscribe(lambda event: self.playRotation(), EventType.ROTATE)
+        events.subscribe(lambda event: self.playLCSpecial(), EventType.TSPIN)
+        events.subscribe(lambda event: self.playHold(), EventType.HOLD)
+        events.subscribe(self.playLock, EventType.LOCK)
+
+    def playLock(self, event: Event) -> None:
+        lock = event.data
+        self.playHardDrop()
+        if lock.lines:
+            self.playLineClear(lock.combo)
+            if lock.lines == 4:
+                self.playLCSpecial()
+
     def playHardDrop(self) -> None:
         pyxel.play(2, 4)
 
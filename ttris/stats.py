@@ -0,0 +1,11 @@
+from typing import Sequence
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    # linearly interpolated percentile of already sorted values
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * p / 100
+    lower = int(k)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (k - lower)
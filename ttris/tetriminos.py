@@ -1,174 +1,160 @@
 from collections import deque
 from itertools import islice
 from random import Random
-from typing import List
-
-import pyxel
+from typing import List, Optional, Tuple
 
+from ttris.bitboard import BitBoard
 from ttris.constants import (
-    BLOCK_SIZE,
     BOARD_HEIGHT,
     BOARD_WIDTH,
-    BOARD_X,
-    BOARD_Y,
     LOCK_DELAY,
     MAX_LOCKS,
-    MINO_ARRS,
+    SPAWN_X,
+    SPAWN_Y,
     SRS_TESTS,
     SRS_TESTS_I,
 )
 from ttris.enums import MinoType, RotationDirection, TSpinType
+from ttris.rotations import ROTATION_STATES, RotationState
 
 
 class Tetrimino:
-    def __init__(self, minoType: MinoType, x=3, y=2, minoArr=None) -> None:
+    __slots__ = (
+        "minoType",
+        "states",
+        "state",
+        "x",
+        "y",
+        "_spin",
+        "prev_kick",
+        "lock_delay_start",
+        "lock_resets",
+        "hintY",
+    )
+
+    def __init__(self, minoType: MinoType, x=SPAWN_X, y=SPAWN_Y, spin=0) -> None:
         if minoType == MinoType.NO_MINO:
             raise Exception("Mino cannot be created with MinoType == 0 (NO_MINO)")
         self.minoType: MinoType = minoType
-        self.mino_arr: List[List[int]] = (
-            minoArr if minoArr else MINO_ARRS[self.minoType.value - 1]
-        )
+        # precomputed rotation states (block layout and masks) of every spin
+        self.states: List[RotationState] = ROTATION_STATES[minoType]
+        self.state: RotationState = self.states[spin % 4]
         # set the position of the mino at the center of board/well by default
         self.x: int = x
         self.y: int = y
-        self._spin: int = 0
+        self._spin: int = spin
         self.prev_kick = None
         self.lock_delay_start: int = -1
         self.lock_resets: int = 0
 
+    @property
+    def mino_arr(self) -> List[List[int]]:
+        return self.state.mino_arr
+
     @property
     def spin(self) -> int:
         # spin "condition" of the mino (0: 0°, 1: 90°, 2: 180°, 3: 270°)
         return self._spin % 4
 
+    def setPose(self, x: int, y: int, spin: int) -> None:
+        # move the mino straight to a position and spin, without any checks
+        self.x = x
+        self.y = y
+        self._spin = spin
+        self.state = self.states[spin % 4]
+
+    def snapshot(self) -> tuple:
+        # everything about the mino but its hint, which depends on the board
+        return (
+            self.minoType,
+            self.x,
+            self.y,
+            self._spin,
+            self.prev_kick,
+            self.lock_delay_start,
+            self.lock_resets,
+        )
+
+    @classmethod
+    def fromSnapshot(cls, snapshot: tuple) -> "Tetrimino":
+        # a new mino (not the one the snapshot was taken of) in the same state
+        minoType, x, y, spin, prev_kick, lock_delay_start, lock_resets = snapshot
+        mino = cls(minoType, x, y, spin)
+        mino.prev_kick = prev_kick
+        mino.lock_delay_start = lock_delay_start
+        mino.lock_resets = lock_resets
+        return mino
+
     def resetPiece(self) -> None:
         # resets all mino properties to default when first initialized
-        self.x = 3
-        self.y = 2
-        self.mino_arr = MINO_ARRS[self.minoType.value - 1]
+        self.x = SPAWN_X
+        self.y = SPAWN_Y
         self._spin = 0
+        self.state = self.states[0]
         self.lock_delay_start = -1
 
-    def lockDelayExpired(self, board: List[List[MinoType]]) -> bool:
-        # returns boolean if the lock for the current piece has expired
-        new_mino = Tetrimino(
-            self.minoType, x=self.x, y=self.y + 1, minoArr=self.mino_arr
-        )
+    def lockDelayExpired(self, board: BitBoard, frame: int) -> bool:
+        # returns boolean if the lock for the current piece has expired by `frame`
         if self.lock_resets < MAX_LOCKS:
-            if not new_mino.isValidPosition(board):
+            if not board.fits(self.state, self.x, self.y + 1):
                 if self.lock_delay_start == -1:
-                    self.lock_delay_start = pyxel.frame_count
+                    self.lock_delay_start = frame
             else:
                 self.lock_delay_start = -1
 
         return (
-            self.lock_delay_start != -1
-            and pyxel.frame_count - self.lock_delay_start > LOCK_DELAY
+            self.lock_delay_start != -1 and frame - self.lock_delay_start > LOCK_DELAY
         )
 
-    def draw(self, x: int, y: int) -> None:
-        # draws the mino at a specified x, y position on the screen
-        minoTypeVal = self.minoType.value - 1
-        for i, row in enumerate(self.mino_arr):
-            for j, block in enumerate(row):
-                if not block:
-                    continue
-                draw_x = (self.x + j) * BLOCK_SIZE + x
-                draw_y = (self.y + i) * BLOCK_SIZE + y
-                u = (minoTypeVal) * BLOCK_SIZE
-                pyxel.blt(draw_x, draw_y, 1, u, 0, BLOCK_SIZE, BLOCK_SIZE)
-
-    def drawOnBoard(self, hint=False) -> None:
-        # draw the floating mino on top of the board
-        # if hint is true, draw outline of piece instead with the hintY value
-        minoTypeVal = self.minoType.value - 1 if not hint else 7
-        minoY = self.y if not hint else self.hintY
-        for i, row in enumerate(self.mino_arr):
-            for j, block in enumerate(row):
-                if not block:
-                    continue
-                x = (self.x + j) * BLOCK_SIZE + BOARD_X
-                y = (minoY + i) * BLOCK_SIZE + BOARD_Y
-                u = (minoTypeVal) * BLOCK_SIZE
-                pyxel.blt(x, y, 1, u, 0, BLOCK_SIZE, BLOCK_SIZE)
-
-    def drawLockDelayMeter(
-        self,
-        x: int,
-        y: int,
-        max_length: int,
-        thickness=1,
-        horizontal=True,
-        color=8,
-        last_lock_color=2,
-    ) -> None:
-        # draw a meter that shows how long until the piece locks
-        if self.lock_delay_start == -1:
-            return
-        time_elapsed = pyxel.frame_count - self.lock_delay_start
-        # get fraction of max_length to draw based on time elapsed
-        length = int(max_length * (1 - time_elapsed / LOCK_DELAY))
-
-        color = color if self.lock_resets < MAX_LOCKS - 1 else last_lock_color
-
-        if horizontal:
-            pyxel.rect(x, y, length, thickness, color)
-        else:
-            pyxel.rect(x, y, thickness, length, color)
-
-    def rotateMino(
-        self, direction: RotationDirection, board: List[List[MinoType]]
-    ) -> bool:
+    def rotateMino(self, direction: RotationDirection, board: BitBoard) -> bool:
         # rotates a mino in a specified direction with the given board state
         # returns boolean if the rotation was successful
-        if self.minoType == MinoType.MINO_O:  # O-pieces can't rotate
+        kick = self.findKick(direction, board, self.x, self.y, self._spin)
+        if kick is None:
             return False
 
-        new_minoArr = self._getRotatedMinoArr(direction.value)
+        # save rotation if successful
+        test_x, test_y = kick
+        self._spin += direction.value
+        self.state = self.states[self._spin % 4]
+        self.x += test_x
+        self.y -= test_y
+        self.updateHint(board)
+        self.prev_kick = kick
+
+        # update lock reset
+        if self.lock_delay_start != -1:
+            self.lock_resets += 1
+        if self.lock_resets < MAX_LOCKS:
+            self.lock_delay_start = -1
+
+        return True
+
+    def findKick(
+        self, direction: RotationDirection, board: BitBoard, x: int, y: int, spin: int
+    ) -> Optional[Tuple[int, int]]:
+        # returns the first SRS test (kick) that lets this mino rotate from x, y
+        # and spin in the given direction, or None if the rotation is blocked
+        new_state = self.states[(spin + direction.value) % 4]
 
         # check if rotation works with the SRS tests
-        tests = (SRS_TESTS if self.minoType != MinoType.MINO_I else SRS_TESTS_I)[
-            self.spin
+        for test_x, test_y in self.kickTests(direction, spin):
+            if board.fits(new_state, x + test_x, y - test_y):
+                return test_x, test_y
+
+        return None
+
+    def kickTests(
+        self, direction: RotationDirection, spin: int
+    ) -> List[Tuple[int, int]]:
+        # SRS tests to try, in order, when rotating from spin in the given direction
+        if self.minoType == MinoType.MINO_O:  # O-pieces can't rotate
+            return []
+        return (SRS_TESTS if self.minoType != MinoType.MINO_I else SRS_TESTS_I)[
+            spin % 4
         ][direction.value]
-        for test_x, test_y in tests:
-            new_mino = Tetrimino(
-                self.minoType, x=self.x + test_x, y=self.y - test_y, minoArr=new_minoArr
-            )
-            if new_mino.isValidPosition(board):
-                # save rotation if successful
-                self._spin += direction.value
-                self.mino_arr = new_minoArr
-                self.x += test_x
-                self.y -= test_y
-                self.updateHint(board)
-                self.prev_kick = (test_x, test_y)
-
-                # update lock reset
-                if self.lock_delay_start != -1:
-                    self.lock_resets += 1
-                if self.lock_resets < MAX_LOCKS:
-                    self.lock_delay_start = -1
-
-                return True
-
-        return False
-
-    def _getRotatedMinoArr(self, direction: int) -> List[List[int]]:
-        # returns a rotated copy of minoArr based on the direction value
-        # e.g. direction = 1 -> rotate clockwise, direction = -1 -> rotate counterclockwise, direction = 2 -> rotate 180°
-        new_minoArr = self.mino_arr
-        while direction != 0:
-            # perform the rotation
-            # https://stackoverflow.com/questions/8421337/rotating-a-two-dimensional-array-in-python
-            new_minoArr = (
-                list(zip(*new_minoArr[::-1]))
-                if direction > 0
-                else list(zip(*new_minoArr))[::-1]
-            )
-            direction -= 1 if direction > 0 else -1
-        return new_minoArr
-
-    def checkTSpin(self, board: List[List[MinoType]]) -> TSpinType:
+
+    def checkTSpin(self, board: BitBoard) -> TSpinType:
         # check if the current T piece is in a position only possible after a T-spin
         if self.minoType != MinoType.MINO_T:
             return TSpinType.NONE
@@ -201,13 +187,11 @@ class Tetrimino:
             return TSpinType.MINI
         return TSpinType.TSPIN
 
-    def moveX(self, direction: int, board: List[List[MinoType]]) -> bool:
+    def moveX(self, direction: int, board: BitBoard) -> bool:
         # move the mino in the x direction by the specified amount
         new_x = self.x + direction
-        new_mino = Tetrimino(self.minoType, x=new_x, y=self.y, minoArr=self.mino_arr)
-
         # check if move is valid
-        if not new_mino.isValidPosition(board):
+        if not board.fits(self.state, new_x, self.y):
             return False
 
         # save x translation
@@ -222,60 +206,64 @@ class Tetrimino:
 
         return True
 
-    def softDrop(self, board: List[List[MinoType]]) -> bool:
+    def shiftX(self, direction: int, board: BitBoard) -> bool:
+        # slide the mino all the way in the x direction (ARR 0), counting as
+        # a single move for the lock delay
+        new_x = board.slideX(self.state, self.x, self.y, direction)
+        if new_x == self.x:
+            return False
+
+        self.x = new_x
+        self.updateHint(board)
+
+        if self.lock_delay_start != -1:
+            self.lock_resets += 1
+        if self.lock_resets < MAX_LOCKS:
+            self.lock_delay_start = -1
+
+        return True
+
+    def softDrop(self, board: BitBoard) -> bool:
         # drop the mino down by 1 block position
-        new_mino = Tetrimino(
-            self.minoType, x=self.x, y=self.y + 1, minoArr=self.mino_arr
-        )
         # move piece down only if it's okay to do so
-        if not new_mino.isValidPosition(board):
+        if not board.fits(self.state, self.x, self.y + 1):
             return False
 
         self.y += 1
         return True
 
-    def hardDrop(self, board: List[List[MinoType]]) -> None:
+    def hardDrop(self, board: BitBoard) -> None:
         # drop the mino down until it can't go any further
-        new_mino = Tetrimino(
-            self.minoType, x=self.x, y=self.y + 1, minoArr=self.mino_arr
-        )
-        # pretend we are soft dropping until we can't go any further
-        while new_mino.isValidPosition(board):
-            new_mino.y += 1
-            self.y += 1
+        self.y = board.landingY(self.state, self.x, self.y)
 
-    def updateHint(self, board: List[List[MinoType]]) -> None:
-        # make a copy of the current mino, see how far it hard drops to,
+    def updateHint(self, board: BitBoard) -> None:
+        # see how far the current mino would hard drop to,
         # that is where the hint should be drawn
-        hint_mino = Tetrimino(self.minoType, x=self.x, y=self.y, minoArr=self.mino_arr)
-        hint_mino.hardDrop(board)
-        self.hintY = hint_mino.y
+        self.hintY = board.landingY(self.state, self.x, self.y)
 
-    def isValidPosition(self, board: List[List[MinoType]]) -> bool:
+    def fits(self, board: BitBoard, x: int, y: int, spin: int) -> bool:
+        # check if this mino would fit at x, y with the given spin,
+        # without moving it or allocating a candidate mino
+        return board.fits(self.states[spin % 4], x, y)
+
+    def isValidPosition(self, board: BitBoard) -> bool:
         # check collision with other minos and out of bounds
-        return not (self.isOutOfBounds() or self.isColliding(board))
+        return board.fits(self.state, self.x, self.y)
 
     def isOutOfBounds(self) -> bool:
-        # for each block, check if it exceeds the bounds of the board
-        for i, row in enumerate(self.mino_arr):
-            for j, el in enumerate(row):
-                if not el:
-                    continue
-                block_x = j + self.x
-                block_y = i + self.y
-                if (not 0 <= block_x < BOARD_WIDTH) or (
-                    not 0 <= block_y < BOARD_HEIGHT
-                ):
-                    return True
-        return False
-
-    def isColliding(self, board: List[List[MinoType]]) -> bool:
-        # for each block, check if it is already occupied by a mino block
-        for i, row in enumerate(self.mino_arr):
-            for j, el in enumerate(row):
-                if el and board[self.y + i][self.x + j] is not MinoType.NO_MINO:
-                    return True
-        return False
+        # check if the bounding box of the blocks exceeds the bounds of the board
+        state = self.state
+        return not (
+            0 <= self.x + state.min_col
+            and self.x + state.max_col < BOARD_WIDTH
+            and 0 <= self.y + state.min_row
+            and self.y + state.max_row < BOARD_HEIGHT
+        )
+
+    def isColliding(self, board: BitBoard) -> bool:
+        # check if any block overlaps the stack, blocks off the sides of the
+        # board count as colliding too (shifted masks would just drop them)
+        return not board.fits(self.state, self.x, self.y)
 
 
 class MinoQueue:
@@ -294,15 +282,49 @@ class MinoQueue:
     def extend(self, minos: List[MinoType]):
         self.q.extend(minos)
 
+    def clear(self):
+        self.q.clear()
+
     def __len__(self):
         return len(self.q)
 
 
+MINO_BAG = [MinoType(i) for i in range(1, 8)]
+
+
 class MinoProvider:  # 7-bag
-    def __init__(self, numPreviews) -> None:
+    def __init__(self, numPreviews, seed=None) -> None:
         self.numPreviews = numPreviews
         self.minoQueue = MinoQueue()
-        self.r = Random()
+        # the same seed always deals the same sequence of minos
+        self.r = Random(seed)
+        # generator state as of the last snapshot (None once it changed since)
+        self._r_state: Optional[tuple] = None
+        self._fill()
+
+    def reset(self, seed=None) -> None:
+        # deal from the start of a new sequence, as a new provider would
+        self.minoQueue.clear()
+        self.r.seed(seed)
+        self._r_state = None
+        self._fill()
+
+    def snapshot(self) -> tuple:
+        # the queue and the generator state, which only changes when a new bag
+        # is generated, so snapshots in between share it
+        if self._r_state is None:
+            self._r_state = self.r.getstate()
+        return tuple(self.minoQueue.q), self._r_state
+
+    def restore(self, snapshot: tuple) -> None:
+        queue, r_state = snapshot
+        self.minoQueue.clear()
+        self.minoQueue.extend(queue)
+        if r_state is not self._r_state:
+            self.r.setstate(r_state)
+            self._r_state = r_state
+
+    def _fill(self) -> None:
         # generate the first few batches of tetraminos
         while len(self.minoQueue) < self.numPreviews:
             self.minoQueue.extend(self._generateMinos())
@@ -312,12 +334,22 @@ class MinoProvider:  # 7-bag
         return self.minoQueue.topk(self.numPreviews)
 
     def fetchMino(self) -> Tetrimino:
+        return Tetrimino(self.fetchMinoType())
+
+    def fetchMinoType(self) -> MinoType:
         mino = self.minoQueue.pop()
         if len(self.minoQueue) <= self.numPreviews:
             self.minoQueue.extend(self._generateMinos())
-        return Tetrimino(mino)
+        return mino
+
+    def fetchMinoTypes(self, count: int) -> List[MinoType]:
+        # same minos, in the same order, as calling fetchMinoType `count` times
+        while len(self.minoQueue) <= self.numPreviews + count:
+            self.minoQueue.extend(self._generateMinos())
+        return [self.minoQueue.pop() for _ in range(count)]
 
     def _generateMinos(self) -> List[MinoType]:
-        minoBag = [MinoType(i) for i in range(1, 8)]
+        self._r_state = None
+        minoBag = list(MINO_BAG)
         self.r.shuffle(minoBag)
         return minoBag
@@ -0,0 +1,306 @@
+import asyncio
+import struct
+import time
+from collections import deque
+from random import Random
+from typing import Dict, List, Optional, Set
+
+from ttris.board import Board
+from ttris.constants import FPS
+from ttris.delta import BoardView, DeltaEncoder
+from ttris.enums import Action
+from ttris.garbage import Attack, GarbageQueue
+from ttris.stats import percentile
+
+# every message is a kind byte and a payload length, then the payload:
+#   JOIN   client -> server  (no payload) asks for a match
+#   START  server -> client  match seed and the client's player index (0 or 1)
+#   INPUT  client -> server  one Action bitmask (uint16) per frame, in frame order
+#   FRAME  server -> client  frame number, garbage pending for each player,
+#                            then a delta (ttris.delta) of each player's board
+#   END    server -> client  index of the winner (DRAW when both topped out)
+HEADER = struct.Struct("<BI")
+JOIN = 1
+START = 2
+INPUT = 3
+FRAME = 4
+END = 5
+START_RECORD = struct.Struct("<QB")
+FRAME_RECORD = struct.Struct("<IBB")
+INPUT_RECORD = struct.Struct("<H")
+DRAW = 0xFF
+
+# longest payload read off a connection, a frame with both boards' keyframes
+# and a client's inputs up to MAX_INPUTS_AHEAD are both well under it
+MAX_PAYLOAD = 1 << 12
+# a player is dropped when this much unsent data piles up for them
+MAX_WRITE_BUFFER = 1 << 16
+# or when they send inputs this many frames ahead of their match
+MAX_INPUTS_AHEAD = 2 * FPS
+
+
+def packMessage(kind: int, payload: bytes = b"") -> bytes:
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+async def readMessage(reader: asyncio.StreamReader):
+    kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_PAYLOAD:
+        # don't wait on (or buffer) whatever the peer claims to be sending
+        raise ConnectionError(f"Message of {length} bytes is too long")
+    return kind, await reader.readexactly(length) if length else b""
+
+
+class Match:
+    # two authoritative boards dealt the same pieces, the lines a player sends
+    # (ttris.garbage) first cancel their own pending garbage, the rest goes to
+    # the opponent and comes up after one of their locks that clears no lines
+    def __init__(self, seed: int, lookahead: int = 5):
+        self.seed = seed
+        self.boards = [Board(lookahead, seed=seed) for _ in range(2)]
+        self.attacks = [Attack(), Attack()]
+        self.garbage = [GarbageQueue(seed + 1), GarbageQueue(seed + 2)]
+        self.encoders = [DeltaEncoder(board) for board in self.boards]
+        # inputs received for the frames to come
+        self.inputs = [deque(), deque()]
+        self.frame = 0
+
+    @property
+    def over(self) -> bool:
+        return any(board.game_over for board in self.boards)
+
+    @property
+    def winner(self) -> Optional[int]:
+        # the player left standing, None for a draw
+        standing = [i for i, board in enumerate(self.boards) if not board.game_over]
+        return standing[0] if len(standing) == 1 else None
+
+    def step(self) -> None:
+        # play one frame on both boards
+        for board, inputs in zip(self.boards, self.inputs):
+            board.update(self.frame, inputs.popleft() if inputs else 0)
+        # both players' locks are settled against the garbage pending before
+        # this frame, what they send only arrives once both are done, so
+        # neither player's lock is handled first
+        sent = [0, 0]
+        for i, board in enumerate(self.boards):
+            if not board.hard_drop_tick:
+                continue
+            lock = board.last_lock
+            sent[i] = self.garbage[i].cancel(self.attacks[i].lock(lock))
+            if not lock.lines:
+                for lines, hole in self.garbage[i].take():
+                    if not board.game_over:
+                        board.addGarbage(lines, hole)
+        for i, lines in enumerate(sent):
+            self.garbage[1 - i].receive(lines)
+        self.frame += 1
+
+    def encodeFrame(self) -> bytes:
+        # FRAME payload of the frame just played
+        return (
+            FRAME_RECORD.pack(
+                self.frame,
+                min(len(self.garbage[0]), 0xFF),
+                min(len(self.garbage[1]), 0xFF),
+            )
+            + self.encoders[0].encode()
+            + self.encoders[1].encode()
+        )
+
+
+class _Player:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.match: Optional[Match] = None
+        self.index = 0
+        # the task handling the connection
+        self.task = asyncio.current_task()
+
+
+class VersusServer:
+    # pairs up clients as they join and plays all matches on one fixed rate
+    # tick, every client gets the delta of both boards every frame
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed=None,
+        lookahead: int = 5,
+        fps: int = FPS,
+    ):
+        self.host = host
+        self.port = port
+        self.lookahead = lookahead
+        self.fps = fps
+        # deals the seed of every match
+        self._seeds = Random(seed)
+        self._waiting: Optional[_Player] = None
+        self.matches: Dict[Match, List[_Player]] = {}
+        # seconds each of the last ticks took to play and send every match
+        self.tick_times: deque = deque(maxlen=600)
+        # ticks that took longer than a frame
+        self.overruns = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._ticker: Optional[asyncio.Task] = None
+        # every connected player
+        self._players: Set[_Player] = set()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        # the actual port when asked for any free one
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ticker = asyncio.create_task(self._tick())
+
+    async def close(self) -> None:
+        self._ticker.cancel()
+        self._server.close()
+        # closing a connection ends its handler, which is left to finish
+        players = list(self._players)
+        for player in players:
+            player.writer.close()
+        await asyncio.gather(*(player.task for player in players))
+        await self._server.wait_closed()
+
+    def tickStats(self) -> Dict[str, float]:
+        # tick latency percentiles in milliseconds
+        times = sorted(self.tick_times)
+        if not times:
+            return {}
+        stats = {f"p{p}": percentile(times, p) * 1000 for p in (50, 90, 99)}
+        stats["max"] = times[-1] * 1000
+        return stats
+
+    async def _serve(self, reader, writer) -> None:
+        player = _Player(reader, writer)
+        self._players.add(player)
+        try:
+            while True:
+                kind, payload = await readMessage(reader)
+                if kind == JOIN and player.match is None:
+                    self._join(player)
+                elif kind == INPUT and player.match is not None:
+                    inputs = player.match.inputs[player.index]
+                    ahead = len(inputs) + len(payload) // INPUT_RECORD.size
+                    if ahead > MAX_INPUTS_AHEAD:
+                        # far ahead of the match (or still sending after it
+                        # ended), they leave it like a dropped connection
+                        break
+                    # plain ints, the board takes them like Action flags
+                    inputs.extend(
+                        actions for actions, in INPUT_RECORD.iter_unpack(payload)
+                    )
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error):
+            # a garbled input message drops the player too
+            pass
+        finally:
+            self._leave(player)
+            self._players.discard(player)
+            writer.close()
+
+    def _join(self, player: _Player) -> None:
+        if self._waiting is None or self._waiting.writer.is_closing():
+            self._waiting = player
+            return
+        match = Match(self._seeds.getrandbits(64), self.lookahead)
+        players = [self._waiting, player]
+        self._waiting = None
+        for i, p in enumerate(players):
+            p.match = match
+            p.index = i
+            p.writer.write(packMessage(START, START_RECORD.pack(match.seed, i)))
+        self.matches[match] = players
+
+    def _leave(self, player: _Player) -> None:
+        # a player who leaves mid match loses it
+        if self._waiting is player:
+            self._waiting = None
+        match = player.match
+        if match is not None and match in self.matches:
+            match.boards[player.index].topOut()
+
+    async def _tick(self) -> None:
+        period = 1 / self.fps
+        deadline = time.perf_counter()
+        while True:
+            start = time.perf_counter()
+            for match, players in list(self.matches.items()):
+                match.step()
+                frame = packMessage(FRAME, match.encodeFrame())
+                if match.over:
+                    winner = match.winner
+                    frame += packMessage(
+                        END, bytes((DRAW if winner is None else winner,))
+                    )
+                    del self.matches[match]
+                for player in players:
+                    writer = player.writer
+                    if writer.is_closing():
+                        continue
+                    if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                        # too far behind to keep up with the match
+                        writer.close()
+                        continue
+                    writer.write(frame)
+            elapsed = time.perf_counter() - start
+            self.tick_times.append(elapsed)
+            if elapsed > period:
+                self.overruns += 1
+            deadline = max(deadline + period, time.perf_counter())
+            await asyncio.sleep(deadline - time.perf_counter())
+
+
+class VersusClient:
+    # one player: sends inputs and mirrors both boards from the server's frames
+    def __init__(self):
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.seed: Optional[int] = None
+        self.index = 0
+        self.views = [BoardView(), BoardView()]
+        self.frame = 0
+        # garbage lines waiting to come up, per player
+        self.pending = [0, 0]
+        self.over = False
+        self.winner: Optional[int] = None
+
+    @property
+    def board(self) -> BoardView:
+        return self.views[self.index]
+
+    @property
+    def opponent(self) -> BoardView:
+        return self.views[1 - self.index]
+
+    async def connect(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        # join a match and wait for it to start
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(packMessage(JOIN))
+        kind, payload = await readMessage(self.reader)
+        if kind != START:
+            raise Exception(f"Expected a match start, got message {kind}")
+        self.seed, self.index = START_RECORD.unpack(payload)
+
+    def send(self, actions: Action) -> None:
+        # inputs for the next frame
+        self.writer.write(packMessage(INPUT, INPUT_RECORD.pack(actions)))
+
+    async def receive(self) -> bool:
+        # apply the next message from the server, false once the match is over
+        kind, payload = await readMessage(self.reader)
+        if kind == FRAME:
+            self.frame, *self.pending = FRAME_RECORD.unpack_from(payload)
+            pos = self.views[0].apply(payload, FRAME_RECORD.size)
+            self.views[1].apply(payload, pos)
+        elif kind == END:
+            self.over = True
+            self.winner = None if payload[0] == DRAW else payload[0]
+        return not self.over
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
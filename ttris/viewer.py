@@ -0,0 +1,62 @@
+import socket
+
+import pyxel
+
+from ttris.broadcast import STREAM_FRAME_RECORD, WATCH, WATCH_RECORD
+from ttris.delta import BoardView
+from ttris.renderer import BoardRenderer
+from ttris.versus import FRAME, HEADER, packMessage
+
+RECEIVE_SIZE = 1 << 16
+
+
+class TtrisViewer:
+    # draws a board from a broadcast stream (ttris.broadcast), every frame it
+    # applies whatever arrived on the socket without blocking the pyxel loop
+    def __init__(self, host: str = "127.0.0.1", port: int = 7701, channel: int = 0):
+        self.sock = socket.create_connection((host, port))
+        self.sock.sendall(packMessage(WATCH, WATCH_RECORD.pack(channel)))
+        self.sock.setblocking(False)
+        # received bytes not making up a whole message yet
+        self._buffer = bytearray()
+        self.view = BoardView()
+        self.renderer = BoardRenderer(self.view)
+        # the server closed the stream
+        self.ended = False
+
+    def update(self) -> None:
+        if self.ended:
+            return
+        try:
+            while True:
+                data = self.sock.recv(RECEIVE_SIZE)
+                if not data:
+                    self.ended = True
+                    break
+                self._buffer += data
+        except BlockingIOError:
+            pass
+        self.applyMessages()
+
+    def applyMessages(self) -> None:
+        # apply every whole message received, a viewer that fell behind plays
+        # all of them at once and only draws the latest
+        buffer = self._buffer
+        pos = 0
+        while len(buffer) - pos >= HEADER.size:
+            kind, length = HEADER.unpack_from(buffer, pos)
+            end = pos + HEADER.size + length
+            if len(buffer) < end:
+                break
+            if kind == FRAME:
+                self.view.apply(buffer, pos + HEADER.size + STREAM_FRAME_RECORD.size)
+            pos = end
+        del buffer[:pos]
+
+    def draw(self) -> None:
+        # nothing to draw until the first keyframe
+        if self.view.synced:
+            self.renderer.draw()
+
+    def run(self) -> None:
+        pyxel.run(self.update, self.draw)
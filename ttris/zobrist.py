@@ -0,0 +1,66 @@
+from random import Random
+from typing import List, Sequence
+
+from ttris.constants import BOARD_HEIGHT, BOARD_WIDTH
+
+# zobrist keys: every filled cell, piece and setting XORs its own random key
+# into a hash, so a change only has to XOR out the old and in the new keys.
+# Fixed seed, so hashes agree across runs and worker processes
+_r = Random(0x7715)
+
+CELL_KEYS = [
+    [_r.getrandbits(64) for _ in range(BOARD_WIDTH)] for _ in range(BOARD_HEIGHT)
+]
+_HALF = BOARD_WIDTH // 2
+
+
+def _maskKeys(keys: List[int]) -> List[int]:
+    # XOR of the keys of the set bits, for every mask over len(keys) bits
+    table = [0]
+    for key in keys:
+        table += [k ^ key for k in table]
+    return table
+
+
+# keys of every row mask, looked up in two halves (an empty row's key is 0)
+_ROW_KEYS_LOW = [_maskKeys(row[:_HALF]) for row in CELL_KEYS]
+_ROW_KEYS_HIGH = [_maskKeys(row[_HALF:]) for row in CELL_KEYS]
+
+MAX_PIECES = 16
+# a mino type at a position of the upcoming pieces (0 is the current piece)
+PIECE_KEYS = [[_r.getrandbits(64) for _ in range(8)] for _ in range(MAX_PIECES)]
+# the held mino type (0 when nothing is held)
+HOLD_KEYS = [_r.getrandbits(64) for _ in range(8)]
+HOLD_LOCK_KEY = _r.getrandbits(64)
+DEPTH_KEYS = [_r.getrandbits(64) for _ in range(MAX_PIECES)]
+# positions searched from a board's actual piece in play
+ROOT_KEY = _r.getrandbits(64)
+# pose of the piece in play (x, y offset by POSE_MARGIN, as a mino's box can
+# hang off the board), and the t-spin its last rotation counts as
+POSE_MARGIN = 4
+POSE_KEYS = [
+    [
+        [_r.getrandbits(64) for _ in range(BOARD_WIDTH + 2 * POSE_MARGIN)]
+        for _ in range(BOARD_HEIGHT + 2 * POSE_MARGIN)
+    ]
+    for _ in range(4)
+]
+TSPIN_KEYS = [_r.getrandbits(64) for _ in range(3)]
+
+
+def rowKey(y: int, mask: int) -> int:
+    return (
+        _ROW_KEYS_LOW[y][mask & ((1 << _HALF) - 1)] ^ _ROW_KEYS_HIGH[y][mask >> _HALF]
+    )
+
+
+def boardKey(masks: Sequence[int]) -> int:
+    key = 0
+    for y, mask in enumerate(masks):
+        if mask:
+            key ^= rowKey(y, mask)
+    return key
+
+
+def poseKey(x: int, y: int, spin: int, tspin: int = 0) -> int:
+    return POSE_KEYS[spin][y + POSE_MARGIN][x + POSE_MARGIN] ^ TSPIN_KEYS[tspin]
@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import time
+from random import Random
+
+from ttris.enums import Action
+from ttris.versus import VersusClient, VersusServer
+
+# inputs bench bots press, one per frame
+_BOT_ACTIONS = (
+    Action.NONE,
+    Action.NONE,
+    Action.LEFT,
+    Action.RIGHT,
+    Action.ROTATE_CW,
+    Action.SOFT_DROP,
+)
+
+
+def parseArgs():
+    parser = argparse.ArgumentParser(description="ttris versus server")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="host matches until interrupted")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=7700)
+    serve.add_argument("--seed", type=int, default=None)
+    bench = sub.add_parser(
+        "bench", help="play bot matches against a local server and time its ticks"
+    )
+    bench.add_argument("-m", "--matches", type=int, default=100)
+    bench.add_argument("-s", "--seconds", type=float, default=10)
+    bench.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+async def serve(args) -> None:
+    server = VersusServer(args.host, args.port, args.seed)
+    await server.start()
+    print(f"serving on {server.host}:{server.port}")
+    while True:
+        await asyncio.sleep(10)
+        stats = server.tickStats()
+        if stats:
+            print(
+                f"{len(server.matches)} matches, tick "
+                + ", ".join(f"{k} {v:.2f}ms" for k, v in stats.items())
+            )
+
+
+async def bot(client: VersusClient, seed: int, received: list) -> None:
+    # presses random inputs and drops a piece every 20 frames
+    r = Random(seed)
+    while await client.receive():
+        received[0] += 1
+        if client.frame % 20 == 0:
+            client.send(Action.HARD_DROP)
+        else:
+            client.send(r.choice(_BOT_ACTIONS))
+
+
+async def bench(args) -> None:
+    server = VersusServer(seed=args.seed)
+    await server.start()
+    clients = [VersusClient() for _ in range(2 * args.matches)]
+    await asyncio.gather(*(client.connect(port=server.port) for client in clients))
+    received = [0]
+    start = time.perf_counter()
+    bots = [
+        asyncio.create_task(bot(client, args.seed + i, received))
+        for i, client in enumerate(clients)
+    ]
+    await asyncio.sleep(args.seconds)
+    elapsed = time.perf_counter() - start
+    stats = server.tickStats()
+    matches = len(server.matches)
+    for task in bots:
+        task.cancel()
+    await asyncio.gather(*(client.close() for client in clients))
+    await server.close()
+
+    print(
+        f"{args.matches} matches started, {matches} still running after "
+        f"{elapsed:.1f}s"
+    )
+    print("tick " + ", ".join(f"{k} {v:.2f}ms" for k, v in stats.items()))
+    print(f"{server.overruns} ticks took longer than a frame")
+    print(f"{received[0] / elapsed:,.0f} frames/s received by clients")
+
+
+def main() -> None:
+    args = parseArgs()
+    asyncio.run(serve(args) if args.command == "serve" else bench(args))
+
+
+if __name__ == "__main__":
+    main()